@@ -158,6 +158,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'game.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
@@ -180,6 +184,44 @@ CACHES = {
     }
 }
 
+# Write-behind buffering of click counters (see game/write_behind.py).
+# BACKEND 'local' keeps deltas per process; 'redis' requires a django_redis cache.
+GAME_WRITE_BEHIND = {
+    'ENABLED': os.environ.get('WRITE_BEHIND_ENABLED', 'False').lower() in ('true', '1', 'yes'),
+    'BACKEND': os.environ.get('WRITE_BEHIND_BACKEND', 'local'),
+    'FLUSH_INTERVAL': 2.0,  # seconds
+    'FLUSH_THRESHOLD': 200,  # buffered clicks
+}
+
+# Sorted diamond leaderboard (see game/leaderboard.py).
+# BACKEND 'local' keeps a per-process sorted list; 'redis' requires a django_redis cache.
+GAME_LEADERBOARD = {
+    'BACKEND': os.environ.get('LEADERBOARD_BACKEND', 'local'),
+    'LOCAL_TTL': 300,  # seconds before the local copy is rebuilt from the database
+}
+
+# Materialized coins/mining power/click level/prestige leaderboards
+GAME_LEADERBOARD_SNAPSHOTS = {
+    'INTERVAL': int(os.environ.get('LEADERBOARD_SNAPSHOT_INTERVAL', '600')),  # seconds between runs with --loop
+}
+
+# Background offline-mining settlement (manage.py settle_mining)
+GAME_MINING_SETTLEMENT = {
+    'CHUNK_SIZE': int(os.environ.get('MINING_SETTLE_CHUNK_SIZE', '500')),
+    'INTERVAL': int(os.environ.get('MINING_SETTLE_INTERVAL', '900')),  # seconds between runs with --loop
+}
+
+# JSON encoder of the API and views (see game/renderers.py): 'auto' uses orjson if installed
+GAME_JSON = {
+    'ENCODER': os.environ.get('JSON_ENCODER', 'auto'),
+}
+
+# Two-tier item catalog cache (see game/catalog.py)
+GAME_CATALOG = {
+    'LOCAL_MAXSIZE': 64,  # entries in the per-process LRU
+    'LOCAL_TTL': 60,  # seconds; bounds staleness outside of requests
+}
+
 # Session engine with database (no Redis dependency)
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 
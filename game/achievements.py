@@ -0,0 +1,230 @@
+# game/achievements.py
+"""
+Incremental achievement evaluation.
+
+Achievement definitions are kept in a process-wide index sorted by
+threshold for each metric (coins, diamonds, miners). Every profile stores
+its next unmet threshold per metric (next_achievement_*), so a routine
+check is a couple of integer comparisons. The database is only touched
+when a threshold is actually reached: then the player's unlocked set is
+loaded, achievements are granted and the next thresholds recomputed.
+
+next_achievement_* semantics:
+    0     -> unknown, evaluate on the next check (new profiles, definition edits)
+    None  -> no unmet achievement depends on this metric
+    N > 0 -> re-evaluate once the metric reaches N
+
+The index is tagged with the generation of the shared 'achievements' cache
+namespace it was built for. Definition edits move that generation after
+commit; every process reads it at the start of each request, as the
+catalog does (game/catalog.py), and rebuilds its index when it moved. No
+worker keeps evaluating players against targets another worker changed.
+"""
+import threading
+from bisect import bisect_right
+from collections import namedtuple
+
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .cache_utils import GameCacheManager
+from .models import Achievement, Inventory, PlayerProfile, UserAchievement
+
+
+METRICS = ('coins', 'diamonds', 'miners')
+THRESHOLD_FIELDS = ['next_achievement_coins', 'next_achievement_diamonds', 'next_achievement_miners']
+TARGET_FIELDS = ['target_coins', 'target_diamonds', 'target_miners']
+
+AchievementEntry = namedtuple('AchievementEntry', [
+    'id', 'code', 'target_coins', 'target_diamonds', 'target_miners', 'reward_coins', 'reward_diamonds',
+])
+
+
+class AchievementIndex:
+    """
+    Immutable view of all achievement definitions.
+    thresholds[metric] is a sorted tuple of (target, achievement_id) for
+    every achievement with a non-zero target on that metric.
+    """
+
+    def __init__(self, entries, generation=None):
+        self.generation = generation
+        self.entries = tuple(entries)
+        self.thresholds = {}
+        self.targets = {}
+        for metric in METRICS:
+            pairs = sorted(
+                (getattr(e, f'target_{metric}'), e.id) for e in self.entries if getattr(e, f'target_{metric}')
+            )
+            self.thresholds[metric] = tuple(pairs)
+            self.targets[metric] = tuple(target for target, _ in pairs)
+
+    def is_met(self, entry, values):
+        return all(values[m] >= getattr(entry, f'target_{m}') for m in METRICS)
+
+    def next_threshold(self, metric, value, unlocked_ids):
+        """Smallest target above `value` belonging to a still-locked achievement."""
+        pairs = self.thresholds[metric]
+        for target, achievement_id in pairs[bisect_right(self.targets[metric], value):]:
+            if achievement_id not in unlocked_ids:
+                return target
+        return None
+
+
+_index = None
+_index_lock = threading.Lock()
+_generation = None  # latest shared generation seen by this process
+
+
+def sync():
+    """Read the shared definitions generation; the next get_achievement_index() rebuilds if it moved."""
+    global _generation
+    _generation = GameCacheManager.get_generation(GameCacheManager.ACHIEVEMENTS_PREFIX)
+    return _generation
+
+
+def get_achievement_index():
+    global _index
+    index = _index
+    if index is None or index.generation != _generation:
+        with _index_lock:
+            if _index is index:
+                generation = _generation if _generation is not None else sync()
+                _index = AchievementIndex(
+                    (AchievementEntry(*row) for row in Achievement.objects.values_list(*AchievementEntry._fields)),
+                    generation,
+                )
+            index = _index
+    return index
+
+
+def _bump_generation():
+    GameCacheManager.invalidate_namespace(GameCacheManager.ACHIEVEMENTS_PREFIX)
+    sync()
+
+
+def invalidate_achievement_index():
+    """
+    Rebuild this process's index on next use (so it sees the current
+    transaction's edits) and, after commit, move the shared generation so
+    every other process rebuilds on its next request.
+    """
+    global _index
+    _index = None
+    transaction.on_commit(_bump_generation)
+
+
+def count_miners(profile):
+    return Inventory.objects.filter(player=profile, item__item_type='MINER', quantity__gt=0).count()
+
+
+def check_achievements(profile: PlayerProfile, inventory_changed=False):
+    """
+    Unlock any achievements `profile` now qualifies for.
+    Pass inventory_changed=True when the player's miner count may have gone up.
+    """
+    miners_count = None
+    triggered = (
+        (profile.next_achievement_coins is not None and profile.coins >= profile.next_achievement_coins) or
+        (profile.next_achievement_diamonds is not None and profile.diamonds >= profile.next_achievement_diamonds)
+    )
+    if not triggered and inventory_changed and profile.next_achievement_miners is not None:
+        miners_count = count_miners(profile)
+        triggered = miners_count >= profile.next_achievement_miners
+    if not triggered:
+        return []
+
+    index = get_achievement_index()
+    if miners_count is None:
+        miners_count = count_miners(profile) if index.thresholds['miners'] else 0
+    values = {'coins': profile.coins, 'diamonds': profile.diamonds, 'miners': miners_count}
+    unlocked_ids = set(UserAchievement.objects.filter(player=profile).values_list('achievement_id', flat=True))
+
+    newly_unlocked = []
+    for entry in index.entries:
+        if entry.id in unlocked_ids or not index.is_met(entry, values):
+            continue
+        newly_unlocked.append(UserAchievement(player=profile, achievement_id=entry.id))
+        unlocked_ids.add(entry.id)
+        profile.coins += entry.reward_coins
+        profile.diamonds += entry.reward_diamonds
+
+    if newly_unlocked:
+        newly_unlocked = UserAchievement.objects.bulk_create(newly_unlocked)
+        values['coins'], values['diamonds'] = profile.coins, profile.diamonds
+
+    profile.next_achievement_coins = index.next_threshold('coins', values['coins'], unlocked_ids)
+    profile.next_achievement_diamonds = index.next_threshold('diamonds', values['diamonds'], unlocked_ids)
+    profile.next_achievement_miners = index.next_threshold('miners', values['miners'], unlocked_ids)
+
+    if newly_unlocked:
+        profile.save()
+    else:
+        profile.save(update_fields=THRESHOLD_FIELDS)
+    return newly_unlocked
+
+
+def reset_thresholds(queryset=None):
+    """Force re-evaluation on the next check for the given (or all) profiles."""
+    queryset = PlayerProfile.objects.all() if queryset is None else queryset
+    return queryset.update(**{field: 0 for field in THRESHOLD_FIELDS})
+
+
+def profiles_affected_by(achievement):
+    """
+    Profiles whose stored thresholds may now skip `achievement`: those
+    without it whose next threshold on one of its metrics is unset or above
+    its target. A threshold left too low only costs one extra evaluation.
+    """
+    condition = Q()
+    for metric in METRICS:
+        target = getattr(achievement, f'target_{metric}')
+        if target:
+            field = f'next_achievement_{metric}'
+            condition |= Q(**{f'{field}__isnull': True}) | Q(**{f'{field}__gt': target})
+    queryset = PlayerProfile.objects.exclude(userachievement__achievement=achievement)
+    return queryset.filter(condition) if condition else queryset
+
+
+def _on_achievement_pre_save(sender, instance, raw=False, **kwargs):
+    # Remember the stored targets to tell threshold edits from cosmetic ones
+    instance._stored_targets = (
+        Achievement.objects.filter(pk=instance.pk).values_list(*TARGET_FIELDS).first() if instance.pk else None
+    )
+
+
+def _on_achievement_saved(sender, instance, **kwargs):
+    invalidate_achievement_index()
+    targets = tuple(getattr(instance, field) for field in TARGET_FIELDS)
+    if targets != getattr(instance, '_stored_targets', None):
+        reset_thresholds(profiles_affected_by(instance))
+
+
+def _on_achievement_deleted(sender, instance, **kwargs):
+    # Thresholds pointing at a deleted target are only too low: nothing to reset
+    invalidate_achievement_index()
+
+
+def _on_user_achievement_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Achievement):
+        return  # the achievement itself is gone
+    reset_thresholds(PlayerProfile.objects.filter(pk=instance.player_id))
+
+
+def _on_request_started(sender, **kwargs):
+    sync()
+
+
+def setup_achievement_signals():
+    """
+    Connect signals that keep the achievement index and thresholds valid,
+    and check the index generation once per request.
+    Called from the app's ready() method.
+    """
+    pre_save.connect(_on_achievement_pre_save, sender=Achievement, dispatch_uid='achievement_pre_save')
+    post_save.connect(_on_achievement_saved, sender=Achievement, dispatch_uid='achievement_saved')
+    post_delete.connect(_on_achievement_deleted, sender=Achievement, dispatch_uid='achievement_deleted')
+    post_delete.connect(_on_user_achievement_deleted, sender=UserAchievement, dispatch_uid='user_achievement_deleted')
+    request_started.connect(_on_request_started, dispatch_uid='achievements_request_started')
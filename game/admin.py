@@ -3,15 +3,25 @@ from django.contrib import admin
 from .models import (
     PlayerProfile, GameItem, Inventory, MarketListing, PromoCode, 
     UsedPromo, Achievement, UserAchievement, AuctionListing, 
-    UserQuest, PrestigeMultiplier, PrestigeReward
+    QuestProgress, PrestigeMultiplier, PrestigeReward, Quest, LeaderboardSnapshot,
+    MarketDepth
 )
+from .effective_stats import apply_effective_stats
 
 # تنظیمات نمایش پروفایل کاربر
 @admin.register(PlayerProfile)
 class PlayerProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'coins', 'diamonds', 'energy', 'electricity', 'click_level')
     search_fields = ('user__username',)
-    readonly_fields = ('user',)
+    readonly_fields = (
+        'user', 'effective_click_bonus', 'effective_luck', 'effective_mining_multiplier',
+        'next_achievement_coins', 'next_achievement_diamonds', 'next_achievement_miners',
+        'mining_power', 'mining_consumption',
+    )
+
+    def save_model(self, request, obj, form, change):
+        apply_effective_stats(obj)
+        super().save_model(request, obj, form, change)
 
 # تنظیمات نمایش آیتم‌های بازی
 @admin.register(GameItem)
@@ -55,11 +65,32 @@ class UserAchievementAdmin(admin.ModelAdmin):
     list_filter = ('achievement',)
     search_fields = ('player__user__username',)
 
-@admin.register(UserQuest)
-class UserQuestAdmin(admin.ModelAdmin):
-    list_display = ('user', 'code', 'title', 'quest_type', 'progress', 'goal', 'completed')
-    list_filter = ('quest_type', 'completed')
-    search_fields = ('user__username', 'code')
+@admin.register(Quest)
+class QuestAdmin(admin.ModelAdmin):
+    list_display = ('title', 'code', 'quest_type', 'goal', 'reward_coins', 'reward_diamonds', 'reward_xp')
+    list_filter = ('quest_type',)
+    search_fields = ('title', 'code')
+
+@admin.register(QuestProgress)
+class QuestProgressAdmin(admin.ModelAdmin):
+    list_display = ('user', 'quest', 'day', 'progress', 'goal', 'completed')
+    list_filter = ('day', 'quest__quest_type', 'completed')
+    search_fields = ('user__username', 'quest__code')
+
+@admin.register(LeaderboardSnapshot)
+class LeaderboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('category', 'rank', 'username', 'value', 'generated_at')
+    list_filter = ('category',)
+    search_fields = ('username',)
+
+@admin.register(MarketDepth)
+class MarketDepthAdmin(admin.ModelAdmin):
+    list_display = ('item', 'listing_count', 'min_price', 'median_price', 'updated_at')
+    search_fields = ('item__name', 'item__item_code')
+    readonly_fields = (
+        'item', 'listing_count', 'min_price', 'median_price',
+        'mid_price', 'mid_created_at', 'mid_listing_id', 'updated_at',
+    )
 
 @admin.register(PrestigeMultiplier)
 class PrestigeMultiplierAdmin(admin.ModelAdmin):
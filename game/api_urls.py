@@ -6,7 +6,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .api_views import (
     PlayerProfileViewSet, ShopViewSet, MarketplaceViewSet,
-    QuestViewSet, AchievementViewSet, PrestigeViewSet, LeaderboardViewSet
+    QuestViewSet, AchievementViewSet, PrestigeViewSet, LeaderboardViewSet,
+    CacheStatsView
 )
 
 router = DefaultRouter()
@@ -19,5 +20,6 @@ router.register(r'prestige', PrestigeViewSet, basename='prestige')
 router.register(r'leaderboard', LeaderboardViewSet, basename='leaderboard')
 
 urlpatterns = [
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
     path('', include(router.urls)),
 ]
@@ -5,26 +5,73 @@ REST API Views using Django REST Framework ViewSets.
 from rest_framework import viewsets, views, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.reverse import reverse
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django.utils import timezone
 from django.db import transaction
-from django.db.models import Sum, F, Q
-import random
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 
 from .models import (
     PlayerProfile, GameItem, Inventory, MarketListing,
-    UserQuest, UserAchievement, Achievement, AuctionListing
+    UserAchievement, Achievement
 )
 from .serializers import (
     PlayerProfileSerializer, GameItemSerializer, InventorySerializer,
     MarketListingSerializer, UserQuestSerializer, UserAchievementSerializer,
-    AchievementSerializer, AuctionListingSerializer
+    lean_profile_data
 )
-from .utils import (
-    calculate_mining_power, get_optimized_inventory,
-    get_optimized_miners, get_optimized_market_listings
+from .pagination import (
+    AchievementPagination, InventoryPagination, LeaderboardPagination, MarketListingPagination,
+    OrderBookPagination
 )
+from .utils import get_optimized_inventory, get_optimized_miners
+from .cache_utils import GameCacheManager
 from .prestige_utils import PrestigeSystem
+from .click_utils import ClickEngine
+from . import catalog, leaderboard, leaderboard_snapshots, mining, order_book, trading, write_behind
+from .achievements import check_achievements
+from .quests import quests_for_day
+
+
+def accepts_gzip(request):
+    """Whether Accept-Encoding allows gzip (explicitly or via `*`) with a non-zero q-value."""
+    qualities = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = coding.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
+def payload_response(request, payload):
+    """
+    Response for a precomputed CatalogPayload: the body (pre-gzipped if
+    accepted) under that encoding's ETag, or 304 when If-None-Match matches
+    it (weak comparison, as RFC 9110 requires for If-None-Match).
+    """
+    gzipped = accepts_gzip(request)
+    etag = payload.gzip_etag if gzipped else payload.etag
+    etags = [tag.removeprefix('W/') for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))]
+    if '*' in etags or etag in etags:
+        response = HttpResponseNotModified()
+    elif gzipped:
+        response = HttpResponse(payload.gzipped, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(payload.body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
 
 
 class PlayerProfileViewSet(viewsets.ReadOnlyModelViewSet):
@@ -43,152 +90,133 @@ class PlayerProfileViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def me(self, request):
         """Get current user's profile."""
-        profile = request.user.playerprofile
-        profile.mining_power = calculate_mining_power(profile)
+        profile = write_behind.merge_pending(request.user.playerprofile)
         serializer = self.get_serializer(profile)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], url_path='me/lean')
+    def me_lean(self, request):
+        """Get current user's profile with equipped items as catalog ids."""
+        profile = write_behind.merge_pending(request.user.playerprofile)
+        catalog_ref = {
+            'url': reverse('shop-catalog', request=request),
+            'etag': catalog.items_payload().etag,
+        }
+        return Response(lean_profile_data(profile, catalog_ref))
+    
     @action(detail=False, methods=['post'])
     def click(self, request):
         """Handle click action for coins."""
         with transaction.atomic():
             profile = PlayerProfile.objects.select_for_update().get(user=request.user)
+            levels_gained = ClickEngine.sync_pending(profile)
             
             if profile.energy < 1:
-                return Response({
-                    'status': 'error',
-                    'message': 'انرژی کافی نیست',
-                    'can_refill': True,
-                    'refill_cost': 2,
-                    'refill_amount': 50
-                }, status=status.HTTP_400_BAD_REQUEST)
+                return self._no_energy_response()
             
-            profile.energy -= 1
+            result = ClickEngine.apply_clicks(profile, 1, roll_loot=False)
+            result['leveled_up'] = result['leveled_up'] or levels_gained > 0
+            profile.save()
             
-            # Calculate click value with buffs
-            extra_coins = 0
-            luck_multiplier = 1.0
-            active_slots = [profile.slot_1, profile.slot_2, profile.slot_3]
+            return Response({
+                'status': 'success',
+                'coins': profile.coins,
+                'diamonds': profile.diamonds,
+                'energy': profile.energy,
+                'gained': result['gained'],
+                'diamond_found': result['diamonds_found'] > 0,
+                'click_level': profile.click_level,
+                'click_xp': profile.click_xp,
+                'click_xp_to_next': profile.click_xp_to_next,
+                'leveled_up': result['leveled_up'],
+            })
+    
+    @action(detail=False, methods=['post'])
+    def click_batch(self, request):
+        """Apply a batch of client-side clicks in one transaction."""
+        try:
+            count = int(request.data.get('count'))
+            window_ms = int(request.data.get('window_ms'))
+        except (TypeError, ValueError):
+            count = window_ms = 0
+        if count < 1 or window_ms < 1:
+            return Response({
+                'status': 'error',
+                'message': 'تعداد کلیک یا بازه زمانی نامعتبر است'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            profile = PlayerProfile.objects.select_for_update().get(user=request.user)
+            levels_gained = ClickEngine.sync_pending(profile)
             
-            for item in active_slots:
-                if item:
-                    extra_coins += item.buff_click_coins
-                    if item.buff_luck > 0:
-                        luck_multiplier += (item.buff_luck / 100)
+            if count > ClickEngine.max_clicks_for_window(profile.id, window_ms):
+                return Response({
+                    'status': 'error',
+                    'message': 'تعداد کلیک‌ها بیش از حد مجاز است'
+                }, status=status.HTTP_429_TOO_MANY_REQUESTS)
             
-            base_coin = 1 + (profile.click_level - 1)
-            boost_active = (
-                profile.active_boost_until and 
-                profile.active_boost_until > timezone.now() and 
-                profile.boost_multiplier > 1
-            )
-            current_multiplier = profile.boost_multiplier if boost_active else 1.0
-            
-            gained = max(int((base_coin + extra_coins) * current_multiplier), 1)
-            profile.coins += gained
-            
-            # Diamond drop chance
-            diamond_found = False
-            if random.uniform(0, 1000) <= 1 * luck_multiplier:
-                profile.diamonds += 1
-                diamond_found = True
-            
-            # XP and level up
-            profile.click_xp += gained
-            leveled_up = False
-            while profile.click_xp >= profile.click_xp_to_next:
-                profile.click_xp -= profile.click_xp_to_next
-                profile.click_level += 1
-                profile.click_xp_to_next = int(profile.click_xp_to_next * 1.35)
-                leveled_up = True
+            if profile.energy < 1:
+                return self._no_energy_response()
             
+            result = ClickEngine.apply_clicks(profile, count)
+            result['leveled_up'] = result['leveled_up'] or levels_gained > 0
             profile.save()
+            check_achievements(profile, inventory_changed=bool(result['loot']))
+            ClickEngine.mark_batch(profile.id)
             
             return Response({
                 'status': 'success',
+                'applied': result['applied'],
+                'gained': result['gained'],
                 'coins': profile.coins,
                 'diamonds': profile.diamonds,
                 'energy': profile.energy,
-                'gained': gained,
-                'diamond_found': diamond_found,
+                'loot': result['loot'],
+                'diamonds_found': result['diamonds_found'],
                 'click_level': profile.click_level,
                 'click_xp': profile.click_xp,
                 'click_xp_to_next': profile.click_xp_to_next,
-                'leveled_up': leveled_up,
+                'leveled_up': result['leveled_up'],
+                'boost_multiplier': result['boost_multiplier'],
+                'boost_seconds': result['boost_seconds'],
             })
     
+    def _no_energy_response(self):
+        return Response({
+            'status': 'error',
+            'message': 'انرژی کافی نیست',
+            'can_refill': True,
+            'refill_cost': ClickEngine.REFILL_COST,
+            'refill_amount': ClickEngine.REFILL_AMOUNT
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
     @action(detail=False, methods=['post'])
     def collect_mine(self, request):
         """Collect mining rewards."""
         with transaction.atomic():
             profile = PlayerProfile.objects.select_for_update().get(user=request.user)
-            now = timezone.now()
-            last_time = profile.last_mined_at or now
-            diff = now - last_time
-            hours_passed = diff.total_seconds() / 3600
+            result = mining.settle_profile(profile, timezone.now())
             
-            if hours_passed < 0.016:  # Less than 1 minute
+            if result.status == mining.TOO_SOON:
                 return Response({
                     'status': 'error',
                     'message': 'صبر کنید تا ماینرها تولید کنند'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            miners = Inventory.objects.select_for_update().filter(
-                player=profile, item__item_type='MINER', is_active=True
-            ).select_related('item')
-            
-            # Calculate production with multipliers
-            mining_multiplier = 1.0
-            active_slots = [profile.slot_1, profile.slot_2, profile.slot_3]
-            for item in active_slots:
-                if item:
-                    mining_multiplier += (item.buff_mining_speed / 100)
-            
-            total_production = 0
-            total_consumption = 0
-            diamond_income = 0
-            
-            for inv in miners:
-                qty = inv.quantity
-                miner = inv.item
-                total_production += (miner.mining_rate * qty) * mining_multiplier
-                total_consumption += miner.electricity_consumption * qty
-                
-                if miner.miner_diamond_chance > 0:
-                    chance_factor = (miner.miner_diamond_chance / 100) * hours_passed * qty
-                    if chance_factor > 1:
-                        diamond_income += int(chance_factor)
-                    elif random.random() < chance_factor:
-                        diamond_income += 1
-            
-            if total_production == 0:
+            if result.status == mining.NO_MINERS:
                 return Response({
                     'status': 'error',
                     'message': 'ماینر فعالی ندارید'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            required_electricity = int(total_consumption * hours_passed)
-            
-            if profile.electricity <= 0 and required_electricity > 0:
+            if result.status == mining.NO_ELECTRICITY:
                 return Response({
                     'status': 'error',
                     'message': 'برق کافی نیست'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            actual_hours = hours_passed
-            if required_electricity > profile.electricity:
-                if total_consumption > 0:
-                    ratio = profile.electricity / required_electricity
-                    actual_hours = hours_passed * ratio
-                profile.electricity = 0
-            else:
-                profile.electricity -= required_electricity
-            
-            coin_income = int(total_production * actual_hours)
-            
-            profile.coins += coin_income
-            profile.diamonds += diamond_income
-            profile.last_mined_at = now
+            coin_income = result.coins
+            diamond_income = result.diamonds
             profile.save()
             
             return Response({
@@ -198,7 +226,7 @@ class PlayerProfileViewSet(viewsets.ReadOnlyModelViewSet):
                 'electricity': profile.electricity,
                 'earned': coin_income,
                 'diamonds_earned': diamond_income,
-                'message': f'{coin_incoin:,} سکه و {diamond_income} الماس دریافت شد'
+                'message': f'{coin_income:,} سکه و {diamond_income} الماس دریافت شد'
             })
     
     @action(detail=False, methods=['post'])
@@ -265,10 +293,10 @@ class PlayerProfileViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, methods=['get'])
     def inventory(self, request):
-        """Get player's inventory."""
-        inventory = get_optimized_inventory(request.user.playerprofile)
-        serializer = InventorySerializer(inventory, many=True)
-        return Response(serializer.data)
+        """Get player's inventory, largest stacks first (keyset-paginated by `cursor`)."""
+        paginator = InventoryPagination()
+        page = paginator.paginate_queryset(get_optimized_inventory(request.user.playerprofile), request, view=self)
+        return paginator.get_paginated_response(InventorySerializer(page, many=True).data)
     
     @action(detail=False, methods=['get'])
     def miners(self, request):
@@ -287,6 +315,7 @@ class ShopViewSet(viewsets.ReadOnlyModelViewSet):
     """
     serializer_class = GameItemSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = None  # the whole (filtered) shop as one page of the usual envelope, prebuilt
     queryset = GameItem.objects.filter(price_diamonds__gt=0, is_hidden_in_shop=False)
     
     def get_queryset(self):
@@ -296,15 +325,21 @@ class ShopViewSet(viewsets.ReadOnlyModelViewSet):
         if category and category != 'ALL':
             queryset = queryset.filter(item_type=category)
         
-        search = self.request.query_params.get('q')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(item_code__icontains=search)
-            )
-        
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        """
+        List shop items (`cat`, `q` filters) from the precomputed catalog
+        payload, gzipped when accepted; `If-None-Match` revalidates to 304.
+        """
+        payload = catalog.shop_payload(request.query_params.get('cat'), request.query_params.get('q'))
+        return payload_response(request, payload)
+    
+    @action(detail=False, methods=['get'], url_path='catalog', url_name='catalog')
+    def all_items(self, request):
+        """Every item definition (referenced by id elsewhere), with ETag/304."""
+        return payload_response(request, catalog.items_payload())
+    
     @action(detail=False, methods=['get'])
     def categories(self, request):
         """Get available categories."""
@@ -312,19 +347,78 @@ class ShopViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(categories)
 
 
+def _depth_data(depth):
+    return {
+        'item_id': depth.item_id,
+        'item_name': depth.item.name,
+        'listing_count': depth.listing_count,
+        'min_price': depth.min_price,
+        'median_price': depth.median_price,
+        'updated_at': depth.updated_at,
+    }
+
+
 class MarketplaceViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for marketplace operations.
     """
     serializer_class = MarketListingSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = MarketListingPagination
     
     def get_queryset(self):
-        queryset = MarketListing.objects.select_related(
+        return MarketListing.objects.select_related(
             'item', 'seller', 'seller__user'
-        ).exclude(seller=self.request.user.playerprofile).order_by('-created_at')
+        ).exclude(seller=self.request.user.playerprofile)
+    
+    @action(detail=False, methods=['get'], url_path=r'items/(?P<item_id>\d+)/book', url_name='order-book')
+    def book(self, request, item_id=None):
+        """
+        Order book of one item: listings cheapest first (the first page is the
+        cheapest `limit`), optionally within `min_price`..`max_price`, plus
+        the item's depth summary.
+        """
+        try:
+            min_price, max_price = (
+                int(request.query_params[name]) if request.query_params.get(name) else None
+                for name in ('min_price', 'max_price')
+            )
+        except ValueError:
+            return Response({
+                'status': 'error',
+                'message': 'بازه قیمت نامعتبر است'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        return queryset[:100]
+        paginator = OrderBookPagination()
+        queryset = order_book.book(item_id, min_price, max_price).select_related('seller__user')
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        response = paginator.get_paginated_response([
+            {
+                'id': listing.id,
+                'seller_username': listing.seller.user.username,
+                'price': listing.price,
+                'created_at': listing.created_at,
+            }
+            for listing in page
+        ])
+        depth = order_book.depth_summaries([int(item_id)]).first()
+        response.data['item_id'] = int(item_id)
+        response.data['depth'] = _depth_data(depth) if depth else None
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def depth(self, request):
+        """Depth summaries (count, min, median price) of every listed item, or of `item=1,2,...`."""
+        item_ids = request.query_params.get('item')
+        if item_ids:
+            try:
+                item_ids = [int(pk) for pk in item_ids.split(',')]
+            except ValueError:
+                return Response({
+                    'status': 'error',
+                    'message': 'شناسه آیتم نامعتبر است'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        return Response([_depth_data(depth) for depth in order_book.depth_summaries(item_ids or None)])
     
     @action(detail=False, methods=['post'])
     def list_item(self, request):
@@ -388,27 +482,25 @@ class MarketplaceViewSet(viewsets.ReadOnlyModelViewSet):
                     'message': 'آگهی پیدا نشد'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            buyer = PlayerProfile.objects.select_for_update().get(user=request.user)
+            buyer_id = PlayerProfile.objects.values_list('pk', flat=True).get(user=request.user)
             
-            if listing.seller == buyer:
+            if listing.seller_id == buyer_id:
                 return Response({
                     'status': 'error',
                     'message': 'نمی‌توانید آگهی خودتان را بخرید'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
+            profiles = trading.lock_profiles([buyer_id, listing.seller_id])
+            buyer, seller = profiles[buyer_id], profiles[listing.seller_id]
+            
             if buyer.diamonds < listing.price:
                 return Response({
                     'status': 'error',
                     'message': 'الماس کافی ندارید'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            seller = PlayerProfile.objects.select_for_update().get(pk=listing.seller_id)
-            
-            tax = int(listing.price * 0.1)
-            seller_profit = listing.price - tax
-            
             buyer.diamonds -= listing.price
-            seller.diamonds += seller_profit
+            seller.diamonds += trading.seller_profit(listing.price)
             
             buyer.save()
             seller.save()
@@ -426,6 +518,66 @@ class MarketplaceViewSet(viewsets.ReadOnlyModelViewSet):
                 'message': f'{listing.item.name} با موفقیت خریداری شد'
             })
 
+    @action(detail=False, methods=['post'])
+    def list_bulk(self, request):
+        """List `quantity` units of an item at one price, in one transaction."""
+        order, error = trading.parse_order(request.data.get('quantity'), request.data.get('price'))
+        if error:
+            return Response({'status': 'error', 'message': error}, status=status.HTTP_400_BAD_REQUEST)
+        quantity, price = order
+
+        item = catalog.get_item(request.data.get('item_id'))
+        if item is None:
+            return Response({
+                'status': 'error',
+                'message': 'آیتم پیدا نشد'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        profile_id = PlayerProfile.objects.values_list('pk', flat=True).get(user=request.user)
+        trade = trading.list_units(profile_id, item.id, quantity, price)
+        if trade.status != trading.LISTED:
+            return Response({
+                'status': 'error',
+                'message': trading.MESSAGES[trade.status]
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'status': 'success',
+            'message': f'{trade.count} آگهی با موفقیت ثبت شد',
+            'listed': trade.count,
+            'listing_ids': trade.listing_ids,
+        })
+
+    @action(detail=False, methods=['post'])
+    def buy_bulk(self, request):
+        """Buy up to `quantity` of the cheapest listings of an item priced at most `max_price`."""
+        order, error = trading.parse_order(request.data.get('quantity'), request.data.get('max_price'))
+        if error:
+            return Response({'status': 'error', 'message': error}, status=status.HTTP_400_BAD_REQUEST)
+        quantity, max_price = order
+
+        item = catalog.get_item(request.data.get('item_id'))
+        if item is None:
+            return Response({
+                'status': 'error',
+                'message': 'آیتم پیدا نشد'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        buyer_id = PlayerProfile.objects.values_list('pk', flat=True).get(user=request.user)
+        trade = trading.buy_cheapest(buyer_id, item.id, quantity, max_price)
+        if trade.status != trading.BOUGHT:
+            return Response({
+                'status': 'error',
+                'message': trading.MESSAGES[trade.status]
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'status': 'success',
+            'message': f'{trade.count} عدد {item.name} با موفقیت خریداری شد',
+            'bought': trade.count,
+            'spent': trade.diamonds,
+        })
+
 
 class QuestViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -435,7 +587,7 @@ class QuestViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return UserQuest.objects.filter(user=self.request.user).order_by('code')
+        return quests_for_day(self.request.user)
     
     @action(detail=False, methods=['get'])
     def active(self, request):
@@ -451,11 +603,12 @@ class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
     """
     serializer_class = UserAchievementSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = AchievementPagination
     
     def get_queryset(self):
         return UserAchievement.objects.filter(
             player=self.request.user.playerprofile
-        ).select_related('achievement').order_by('-achieved_at')
+        ).select_related('achievement')
     
     @action(detail=False, methods=['get'])
     def all(self, request):
@@ -515,21 +668,111 @@ class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
     """
     permission_classes = [IsAuthenticated]
     
+    pagination_class = LeaderboardPagination
+    
     @action(detail=False, methods=['get'])
     def top(self, request):
-        """Get top players."""
-        limit = int(request.query_params.get('limit', 100))
-        players = PlayerProfile.objects.select_related('user').order_by('-diamonds')[:limit]
+        """Get top players, paginated (`page`, `limit` up to 100)."""
+        entries = self.paginate_queryset(leaderboard.RankedSequence())
+        rows = leaderboard.hydrate(entries)
         
         result = []
-        for i, player in enumerate(players, 1):
+        for entry, player in rows:
             result.append({
-                'rank': i,
+                'rank': entry.rank,
                 'id': player.id,
                 'username': player.user.username,
                 'diamonds': player.diamonds,
                 'coins': player.coins,
-                'mining_power': calculate_mining_power(player),
+                'mining_power': player.mining_power,
             })
         
-        return Response(result)
+        return self.get_paginated_response(result)
+    
+    @action(detail=False, methods=['get'])
+    def me(self, request):
+        """Get the current player's rank."""
+        entry = leaderboard.rank(request.user.playerprofile.id)
+        if entry is None:
+            return Response({'status': 'error', 'message': 'رتبه‌ای ثبت نشده'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'rank': entry.rank,
+            'diamonds': entry.diamonds,
+            'total_players': leaderboard.get_leaderboard().size(),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def around(self, request):
+        """Get players ranked just above and below the current player."""
+        try:
+            radius = min(max(int(request.query_params.get('radius', 5)), 0), 25)
+        except ValueError:
+            radius = 5
+        me = request.user.playerprofile.id
+        return Response([
+            {
+                'rank': entry.rank,
+                'id': player.id,
+                'username': player.user.username,
+                'diamonds': entry.diamonds,
+                'is_me': player.id == me,
+            }
+            for entry, player in leaderboard.hydrate(leaderboard.around(me, radius))
+        ])
+    
+    @action(detail=False, methods=['get'], url_path='category/(?P<category>[a-z_]+)')
+    def category(self, request, category=None):
+        """Get a page of a snapshot leaderboard (coins, mining_power, click_level, prestige)."""
+        if category not in leaderboard_snapshots.CATEGORIES:
+            return Response({
+                'status': 'error',
+                'message': 'دسته‌بندی نامعتبر است'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        page_size = self.paginator.get_page_size(request)
+        rows = leaderboard_snapshots.get_page(category, page, page_size)
+        
+        return Response({
+            'category': category,
+            'count': leaderboard_snapshots.get_size(category),
+            'page': page,
+            'generated_at': rows[0].generated_at if rows else None,
+            'results': [
+                {'rank': row.rank, 'id': row.player_id, 'username': row.username, 'value': row.value}
+                for row in rows
+            ],
+        })
+    
+    @action(detail=False, methods=['get'])
+    def ranks(self, request):
+        """Get the current player's rank in every snapshot leaderboard."""
+        ranks = leaderboard_snapshots.get_player_ranks(request.user.playerprofile.id)
+        return Response({
+            category: {'rank': row.rank, 'value': row.value, 'generated_at': row.generated_at}
+            for category, row in ranks.items()
+        })
+
+
+class CacheStatsView(views.APIView):
+    """
+    Per-namespace cache counters of this worker process (admin only).
+    POST resets them.
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response({
+            'namespaces': {
+                namespace: {'ttl': policy['ttl'], 'stale': policy['stale']}
+                for namespace, policy in GameCacheManager.NAMESPACES.items()
+            },
+            'stats': GameCacheManager.stats.snapshot(),
+        })
+    
+    def post(self, request):
+        GameCacheManager.stats.reset()
+        return Response({'status': 'success'})
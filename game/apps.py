@@ -20,3 +20,18 @@ class GameConfig(AppConfig):
             # This is expected during development without Redis
             import warnings
             warnings.warn(f'Cache signals not setup: {e}')
+
+        from .achievements import setup_achievement_signals
+        from .catalog import setup_catalog_signals
+        from .effective_stats import setup_effective_stats_signals
+        from .leaderboard import setup_leaderboard_signals
+        from .mining_stats import setup_mining_stats_signals
+        from .order_book import setup_order_book_signals
+        from .seeding import setup_seeding_signals
+        setup_achievement_signals()
+        setup_catalog_signals()
+        setup_effective_stats_signals()
+        setup_leaderboard_signals()
+        setup_mining_stats_signals()
+        setup_order_book_signals()
+        setup_seeding_signals(self)
@@ -1,97 +1,226 @@
 # game/cache_utils.py
 """
 Redis caching utilities for game performance optimization.
+
+GameCacheManager is the single cache layer for the game. Every cached value
+belongs to a namespace with its own TTL and stale window:
+
+- get_or_compute() stores values in an envelope with a freshness deadline.
+  A fresh value is served as-is. A stale one (past the TTL but within the
+  stale window) is still served to everyone except one request, which wins
+  a short lock and recomputes it (stale-while-revalidate). On a miss only
+  the lock holder computes; the others wait briefly for its result instead
+  of stampeding the database (single-flight).
+- Multi-key namespaces (leaderboard pages) are invalidated with a generation
+  counter folded into their keys: one atomic increment orphans all of them
+  (they expire on their TTL). Bumps can be debounced per namespace so hot
+  writes, like a profile save on every click, don't thrash the cache.
+- Hits, stale hits, misses and lookup/compute latency are counted per
+  namespace (per process) and exposed on the admin-only /api/cache/stats/.
 """
+import threading
+import time
+
 from django.core.cache import cache
-from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 
+class CacheStats:
+    """
+    Thread-safe per-process counters: {namespace: {metric: value}}.
+    """
+
+    METRICS = ('hits', 'stale_hits', 'misses', 'computes', 'lock_waits', 'lookup_ms', 'compute_ms')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def add(self, namespace, **increments):
+        with self._lock:
+            counters = self._counters.setdefault(namespace, dict.fromkeys(self.METRICS, 0))
+            for metric, value in increments.items():
+                counters[metric] += value
+
+    def snapshot(self):
+        with self._lock:
+            counters = {ns: dict(values) for ns, values in self._counters.items()}
+        for values in counters.values():
+            lookups = values['hits'] + values['stale_hits'] + values['misses']
+            values['hit_rate'] = round((values['hits'] + values['stale_hits']) / lookups, 4) if lookups else None
+            values['avg_lookup_ms'] = round(values['lookup_ms'] / lookups, 3) if lookups else None
+            values['avg_compute_ms'] = round(values['compute_ms'] / values['computes'], 3) if values['computes'] else None
+            values['lookup_ms'] = round(values['lookup_ms'], 3)
+            values['compute_ms'] = round(values['compute_ms'], 3)
+        return counters
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+
+
 class GameCacheManager:
     """
     Centralized cache management for game data.
     """
-    
-    # Cache key prefixes
+
+    # Cache key prefixes (namespaces)
     LEADERBOARD_PREFIX = 'leaderboard'
-    PLAYER_STATS_PREFIX = 'player_stats'
-    MARKET_PREFIX = 'market_listings'
-    SHOP_PREFIX = 'shop_items'
-    
-    # Cache TTLs in seconds
-    TTL_LEADERBOARD = 3600  # 1 hour
-    TTL_PLAYER = 300  # 5 minutes
-    TTL_MARKET = 60  # 1 minute
-    TTL_SHOP = 300  # 5 minutes
-    
-    @classmethod
-    def get_leaderboard_key(cls, page=1):
-        return f'{cls.LEADERBOARD_PREFIX}_{page}'
-    
+    CATALOG_PREFIX = 'catalog'  # item catalog, see game/catalog.py
+    ACHIEVEMENTS_PREFIX = 'achievements'  # generation only, see game/achievements.py
+
+    # Per-namespace policy: TTL and stale window in seconds, generation-versioned keys
+    NAMESPACES = {
+        LEADERBOARD_PREFIX: {'ttl': 3600, 'stale': 60, 'versioned': True},
+        CATALOG_PREFIX: {'ttl': 3600, 'stale': 0, 'versioned': False},  # keys carry the generation
+    }
+
+    # Single-flight lock: held while one request recomputes a key
+    LOCK_TIMEOUT = 10  # seconds
+    LOCK_WAIT = 2.0  # seconds a miss waits for another request's recompute
+    LOCK_POLL = 0.05
+
+    # Generation counters per namespace
+    GENERATION_KEY = 'gen:{}'
+    DIRTY_KEY = 'gen:{}:dirty'
+    DEBOUNCE_KEY = 'gen:{}:debounce'
+    DEBOUNCE = {
+        LEADERBOARD_PREFIX: 5,  # seconds; at most one bump per window
+    }
+
+    stats = CacheStats()
+
     @classmethod
-    def get_player_key(cls, profile_id):
-        return f'{cls.PLAYER_STATS_PREFIX}_{profile_id}'
-    
+    def _new_generation(cls):
+        # Time-based so a counter lost to eviction never reuses an old generation
+        return int(time.time() * 1000)
+
     @classmethod
-    def get_market_key(cls):
-        return f'{cls.MARKET_PREFIX}_all'
-    
+    def _bump_generation(cls, namespace):
+        key = cls.GENERATION_KEY.format(namespace)
+        try:
+            generation = cache.incr(key)
+        except ValueError:
+            generation = cls._new_generation()
+            cache.set(key, generation, None)
+        cache.delete(cls.DIRTY_KEY.format(namespace))
+        return generation
+
     @classmethod
-    def get_shop_key(cls):
-        return f'{cls.SHOP_PREFIX}_all'
-    
+    def get_generation(cls, namespace):
+        """Current generation of `namespace`, applying a debounced bump that is due."""
+        gen_key, dirty_key = cls.GENERATION_KEY.format(namespace), cls.DIRTY_KEY.format(namespace)
+        values = cache.get_many([gen_key, dirty_key])
+        if dirty_key in values and cache.add(cls.DEBOUNCE_KEY.format(namespace), 1, cls.DEBOUNCE.get(namespace, 0)):
+            return cls._bump_generation(namespace)
+        generation = values.get(gen_key)
+        if generation is None:
+            cache.add(gen_key, cls._new_generation(), None)
+            generation = cache.get(gen_key)
+        return generation
+
     @classmethod
-    def get_leaderboard(cls, page=1):
-        """Retrieve cached leaderboard page."""
-        key = cls.get_leaderboard_key(page)
-        return cache.get(key)
-    
+    def versioned_key(cls, namespace, key):
+        return f'{namespace}:g{cls.get_generation(namespace)}:{key}'
+
     @classmethod
-    def set_leaderboard(cls, data, page=1):
-        """Cache leaderboard page."""
-        key = cls.get_leaderboard_key(page)
-        cache.set(key, data, cls.TTL_LEADERBOARD)
-    
+    def make_key(cls, namespace, key):
+        if cls.NAMESPACES[namespace]['versioned']:
+            return cls.versioned_key(namespace, key)
+        return f'{namespace}_{key}'
+
     @classmethod
-    def get_player_stats(cls, profile_id):
-        """Retrieve cached player stats."""
-        key = cls.get_player_key(profile_id)
-        return cache.get(key)
-    
+    def invalidate_namespace(cls, namespace):
+        """
+        Invalidate every key of `namespace` with one increment. Within the
+        namespace's debounce window the bump is deferred: the namespace is
+        marked dirty and the next read after the window applies it.
+        Returns True if the generation was bumped now.
+        """
+        debounce = cls.DEBOUNCE.get(namespace, 0)
+        if debounce and not cache.add(cls.DEBOUNCE_KEY.format(namespace), 1, debounce):
+            cache.set(cls.DIRTY_KEY.format(namespace), 1, None)
+            return False
+        cls._bump_generation(namespace)
+        return True
+
     @classmethod
-    def set_player_stats(cls, profile_id, data):
-        """Cache player stats."""
-        key = cls.get_player_key(profile_id)
-        cache.set(key, data, cls.TTL_PLAYER)
-    
+    def _compute_and_store(cls, namespace, cache_key, compute, policy):
+        started = time.perf_counter()
+        value = compute()
+        cls.stats.add(namespace, computes=1, compute_ms=(time.perf_counter() - started) * 1000)
+        cache.set(cache_key, (time.time() + policy['ttl'], value), policy['ttl'] + policy['stale'])
+        return value
+
     @classmethod
-    def invalidate_leaderboard(cls):
-        """Invalidate all leaderboard cache pages."""
-        for page in range(1, 11):  # Support up to 1000 players
-            cache.delete(cls.get_leaderboard_key(page))
-    
+    def get_or_compute(cls, namespace, key, compute):
+        """
+        Return the cached value of `key` in `namespace`, calling `compute()`
+        on a miss or when the value is stale (one caller at a time).
+        """
+        policy = cls.NAMESPACES[namespace]
+        started = time.perf_counter()
+        cache_key = cls.make_key(namespace, key)
+        lock_key = f'lock:{cache_key}'
+        envelope = cache.get(cache_key)
+        cls.stats.add(namespace, lookup_ms=(time.perf_counter() - started) * 1000)
+
+        if envelope is not None:
+            fresh_until, value = envelope
+            if time.time() < fresh_until:
+                cls.stats.add(namespace, hits=1)
+                return value
+            cls.stats.add(namespace, stale_hits=1)
+            if cache.add(lock_key, 1, cls.LOCK_TIMEOUT):
+                try:
+                    return cls._compute_and_store(namespace, cache_key, compute, policy)
+                finally:
+                    cache.delete(lock_key)
+            return value
+
+        cls.stats.add(namespace, misses=1)
+        if not cache.add(lock_key, 1, cls.LOCK_TIMEOUT):
+            # Someone else is computing: wait for their result, then fall back
+            cls.stats.add(namespace, lock_waits=1)
+            deadline = time.monotonic() + cls.LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(cls.LOCK_POLL)
+                envelope = cache.get(cache_key)
+                if envelope is not None:
+                    return envelope[1]
+            return cls._compute_and_store(namespace, cache_key, compute, policy)
+        try:
+            return cls._compute_and_store(namespace, cache_key, compute, policy)
+        finally:
+            cache.delete(lock_key)
+
     @classmethod
-    def invalidate_player(cls, profile_id):
-        """Invalidate specific player cache."""
-        cache.delete(cls.get_player_key(profile_id))
-    
+    def get_leaderboard_key(cls, page=1):
+        return cls.make_key(cls.LEADERBOARD_PREFIX, page)
+
     @classmethod
-    def invalidate_market(cls):
-        """Invalidate market listings cache."""
-        cache.delete(cls.get_market_key())
-    
+    def get_leaderboard(cls, page=1, page_size=100):
+        """Leaderboard page: profiles (with user and avatar) in rank order."""
+        from . import leaderboard
+
+        def compute():
+            entries = leaderboard.top(page_size, (page - 1) * page_size)
+            return [profile for _, profile in leaderboard.hydrate(entries, ('user', 'avatar'))]
+
+        return cls.get_or_compute(cls.LEADERBOARD_PREFIX, f'{page}:{page_size}', compute)
+
     @classmethod
-    def invalidate_shop(cls):
-        """Invalidate shop items cache."""
-        cache.delete(cls.get_shop_key())
-    
+    def invalidate_leaderboard(cls):
+        """Invalidate all leaderboard cache pages (debounced)."""
+        cls.invalidate_namespace(cls.LEADERBOARD_PREFIX)
+
     @classmethod
     def invalidate_all(cls):
         """Invalidate all game caches."""
         cls.invalidate_leaderboard()
-        cls.invalidate_market()
-        cls.invalidate_shop()
+        cls.invalidate_namespace(cls.CATALOG_PREFIX)
+        cls.invalidate_namespace(cls.ACHIEVEMENTS_PREFIX)
 
 
 # Signal handlers for automatic cache invalidation
@@ -100,22 +229,10 @@ def setup_cache_signals():
     Connect signal handlers for automatic cache invalidation.
     This should be called in the app's ready() method.
     """
-    from .models import PlayerProfile, Inventory, MarketListing
-    from .cache_utils import GameCacheManager
-    
-    @receiver(post_save, sender=PlayerProfile)
+    from .models import PlayerProfile
+
+    # weak=False: these are closures and would be garbage-collected on return
+    @receiver(post_save, sender=PlayerProfile, weak=False, dispatch_uid='cache_on_playerprofile_save')
     def on_playerprofile_save(sender, instance, **kwargs):
-        """Invalidate player stats cache when profile is updated."""
-        GameCacheManager.invalidate_player(instance.id)
+        """Invalidate the leaderboard pages when a profile is updated (debounced)."""
         GameCacheManager.invalidate_leaderboard()
-    
-    @receiver(post_save, sender=Inventory)
-    def on_inventory_save(sender, instance, **kwargs):
-        """Invalidate player stats when inventory changes."""
-        if instance.player_id:
-            GameCacheManager.invalidate_player(instance.player_id)
-    
-    @receiver(post_save, sender=MarketListing)
-    def on_marketlisting_save(sender, instance, **kwargs):
-        """Invalidate market cache when listings change."""
-        GameCacheManager.invalidate_market()
@@ -0,0 +1,398 @@
+# game/catalog.py
+"""
+Immutable snapshot of the GameItem catalog, behind a two-tier cache.
+
+Item definitions almost never change but are read on nearly every page and
+click (shop, energy packs, equipped slot buffs). Each process holds one
+CatalogSnapshot: every item as a compact ItemRecord tuple, indexed by id,
+item_code and item_type, plus the shop's JSON payload and the click loot
+table (game/drop_table.py), each built once. Readers
+take a reference to the current snapshot and never see it change; a rebuild
+creates a new one and swaps the module reference in a single assignment.
+
+Snapshots are built from:
+1. the shared Django cache (GameCacheManager 'catalog' namespace), holding
+   plain row tuples rather than pickled model instances,
+2. the database, on a miss.
+Shop searches go through a trigram index over the snapshot. Filtered shop
+views are memoized per snapshot in a bounded local LRU.
+
+The shop API is served from CatalogPayloads: the serialized JSON of one
+(category, search) view, its gzip-compressed form and a content-hash ETag
+per encoding, built once per snapshot so a request costs a dict lookup (or a
+304).
+
+Invalidation is broadcast through the catalog's generation counter: GameItem
+saves that change a snapshot field and deletes (admin edits included) bump
+it and rebuild the local snapshot after commit; every other process compares the generation with its
+snapshot's at the start of each request (one shared-cache read per request)
+and rebuilds when it moved. Outside of requests the local TTL bounds
+staleness.
+"""
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .cache_utils import GameCacheManager
+from .item_search import SearchIndex
+
+
+DEFAULTS = {
+    'LOCAL_MAXSIZE': 64,
+    'LOCAL_TTL': 60,  # seconds
+}
+
+RECORD_FIELDS = (
+    'id', 'name', 'item_type', 'item_code', 'description', 'image',
+    'price_diamonds', 'sell_price', 'stock', 'is_hidden_in_shop',
+    'mining_rate', 'electricity_consumption', 'miner_diamond_chance',
+    'buff_mining_speed', 'buff_click_coins', 'buff_luck', 'can_drop', 'drop_chance',
+)
+
+# Keys of the shop page's item payload
+SHOP_FIELDS = (
+    'id', 'name', 'item_type', 'item_code', 'description', 'price_diamonds',
+    'stock', 'mining_rate', 'buff_click_coins', 'buff_mining_speed',
+)
+
+# Keep a prebuilt payload safe to embed in a <script> element
+_SCRIPT_ESCAPES = {ord('<'): '\\u003c', ord('>'): '\\u003e', ord('&'): '\\u0026'}
+
+
+class ItemRecord(namedtuple('ItemRecord', RECORD_FIELDS)):
+    """
+    Immutable snapshot of one GameItem row. `image` is the stored file name.
+    """
+    __slots__ = ()
+
+    def get_item_type_display(self):
+        from .models import GameItem
+        return dict(GameItem.ITEM_TYPES).get(self.item_type, self.item_type)
+
+    @property
+    def image_url(self):
+        return default_storage.url(self.image) if self.image else None
+
+    def shop_entry(self):
+        """The item as the shop page renders it."""
+        entry = {field: getattr(self, field) for field in SHOP_FIELDS}
+        if self.image:
+            entry['image_url'] = self.image_url
+        return entry
+
+
+def is_shop_item(record):
+    return record.price_diamonds > 0 and not record.is_hidden_in_shop and record.item_type != 'ENERGY'
+
+
+def shop_json_for(records):
+    return json.dumps([record.shop_entry() for record in records]).translate(_SCRIPT_ESCAPES)
+
+
+class CatalogPayload:
+    """
+    Serialized API response: JSON body and gzipped body, each with its own
+    strong ETag (the gzipped one suffixed with -gz). With paginated=True the items are wrapped in DRF's page envelope
+    ({count, next, previous, results}) as a single page, the shape
+    /api/shop/ has always returned.
+    """
+    __slots__ = ('body', 'gzipped', 'etag', 'gzip_etag')
+
+    def __init__(self, records, paginated=False):
+        from rest_framework.renderers import JSONRenderer
+        from .serializers import CatalogItemSerializer
+        data = CatalogItemSerializer(records, many=True).data
+        if paginated:
+            data = {'count': len(data), 'next': None, 'previous': None, 'results': data}
+        self.body = JSONRenderer().render(data)
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        digest = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self.etag = '"%s"' % digest
+        self.gzip_etag = '"%s-gz"' % digest
+
+
+class CatalogSnapshot:
+    """
+    Every item of one catalog generation, with lookup indexes. Read-only.
+    """
+    __slots__ = (
+        'generation', 'built_at', 'items', 'by_id', 'by_code', 'by_type', 'shop',
+        '_shop_json', '_payloads', '_search_index', '_drop_table',
+    )
+
+    def __init__(self, generation, rows):
+        self.generation = generation
+        self.built_at = time.monotonic()
+        self.items = tuple(map(ItemRecord._make, rows))
+        self.by_id = {record.id: record for record in self.items}
+        self.by_code = {record.item_code: record for record in self.items}
+        by_type = {}
+        for record in self.items:
+            by_type.setdefault(record.item_type, []).append(record)
+        self.by_type = {item_type: tuple(records) for item_type, records in by_type.items()}
+        self.shop = tuple(record for record in self.items if is_shop_item(record))
+        self._shop_json = None
+        self._payloads = {}
+        self._search_index = None
+        self._drop_table = None
+
+    @property
+    def search_index(self):
+        """Trigram index over the shop items (game/item_search.py), built on first use."""
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.shop)
+        return self._search_index
+
+    @property
+    def drop_table(self):
+        """Click loot table over the droppable items (game/drop_table.py), built on first use."""
+        if self._drop_table is None:
+            from .drop_table import build_drop_table
+            self._drop_table = build_drop_table(self.items)
+        return self._drop_table
+
+    @property
+    def shop_json(self):
+        """JSON payload of the whole shop, built on first use."""
+        if self._shop_json is None:
+            self._shop_json = shop_json_for(self.shop)
+        return self._shop_json
+
+    @property
+    def items_payload(self):
+        """API payload of every item (hidden ones included), built on first use."""
+        payload = self._payloads.get(None)
+        if payload is None:
+            payload = self._payloads[None] = CatalogPayload(self.items)
+        return payload
+
+    def category_payload(self, category):
+        """Shop API payload of one category (None or 'ALL' for the whole shop), built on first use."""
+        category = category or 'ALL'
+        payload = self._payloads.get(category)
+        if payload is None:
+            records = self.shop if category == 'ALL' else [r for r in self.shop if r.item_type == category]
+            payload = self._payloads[category] = CatalogPayload(records, paginated=True)
+        return payload
+
+    def __len__(self):
+        return len(self.items)
+
+
+class LocalLRU:
+    """
+    Thread-safe LRU of at most `maxsize` entries, each valid for `ttl` seconds.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+        value = loader()
+        with self._lock:
+            self._entries[key] = (now + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_generation = None  # latest shared generation seen by this process
+_views = None
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'GAME_CATALOG', {})}
+
+
+def _get_views():
+    global _views
+    if _views is None:
+        with _snapshot_lock:
+            if _views is None:
+                config = get_config()
+                _views = LocalLRU(config['LOCAL_MAXSIZE'], config['LOCAL_TTL'])
+    return _views
+
+
+def sync():
+    """Read the shared catalog generation; the next get_snapshot() rebuilds if it moved."""
+    global _generation
+    _generation = GameCacheManager.get_generation(GameCacheManager.CATALOG_PREFIX)
+    return _generation
+
+
+def _load_rows():
+    from .models import GameItem
+    return tuple(GameItem.objects.order_by('pk').values_list(*RECORD_FIELDS))
+
+
+def build_snapshot(generation):
+    rows = GameCacheManager.get_or_compute(GameCacheManager.CATALOG_PREFIX, f'v{generation}:rows', _load_rows)
+    return CatalogSnapshot(generation, rows)
+
+
+def get_snapshot():
+    """The current catalog snapshot of this process."""
+    global _snapshot
+    snapshot, generation = _snapshot, _generation
+    if (snapshot is not None and snapshot.generation == generation
+            and time.monotonic() - snapshot.built_at <= get_config()['LOCAL_TTL']):
+        return snapshot
+    with _snapshot_lock:
+        if _snapshot is snapshot:
+            if generation is None or snapshot is not None and snapshot.generation == generation:
+                generation = sync()  # expired (or first use): recheck the shared generation
+            _snapshot = build_snapshot(generation)
+        return _snapshot
+
+
+def all_items():
+    """Every item, ordered by id."""
+    return get_snapshot().items
+
+
+def get_item(item_id):
+    """The record of `item_id`, or None."""
+    try:
+        return get_snapshot().by_id.get(int(item_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_item_by_code(item_code):
+    return get_snapshot().by_code.get(item_code)
+
+
+def get_items(item_ids):
+    """{id: ItemRecord} for the existing items among `item_ids`."""
+    by_id = get_snapshot().by_id
+    return {pk: by_id[pk] for pk in item_ids if pk in by_id}
+
+
+def items_of_type(item_type):
+    return get_snapshot().by_type.get(item_type, ())
+
+
+def shop_items(category=None, search=None):
+    """
+    Items listed in the shop (priced, not hidden, not energy packs), filtered
+    by category and by a search on name/item_code. Search results are
+    ranked best first (see game/item_search.py).
+    """
+    snapshot = get_snapshot()
+    if (not category or category == 'ALL') and not search:
+        return snapshot.shop
+
+    def load():
+        records = snapshot.search_index.search(search) if search else snapshot.shop
+        if category and category != 'ALL':
+            records = [record for record in records if record.item_type == category]
+        return tuple(records)
+
+    return _get_views().get((snapshot.generation, 'shop', category, search), load)
+
+
+def shop_json(category=None, search=None):
+    """JSON payload of the shop page; prebuilt for the unfiltered shop."""
+    snapshot = get_snapshot()
+    if (not category or category == 'ALL') and not search:
+        return snapshot.shop_json
+    return _get_views().get(
+        (snapshot.generation, 'shop_json', category, search),
+        lambda: shop_json_for(shop_items(category, search)),
+    )
+
+
+def items_payload():
+    """Precomputed API payload of the whole catalog."""
+    return get_snapshot().items_payload
+
+
+def shop_payload(category=None, search=None):
+    """Precomputed shop API payload of a (category, search) view."""
+    snapshot = get_snapshot()
+    if not search:
+        return snapshot.category_payload(category)
+    return _get_views().get(
+        (snapshot.generation, 'payload', category or 'ALL', search),
+        lambda: CatalogPayload(shop_items(category, search), paginated=True),
+    )
+
+
+def refresh():
+    """
+    Invalidate the catalog in every process and swap in a fresh snapshot in
+    this one.
+    """
+    global _snapshot
+    GameCacheManager.invalidate_namespace(GameCacheManager.CATALOG_PREFIX)
+    with _snapshot_lock:
+        _snapshot = build_snapshot(sync())
+    _get_views().clear()
+
+
+def _record_values(instance):
+    # RECORD_FIELDS as the database stores them (an empty image is '')
+    return tuple(instance._meta.get_field(f).get_prep_value(getattr(instance, f)) for f in RECORD_FIELDS)
+
+
+def _on_item_pre_save(sender, instance, update_fields=None, **kwargs):
+    # Remember the stored record to tell catalog edits from no-op saves
+    instance._stored_record = None
+    if instance.pk and (update_fields is None or set(update_fields) & set(RECORD_FIELDS)):
+        instance._stored_record = sender.objects.filter(pk=instance.pk).values_list(*RECORD_FIELDS).first()
+
+
+def _on_item_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created:
+        if update_fields is not None and not set(update_fields) & set(RECORD_FIELDS):
+            return
+        if getattr(instance, '_stored_record', None) == _record_values(instance):
+            return
+    _on_item_change(sender)
+
+
+def _on_item_change(sender, **kwargs):
+    # After commit, so no process can refill the cache with pre-commit rows
+    transaction.on_commit(refresh)
+
+
+def _on_request_started(sender, **kwargs):
+    sync()
+
+
+def setup_catalog_signals():
+    """
+    Refresh the catalog on GameItem changes to snapshot fields and check
+    its generation once per request. Called from the app's ready() method.
+    """
+    from .models import GameItem
+    pre_save.connect(_on_item_pre_save, sender=GameItem, dispatch_uid='catalog_item_pre_save')
+    post_save.connect(_on_item_saved, sender=GameItem, dispatch_uid='catalog_item_saved')
+    post_delete.connect(_on_item_change, sender=GameItem, dispatch_uid='catalog_item_deleted')
+    request_started.connect(_on_request_started, dispatch_uid='catalog_request_started')
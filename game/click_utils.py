@@ -0,0 +1,154 @@
+# game/click_utils.py
+"""
+Click resolution shared by the single-click and batched-click endpoints.
+All game rules for a click (energy, buffs, boost, diamond roll, XP, loot)
+live here so one click and a batch of N clicks behave identically.
+"""
+import random
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import level_curve, write_behind
+from .drop_table import get_drop_table
+from .models import Inventory
+
+
+class ClickEngine:
+    """
+    Applies one or more clicks to a (locked) PlayerProfile in memory.
+    The caller is responsible for the transaction and for saving the profile.
+    """
+
+    REFILL_COST = 2
+    REFILL_AMOUNT = 50
+    DIAMOND_ROLL_RANGE = 1000  # 1 in 1000 base chance per click
+
+    # Batch validation
+    MAX_CLICKS_PER_SECOND = 20
+    MAX_BATCH_WINDOW_MS = 10_000
+    LAST_BATCH_KEY = 'click_batch_last_{}'
+
+    LEVEL_FIELDS = ['click_level', 'click_xp', 'click_xp_to_next']
+
+    @classmethod
+    def get_slot_buffs(cls, profile):
+        """
+        Returns (extra_coins, luck_multiplier) from the precomputed slot stats.
+        """
+        return profile.effective_click_bonus, profile.effective_luck
+
+    @classmethod
+    def get_boost(cls, profile, now=None):
+        """
+        Returns (boost_active, multiplier) and clears an expired boost.
+        """
+        now = now or timezone.now()
+        boost_active = bool(
+            profile.active_boost_until and
+            profile.active_boost_until > now and
+            profile.boost_multiplier > 1
+        )
+        if not boost_active and profile.boost_multiplier != 1.0:
+            profile.boost_multiplier = 1.0
+            profile.active_boost_until = None
+        return boost_active, (profile.boost_multiplier if boost_active else 1.0)
+
+    @classmethod
+    def resolve_level_ups(cls, profile):
+        """
+        Convert banked click XP into levels. Returns the number of levels gained.
+        """
+        return level_curve.apply_xp(profile)
+
+    @classmethod
+    def sync_pending(cls, profile):
+        """
+        Flush the profile's write-behind click deltas and apply any level-ups
+        the buffered XP earned. Call right after locking the row, before
+        validating energy. Returns the number of levels gained.
+        """
+        write_behind.flush_profile(profile)
+        levels_gained = cls.resolve_level_ups(profile)
+        if levels_gained:
+            profile.save(update_fields=cls.LEVEL_FIELDS)
+        return levels_gained
+
+    @classmethod
+    def max_clicks_for_window(cls, profile_id, window_ms):
+        """
+        Maximum number of clicks a batch may carry.
+        The client window is clamped to MAX_BATCH_WINDOW_MS and to the time
+        elapsed since this player's previous batch, so back-to-back batches
+        cannot each claim a full window.
+        """
+        window_ms = min(window_ms, cls.MAX_BATCH_WINDOW_MS)
+        last_batch = cache.get(cls.LAST_BATCH_KEY.format(profile_id))
+        if last_batch is not None:
+            elapsed_ms = (timezone.now().timestamp() - last_batch) * 1000
+            window_ms = min(window_ms, max(elapsed_ms, 0))
+        return int(cls.MAX_CLICKS_PER_SECOND * window_ms / 1000)
+
+    @classmethod
+    def mark_batch(cls, profile_id):
+        cache.set(
+            cls.LAST_BATCH_KEY.format(profile_id),
+            timezone.now().timestamp(),
+            cls.MAX_BATCH_WINDOW_MS // 1000,
+        )
+
+    @classmethod
+    def apply_clicks(cls, profile, count=1, roll_loot=True):
+        """
+        Apply up to `count` clicks (bounded by the profile's energy).
+        Loot is written to Inventory here; the profile itself is not saved.
+        """
+        now = timezone.now()
+        count = min(count, profile.energy)
+        extra_coins, luck_multiplier = cls.get_slot_buffs(profile)
+        boost_active, current_multiplier = cls.get_boost(profile, now)
+
+        drop_table = get_drop_table() if roll_loot else None
+
+        total_gained = 0
+        diamonds_found = 0
+        levels_gained = 0
+        loot_counts = {}
+
+        for _ in range(count):
+            profile.energy -= 1
+
+            base_coin = 1 + (profile.click_level - 1)  # هر لول کلیک +1 کوین پایه
+            gained = max(int((base_coin + extra_coins) * current_multiplier), 1)
+            profile.coins += gained
+            total_gained += gained
+
+            if random.uniform(0, cls.DIAMOND_ROLL_RANGE) <= 1 * luck_multiplier:
+                profile.diamonds += 1
+                diamonds_found += 1
+
+            # XP برای لول کلیک
+            profile.click_xp += gained
+            levels_gained += cls.resolve_level_ups(profile)
+
+            if drop_table:
+                loot = drop_table.roll(luck_multiplier)
+                if loot:
+                    loot_counts[loot] = loot_counts.get(loot, 0) + 1
+
+        for loot, quantity in loot_counts.items():
+            inv_item, _ = Inventory.objects.get_or_create(player=profile, item_id=loot.id)
+            inv_item.quantity += quantity
+            inv_item.save()
+
+        return {
+            'applied': count,
+            'gained': total_gained,
+            'diamonds_found': diamonds_found,
+            'levels_gained': levels_gained,
+            'leveled_up': levels_gained > 0,
+            'loot': [loot.name for loot, quantity in loot_counts.items() for _ in range(quantity)],
+            'boost_active': boost_active,
+            'boost_multiplier': current_multiplier,
+            'boost_seconds': int((profile.active_boost_until - now).total_seconds()) if boost_active else 0,
+        }
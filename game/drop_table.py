@@ -0,0 +1,61 @@
+# game/drop_table.py
+"""
+Precomputed click loot table.
+
+Droppable GameItems are folded into a prefix-sum array of their drop
+chances once per catalog snapshot. A click then needs a single RNG draw
+and a binary search instead of a catalog query plus one roll per item.
+The table lives on the snapshot (game/catalog.py), so it is replaced in
+every process whenever the catalog generation moves.
+"""
+import random
+from bisect import bisect_right
+from collections import namedtuple
+
+from . import catalog
+
+
+DropEntry = namedtuple('DropEntry', ['id', 'name', 'drop_chance'])
+
+
+class DropTable:
+    """
+    Cumulative drop chances (in percent) over the droppable items.
+    """
+
+    __slots__ = ('entries', 'prefix_sums', 'total_chance')
+
+    def __init__(self, entries):
+        self.entries = tuple(entries)
+        prefix_sums = []
+        running = 0.0
+        for entry in self.entries:
+            running += entry.drop_chance
+            prefix_sums.append(running)
+        self.prefix_sums = tuple(prefix_sums)
+        self.total_chance = running
+
+    def roll(self, luck_multiplier=1.0, rng=random):
+        """
+        Pick at most one item. Luck scales every item's chance, so instead of
+        rescaling the table the draw is divided by the multiplier.
+        """
+        if not self.entries:
+            return None
+        draw = rng.uniform(0, 100) / luck_multiplier
+        if draw >= self.total_chance:
+            return None
+        return self.entries[bisect_right(self.prefix_sums, draw)]
+
+
+def build_drop_table(records):
+    """Drop table over the droppable ItemRecords among `records`, in id order."""
+    return DropTable(
+        DropEntry(record.id, record.name, record.drop_chance)
+        for record in records if record.can_drop and record.drop_chance > 0
+    )
+
+
+def get_drop_table():
+    """Drop table of the current catalog snapshot."""
+    return catalog.get_snapshot().drop_table
@@ -0,0 +1,118 @@
+# game/effective_stats.py
+"""
+Denormalized "effective stats" derived from a player's equipped slot items.
+
+The click/mining hot paths read PlayerProfile.effective_click_bonus,
+effective_luck and effective_mining_multiplier straight off the profile row
+instead of loading slot_1/2/3 and summing their buffs on every request.
+The columns are recomputed only when the inputs change: equip_slot, the
+prestige reset, and GameItem buff edits/deletes (via signals).
+"""
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+
+from . import catalog
+from .models import GameItem, PlayerProfile
+
+
+STAT_FIELDS = ['effective_click_bonus', 'effective_luck', 'effective_mining_multiplier']
+SLOT_FIELDS = ['slot_1_id', 'slot_2_id', 'slot_3_id']
+BUFF_FIELDS = ['buff_click_coins', 'buff_mining_speed', 'buff_luck']
+
+
+def compute_effective_stats(items):
+    """
+    Fold the buffs of equipped items into (click_bonus, luck, mining_multiplier).
+    """
+    click_bonus = 0
+    luck = 1.0
+    mining_multiplier = 1.0
+    for item in items:
+        click_bonus += item.buff_click_coins
+        if item.buff_luck > 0:
+            luck += (item.buff_luck / 100)
+        mining_multiplier += (item.buff_mining_speed / 100)
+    return click_bonus, luck, mining_multiplier
+
+
+def _slot_items(profile, items_by_id):
+    return [items_by_id[pk] for pk in (getattr(profile, f) for f in SLOT_FIELDS) if pk in items_by_id]
+
+
+def apply_effective_stats(profile, items_by_id=None):
+    """
+    Recompute the stat columns on an in-memory profile (not saved).
+    Slot items come from the item catalog unless `items_by_id` is given.
+    """
+    if items_by_id is None:
+        slot_ids = [pk for pk in (getattr(profile, f) for f in SLOT_FIELDS) if pk]
+        items_by_id = catalog.get_items(slot_ids) if slot_ids else {}
+    (profile.effective_click_bonus,
+     profile.effective_luck,
+     profile.effective_mining_multiplier) = compute_effective_stats(_slot_items(profile, items_by_id))
+    return profile
+
+
+def _recompute_profiles(queryset):
+    profiles = list(queryset.only('id', *SLOT_FIELDS, *STAT_FIELDS))
+    if not profiles:
+        return 0
+    slot_ids = {getattr(p, f) for p in profiles for f in SLOT_FIELDS} - {None}
+    items_by_id = GameItem.objects.in_bulk(slot_ids)
+    for profile in profiles:
+        apply_effective_stats(profile, items_by_id)
+    PlayerProfile.objects.bulk_update(profiles, STAT_FIELDS, batch_size=500)
+    return len(profiles)
+
+
+def _equipped_filter(item_ids):
+    return Q(slot_1_id__in=item_ids) | Q(slot_2_id__in=item_ids) | Q(slot_3_id__in=item_ids)
+
+
+def refresh_profiles_for_items(item_ids):
+    """
+    Recompute stats for every profile that has one of `item_ids` equipped.
+    """
+    item_ids = list(item_ids)
+    if not item_ids:
+        return 0
+    return _recompute_profiles(PlayerProfile.objects.filter(_equipped_filter(item_ids)))
+
+
+def _on_item_pre_save(sender, instance, update_fields=None, **kwargs):
+    instance._old_buff_fields = None
+    if instance.pk and (update_fields is None or set(update_fields) & set(BUFF_FIELDS)):
+        instance._old_buff_fields = GameItem.objects.filter(pk=instance.pk).values_list(*BUFF_FIELDS).first()
+
+
+def _on_item_saved(sender, instance, created, **kwargs):
+    # Stock changes on every purchase; only buff edits touch equipped players
+    old = getattr(instance, '_old_buff_fields', None)
+    if created or old is None:
+        return
+    if old != tuple(getattr(instance, field) for field in BUFF_FIELDS):
+        refresh_profiles_for_items([instance.pk])
+
+
+def _on_item_pre_delete(sender, instance, **kwargs):
+    # SET_NULL clears the slots before post_delete, so remember who had it equipped
+    instance._equipped_profile_ids = list(
+        PlayerProfile.objects.filter(_equipped_filter([instance.pk])).values_list('id', flat=True)
+    )
+
+
+def _on_item_deleted(sender, instance, **kwargs):
+    profile_ids = getattr(instance, '_equipped_profile_ids', None)
+    if profile_ids:
+        _recompute_profiles(PlayerProfile.objects.filter(id__in=profile_ids))
+
+
+def setup_effective_stats_signals():
+    """
+    Connect GameItem signals that keep equipped players' stats current.
+    Called from the app's ready() method.
+    """
+    pre_save.connect(_on_item_pre_save, sender=GameItem, dispatch_uid='effective_stats_item_pre_save')
+    post_save.connect(_on_item_saved, sender=GameItem, dispatch_uid='effective_stats_item_saved')
+    pre_delete.connect(_on_item_pre_delete, sender=GameItem, dispatch_uid='effective_stats_item_pre_delete')
+    post_delete.connect(_on_item_deleted, sender=GameItem, dispatch_uid='effective_stats_item_deleted')
@@ -0,0 +1,115 @@
+# game/item_search.py
+"""
+In-memory trigram search over the item catalog.
+
+Item names and codes are normalized (Arabic ي/ى/ك → Persian ی/ک, ZWNJ and
+tatweel removed, diacritics stripped, Persian/Arabic digits → ASCII,
+casefolded) and their trigrams are mapped to the records containing them.
+A query is normalized the same way; its trigrams narrow the candidates with
+set intersections, every query word must then occur in the item's text, and
+the matches are ranked: exact name, name prefix, word prefix, code prefix,
+then plain substring matches.
+
+The index is immutable and built per catalog snapshot (game/catalog.py).
+"""
+import re
+import unicodedata
+
+
+_CHAR_MAP = str.maketrans({
+    'ي': 'ی', 'ى': 'ی',
+    'ك': 'ک',
+    'ة': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    '\u200c': ' ',  # ZWNJ: "می‌شود" matches "میشود" and "می شود" once joined below
+    '\u200d': None,  # ZWJ
+    '\u0640': None,  # tatweel
+    **{chr(0x06F0 + d): str(d) for d in range(10)},  # Persian digits
+    **{chr(0x0660 + d): str(d) for d in range(10)},  # Arabic-Indic digits
+})
+
+_WORD_RE = re.compile(r'\w+')
+
+# Rank of a match; higher is better
+EXACT_NAME = 100
+NAME_PREFIX = 50
+CODE_PREFIX = 40
+WORD_PREFIX = 10  # per query word
+SUBSTRING = 1
+
+
+def normalize(text):
+    """Canonical form used on both sides of a search."""
+    text = unicodedata.normalize('NFKC', text or '').translate(_CHAR_MAP)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')  # diacritics
+    return ' '.join(_WORD_RE.findall(text.casefold()))
+
+
+def _trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def _joined(text):
+    # ZWNJ-separated parts of a word are also indexed glued together
+    return text.replace(' ', '')
+
+
+class SearchIndex:
+    """
+    Trigram postings over `records` (anything with id, name and item_code).
+    """
+    __slots__ = ('records', 'names', 'codes', 'texts', 'postings')
+
+    def __init__(self, records):
+        self.records = tuple(records)
+        self.names = [normalize(r.name) for r in self.records]
+        self.codes = [normalize(r.item_code) for r in self.records]
+        self.texts = [f'{name} {code} {_joined(name)}' for name, code in zip(self.names, self.codes)]
+        postings = {}
+        for position, text in enumerate(self.texts):
+            for word in text.split():
+                for gram in _trigrams(word):
+                    postings.setdefault(gram, set()).add(position)
+        self.postings = {gram: frozenset(positions) for gram, positions in postings.items()}
+
+    def _candidates(self, words):
+        candidates = None
+        for word in words:
+            grams = _trigrams(word)
+            if not grams:
+                continue  # too short to narrow down; checked on the candidates
+            for gram in grams:
+                positions = self.postings.get(gram, frozenset())
+                candidates = positions if candidates is None else candidates & positions
+                if not candidates:
+                    return frozenset()
+        return range(len(self.records)) if candidates is None else candidates
+
+    def _score(self, position, query, words):
+        name, code = self.names[position], self.codes[position]
+        if name == query:
+            return EXACT_NAME
+        score = SUBSTRING
+        if name.startswith(query):
+            score += NAME_PREFIX
+        if code.startswith(query.replace(' ', '')):
+            score += CODE_PREFIX
+        name_words = name.split()
+        score += WORD_PREFIX * sum(any(w.startswith(word) for w in name_words) for word in words)
+        return score
+
+    def search(self, query, limit=None):
+        """Records matching every word of `query`, best first."""
+        query = normalize(query)
+        words = query.split()
+        if not words:
+            return []
+        matches = []
+        for position in self._candidates(words):
+            text = self.texts[position]
+            if all(word in text for word in words):
+                record = self.records[position]
+                matches.append((-self._score(position, query, words), len(record.name), record.id, record))
+        matches.sort(key=lambda match: match[:3])
+        results = [match[3] for match in matches]
+        return results[:limit] if limit else results
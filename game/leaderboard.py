@@ -0,0 +1,250 @@
+# game/leaderboard.py
+"""
+Diamond leaderboard kept in a sorted structure.
+
+Scores are updated incrementally whenever a profile's diamonds change
+(post_save, plus explicit calls after bulk writes), so top-N, "my rank"
+and "players around me" are O(log n) lookups instead of
+`order_by('-diamonds')` over the whole PlayerProfile table.
+
+Two backends are available:
+- 'local': in-process sorted list maintained with bisect. Rebuilt from
+  the database on first use and every LOCAL_TTL seconds, which bounds
+  drift from writes made by other worker processes.
+- 'redis': a shared ZSET through django-redis. Requires the default
+  cache to be a django_redis backend.
+
+Ranks are 1-based. Ties are broken by profile id on the local backend
+and by Redis' member ordering on the redis backend.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import PlayerProfile
+
+
+DEFAULTS = {
+    'BACKEND': 'local',
+    'LOCAL_TTL': 300,  # seconds
+}
+
+Entry = namedtuple('Entry', ['rank', 'profile_id', 'diamonds'])
+
+
+class LocalLeaderboard:
+    """
+    Sorted list of (-diamonds, profile_id) plus a profile_id -> diamonds map.
+    """
+
+    def __init__(self, ttl):
+        self._lock = threading.Lock()
+        self._ttl = ttl
+        self._keys = []
+        self._scores = {}
+        self._built_at = None
+
+    def _ensure_built(self):
+        if self._built_at is not None and time.monotonic() - self._built_at <= self._ttl:
+            return
+        rows = PlayerProfile.objects.values_list('id', 'diamonds').iterator(chunk_size=5000)
+        scores = dict(rows)
+        with self._lock:
+            self._scores = scores
+            self._keys = sorted((-diamonds, pk) for pk, diamonds in scores.items())
+            self._built_at = time.monotonic()
+
+    def update(self, scores):
+        with self._lock:
+            if self._built_at is None:
+                return  # applied by the initial build
+            for pk, diamonds in scores.items():
+                self._discard(pk)
+                self._scores[pk] = diamonds
+                insort(self._keys, (-diamonds, pk))
+
+    def remove(self, profile_id):
+        with self._lock:
+            self._discard(profile_id)
+
+    def _discard(self, profile_id):
+        old = self._scores.pop(profile_id, None)
+        if old is not None:
+            i = bisect_left(self._keys, (-old, profile_id))
+            if i < len(self._keys) and self._keys[i] == (-old, profile_id):
+                del self._keys[i]
+
+    def top(self, count, offset=0):
+        self._ensure_built()
+        with self._lock:
+            window = self._keys[offset:offset + count]
+        return [Entry(offset + i + 1, pk, -neg) for i, (neg, pk) in enumerate(window)]
+
+    def rank(self, profile_id):
+        self._ensure_built()
+        with self._lock:
+            diamonds = self._scores.get(profile_id)
+            if diamonds is None:
+                return None
+            return Entry(bisect_left(self._keys, (-diamonds, profile_id)) + 1, profile_id, diamonds)
+
+    def size(self):
+        self._ensure_built()
+        return len(self._keys)
+
+    def reset(self):
+        with self._lock:
+            self._built_at = None
+
+
+class RedisLeaderboard:
+    """
+    Shared ZSET `lb:diamonds` scored by diamonds. A marker key records that
+    the set has been built from the database.
+    """
+
+    KEY = 'lb:diamonds'
+    BUILT_KEY = 'lb:diamonds:built'
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+        self._redis = get_redis_connection('default')
+
+    def _ensure_built(self):
+        if self._redis.exists(self.BUILT_KEY):
+            return
+        pipe = self._redis.pipeline()
+        pipe.delete(self.KEY)
+        batch = {}
+        for pk, diamonds in PlayerProfile.objects.values_list('id', 'diamonds').iterator(chunk_size=5000):
+            batch[pk] = diamonds
+            if len(batch) == 5000:
+                pipe.zadd(self.KEY, batch)
+                batch = {}
+        if batch:
+            pipe.zadd(self.KEY, batch)
+        pipe.set(self.BUILT_KEY, 1)
+        pipe.execute()
+
+    def update(self, scores):
+        if scores:
+            self._redis.zadd(self.KEY, scores)
+
+    def remove(self, profile_id):
+        self._redis.zrem(self.KEY, profile_id)
+
+    def top(self, count, offset=0):
+        self._ensure_built()
+        rows = self._redis.zrevrange(self.KEY, offset, offset + count - 1, withscores=True)
+        return [Entry(offset + i + 1, int(pk), int(score)) for i, (pk, score) in enumerate(rows)]
+
+    def rank(self, profile_id):
+        self._ensure_built()
+        pipe = self._redis.pipeline()
+        pipe.zrevrank(self.KEY, profile_id)
+        pipe.zscore(self.KEY, profile_id)
+        rank, score = pipe.execute()
+        if rank is None:
+            return None
+        return Entry(rank + 1, profile_id, int(score))
+
+    def size(self):
+        self._ensure_built()
+        return self._redis.zcard(self.KEY)
+
+    def reset(self):
+        self._redis.delete(self.BUILT_KEY)
+
+
+_board = None
+_board_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'GAME_LEADERBOARD', {})}
+
+
+def get_leaderboard():
+    """Process-wide leaderboard built from settings.GAME_LEADERBOARD."""
+    global _board
+    if _board is None:
+        with _board_lock:
+            if _board is None:
+                config = get_config()
+                _board = RedisLeaderboard() if config['BACKEND'] == 'redis' else LocalLeaderboard(config['LOCAL_TTL'])
+    return _board
+
+
+def top(count, offset=0):
+    return get_leaderboard().top(count, offset)
+
+
+def rank(profile_id):
+    return get_leaderboard().rank(profile_id)
+
+
+def around(profile_id, radius=5):
+    """Entries from `radius` places above to `radius` places below the player."""
+    me = rank(profile_id)
+    if me is None:
+        return []
+    start = max(me.rank - 1 - radius, 0)
+    return top(me.rank - start + radius, start)
+
+
+class RankedSequence:
+    """
+    Lazy, sliceable view of the whole ranking, so Django/DRF paginators can
+    page through it: len() is the player count and a slice is one top() call.
+    """
+
+    def __len__(self):
+        return get_leaderboard().size()
+
+    def count(self):
+        return len(self)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start = index.start or 0
+            stop = len(self) if index.stop is None else index.stop
+            return top(max(stop - start, 0), start)
+        return top(1, index)[0]
+
+
+def hydrate(entries, related=('user',)):
+    """Attach profiles to `entries` in one query: [(entry, profile)]."""
+    profiles = PlayerProfile.objects.select_related(*related).in_bulk([e.profile_id for e in entries])
+    return [(e, profiles[e.profile_id]) for e in entries if e.profile_id in profiles]
+
+
+def record_scores(scores):
+    """
+    Push {profile_id: diamonds} into the leaderboard once the current
+    transaction commits. Call after bulk writes that bypass post_save.
+    """
+    if scores:
+        transaction.on_commit(lambda: get_leaderboard().update(scores))
+
+
+def _on_profile_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'diamonds' in update_fields:
+        record_scores({instance.pk: instance.diamonds})
+
+
+def _on_profile_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: get_leaderboard().remove(instance.pk))
+
+
+def setup_leaderboard_signals():
+    """
+    Keep the leaderboard in step with PlayerProfile.diamonds.
+    Called from the app's ready() method.
+    """
+    post_save.connect(_on_profile_saved, sender=PlayerProfile, dispatch_uid='leaderboard_profile_saved')
+    post_delete.connect(_on_profile_deleted, sender=PlayerProfile, dispatch_uid='leaderboard_profile_deleted')
@@ -0,0 +1,97 @@
+# game/leaderboard_snapshots.py
+"""
+Materialized leaderboards for coins, mining power, click level and prestige.
+
+A periodic job (`manage.py build_leaderboard_snapshots`) streams the
+profiles of each category in ranking order and writes them to
+LeaderboardSnapshot with precomputed rank numbers, replacing the previous
+snapshot of that category in one transaction. Reads never sort or count
+the profile table:
+- page N is a range read on the (category, rank) unique index,
+- a player's ranks in every category are one indexed lookup by player.
+
+The diamond ranking stays live in game/leaderboard.py.
+"""
+import time
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import LeaderboardSnapshot, PlayerProfile
+
+
+CATEGORIES = {
+    # category: (value expression, ordering after value; ties fall back to id)
+    'coins': (F('coins'), ()),
+    'mining_power': (F('mining_power'), ()),
+    'click_level': (F('click_level'), (F('click_xp').desc(),)),
+    'prestige': (
+        Coalesce(F('prestige__prestige_count'), Value(0)),
+        (Coalesce(F('prestige__prestige_multiplier'), Value(1.0)).desc(),),
+    ),
+}
+
+BATCH_SIZE = 2000
+
+SnapshotStats = namedtuple('SnapshotStats', ['category', 'rows', 'seconds'])
+
+
+def _ranked_rows(category):
+    value, tie_breakers = CATEGORIES[category]
+    return (
+        PlayerProfile.objects.annotate(score=value)
+        .order_by(F('score').desc(), *tie_breakers, 'pk')
+        .values_list('pk', 'user__username', 'score')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+@transaction.atomic
+def build_snapshot(category, now=None):
+    """Replace the snapshot of `category` with a freshly ranked one."""
+    started = time.monotonic()
+    now = now or timezone.now()
+    LeaderboardSnapshot.objects.filter(category=category).delete()
+    batch, rows = [], 0
+    for rank, (profile_id, username, score) in enumerate(_ranked_rows(category), 1):
+        batch.append(LeaderboardSnapshot(
+            category=category, rank=rank, player_id=profile_id,
+            username=username, value=score or 0, generated_at=now,
+        ))
+        if len(batch) == BATCH_SIZE:
+            LeaderboardSnapshot.objects.bulk_create(batch)
+            rows += len(batch)
+            batch = []
+    LeaderboardSnapshot.objects.bulk_create(batch)
+    rows += len(batch)
+    return SnapshotStats(category, rows, time.monotonic() - started)
+
+
+def build_all(categories=None, now=None):
+    now = now or timezone.now()
+    return [build_snapshot(category, now) for category in (categories or CATEGORIES)]
+
+
+def get_page(category, page=1, page_size=20):
+    """Rows ranked ((page - 1) * page_size + 1) .. (page * page_size)."""
+    first = (page - 1) * page_size + 1
+    return list(
+        LeaderboardSnapshot.objects.filter(category=category, rank__range=(first, first + page_size - 1))
+        .order_by('rank')
+    )
+
+
+def get_size(category):
+    """Number of ranked players: the highest rank, read off the index."""
+    return (
+        LeaderboardSnapshot.objects.filter(category=category)
+        .order_by('-rank').values_list('rank', flat=True).first()
+    ) or 0
+
+
+def get_player_ranks(profile_id):
+    """{category: LeaderboardSnapshot} for one player, in one query."""
+    return {row.category: row for row in LeaderboardSnapshot.objects.filter(player_id=profile_id)}
@@ -0,0 +1,59 @@
+# game/level_curve.py
+"""
+Click level curve.
+
+Every level costs int(previous_cost * 1.35) XP, starting at 100 XP for
+level 1 -> 2. The per-level costs and their running totals are computed
+once at import, so resolving any XP gain into level-ups is a binary
+search instead of a loop that runs while the profile row is locked.
+"""
+from bisect import bisect_right
+
+
+BASE_XP_TO_NEXT = 100
+XP_GROWTH = 1.35
+MAX_LEVEL = 200
+
+
+def _build_curve():
+    costs = [0, BASE_XP_TO_NEXT]  # costs[L] = XP needed to go from L to L + 1
+    for _ in range(MAX_LEVEL - 1):
+        costs.append(int(costs[-1] * XP_GROWTH))
+    cumulative = [0]  # cumulative[L - 1] = total XP needed to reach level L
+    for level in range(1, MAX_LEVEL):
+        cumulative.append(cumulative[-1] + costs[level])
+    return tuple(costs), tuple(cumulative)
+
+
+_XP_TO_NEXT, _CUMULATIVE_XP = _build_curve()
+
+
+def xp_to_next(level):
+    """XP needed to go from `level` to `level + 1`."""
+    return _XP_TO_NEXT[min(max(level, 1), MAX_LEVEL)]
+
+
+def total_xp_for_level(level):
+    """Total XP earned from level 1 needed to reach `level`."""
+    return _CUMULATIVE_XP[min(max(level, 1), MAX_LEVEL) - 1]
+
+
+def resolve(level, xp):
+    """
+    Resolve `xp` banked at `level` into (level, xp_into_level, xp_to_next).
+    """
+    total = total_xp_for_level(level) + xp
+    new_level = min(bisect_right(_CUMULATIVE_XP, total), MAX_LEVEL)
+    return new_level, total - total_xp_for_level(new_level), xp_to_next(new_level)
+
+
+def apply_xp(profile, amount=0):
+    """
+    Add `amount` click XP to a profile and apply any level-ups in place.
+    Returns the number of levels gained.
+    """
+    previous_level = profile.click_level
+    profile.click_level, profile.click_xp, profile.click_xp_to_next = resolve(
+        previous_level, profile.click_xp + amount
+    )
+    return profile.click_level - previous_level
@@ -0,0 +1,59 @@
+# game/management/commands/bench_catalog.py
+"""
+Compare building the shop payload from GameItem model instances (one query
+and a fresh list of dicts per request) with reading it off the catalog
+snapshot: time, queries and peak allocated memory per request.
+"""
+import json
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from game import catalog
+from game.models import GameItem
+
+
+def _shop_json_from_models():
+    items = []
+    for item in GameItem.objects.filter(price_diamonds__gt=0, is_hidden_in_shop=False).exclude(item_type='ENERGY'):
+        entry = {field: getattr(item, field) for field in catalog.SHOP_FIELDS}
+        if item.image:
+            entry['image_url'] = item.image.url
+        items.append(entry)
+    return json.dumps(items)
+
+
+def _shop_json_from_snapshot():
+    return catalog.shop_json()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the shop payload: model instances vs the catalog snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Simulated requests per variant')
+
+    def _measure(self, label, build, requests):
+        build()  # warm up (the snapshot is built here)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(requests):
+                build()
+            elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        build()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{label:<10} {elapsed / requests * 1e6:10.1f} us/request '
+            f'{len(queries) / requests:6.2f} queries/request {peak / 1024:10.1f} KiB peak'
+        )
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        self.stdout.write(f'{len(catalog.get_snapshot())} items, {requests} requests per variant')
+        self._measure('models', _shop_json_from_models, requests)
+        self._measure('snapshot', _shop_json_from_snapshot, requests)
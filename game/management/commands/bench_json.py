@@ -0,0 +1,62 @@
+# game/management/commands/bench_json.py
+"""
+Compare DRF's stdlib JSONRenderer with FastJSONRenderer on the largest
+API payloads: the shop list, the leaderboard top 100 and the biggest
+player inventory.
+"""
+import time
+
+from django.db.models import Count
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from game import catalog, leaderboard
+from game.models import Inventory
+from game.renderers import FastJSONRenderer, use_orjson
+from game.serializers import CatalogItemSerializer, InventorySerializer
+
+
+def _payloads():
+    top = [
+        {
+            'rank': entry.rank, 'id': player.id, 'username': player.user.username,
+            'diamonds': player.diamonds, 'coins': player.coins, 'mining_power': player.mining_power,
+        }
+        for entry, player in leaderboard.hydrate(leaderboard.top(100))
+    ]
+    biggest = (
+        Inventory.objects.values('player_id').annotate(rows=Count('id'))
+        .order_by('-rows').values_list('player_id', flat=True).first()
+    )
+    inventory = Inventory.objects.filter(player_id=biggest).select_related('item')
+    return {
+        'shop list': CatalogItemSerializer(catalog.shop_items(), many=True).data,
+        'leaderboard top 100': {'count': len(top), 'next': None, 'previous': None, 'results': top},
+        'inventory': InventorySerializer(inventory, many=True).data,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark API JSON rendering: stdlib JSONRenderer vs FastJSONRenderer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=500, help='Renders per payload and renderer')
+
+    def _time(self, renderer, data, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            body = renderer.render(data)
+        return (time.perf_counter() - started) / repeat * 1e6, body
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        self.stdout.write(f"encoder: {'orjson' if use_orjson() else 'stdlib'}, {repeat} renders each")
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        for name, data in _payloads().items():
+            stdlib_us, stdlib_body = self._time(stdlib, data, repeat)
+            fast_us, fast_body = self._time(fast, data, repeat)
+            self.stdout.write(
+                f'{name:<20} {len(data) if isinstance(data, list) else len(data["results"]):5} rows '
+                f'{len(stdlib_body) / 1024:8.1f} KiB  stdlib {stdlib_us:9.1f} us  fast {fast_us:9.1f} us  '
+                f'x{stdlib_us / fast_us:5.1f}' + ('' if fast_body == stdlib_body else '  (bytes differ)')
+            )
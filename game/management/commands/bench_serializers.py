@@ -0,0 +1,64 @@
+# game/management/commands/bench_serializers.py
+"""
+Compare three ways of serializing a PlayerProfile, in time and queries per
+profile:
+- baseline: the original PlayerProfileSerializer, which aggregated
+  mining_power over the player's inventory on every call,
+- serializer: PlayerProfileSerializer as it is now (stored mining_power,
+  one lazy item query per equipped FK),
+- lean: the hand-written lean_profile_data().
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F, Sum
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+
+from game import catalog
+from game.models import Inventory, PlayerProfile
+from game.serializers import PlayerProfileSerializer, lean_profile_data
+
+
+class BaselinePlayerProfileSerializer(PlayerProfileSerializer):
+    """PlayerProfileSerializer before mining_power was stored on the profile."""
+    mining_power = serializers.SerializerMethodField()
+
+    def get_mining_power(self, obj):
+        result = Inventory.objects.filter(
+            player=obj, item__item_type='MINER', is_active=True
+        ).aggregate(total=Sum(F('item__mining_rate') * F('quantity')))
+        return result.get('total') or 0
+
+
+class Command(BaseCommand):
+    help = 'Benchmark profile serialization: baseline serializer vs PlayerProfileSerializer vs lean_profile_data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=200, help='Profiles to serialize per round')
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def _measure(self, label, serialize, profile_ids, rounds):
+        elapsed, queries = 0.0, 0
+        for _ in range(rounds):
+            # Fresh instances each round, as a request would have
+            profiles = list(PlayerProfile.objects.select_related('user').filter(pk__in=profile_ids))
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                for profile in profiles:
+                    serialize(profile)
+                elapsed += time.perf_counter() - started
+            queries += len(captured)
+        count = len(profile_ids) * rounds
+        self.stdout.write(f'{label:<12} {elapsed / count * 1e6:10.1f} us/profile {queries / count:6.2f} queries/profile')
+
+    def handle(self, *args, **options):
+        profile_ids = list(PlayerProfile.objects.order_by('pk').values_list('pk', flat=True)[:options['profiles']])
+        if not profile_ids:
+            raise CommandError('No player profiles to serialize.')
+        catalog_ref = {'url': '/api/shop/catalog/', 'etag': catalog.items_payload().etag}
+        self.stdout.write(f'{len(profile_ids)} profiles x {options["rounds"]} rounds')
+        self._measure('baseline', lambda p: BaselinePlayerProfileSerializer(p).data, profile_ids, options['rounds'])
+        self._measure('serializer', lambda p: PlayerProfileSerializer(p).data, profile_ids, options['rounds'])
+        self._measure('lean', lambda p: lean_profile_data(p, catalog_ref), profile_ids, options['rounds'])
@@ -0,0 +1,32 @@
+# game/management/commands/build_leaderboard_snapshots.py
+"""
+Rebuild the materialized coins/mining power/click level/prestige leaderboards.
+Run once from cron/systemd timer, or keep it running with --loop.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from game import leaderboard_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Rebuild leaderboard snapshot tables with precomputed ranks'
+
+    def add_arguments(self, parser):
+        config = getattr(settings, 'GAME_LEADERBOARD_SNAPSHOTS', {})
+        parser.add_argument('--category', action='append', choices=list(leaderboard_snapshots.CATEGORIES),
+                            help='Only rebuild this category (repeatable)')
+        parser.add_argument('--loop', action='store_true', help='Run forever, sleeping --interval between runs')
+        parser.add_argument('--interval', type=int, default=config.get('INTERVAL', 600), help='Seconds between runs')
+
+    def handle(self, *args, **options):
+        while True:
+            for stats in leaderboard_snapshots.build_all(options['category']):
+                self.stdout.write(self.style.SUCCESS(
+                    f'{stats.category}: ranked {stats.rows} players in {stats.seconds:.2f}s'
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,19 @@
+# game/management/commands/flush_write_behind.py
+"""
+Flush buffered click deltas to PlayerProfile.
+Run from cron/systemd timer when using the shared 'redis' write-behind backend.
+"""
+from django.core.management.base import BaseCommand
+
+from game import write_behind
+
+
+class Command(BaseCommand):
+    help = 'Flush pending write-behind click deltas to the database'
+
+    def handle(self, *args, **options):
+        if not write_behind.is_enabled():
+            self.stdout.write('Write-behind buffering is disabled; nothing to flush.')
+            return
+        updated = write_behind.get_buffer().flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed pending deltas for {updated} profiles.'))
@@ -0,0 +1,16 @@
+# game/management/commands/rebuild_market_depth.py
+"""
+Recompute every item's MarketDepth summary from the open listings.
+Use after bulk listing imports or raw SQL edits that bypass the signals.
+"""
+from django.core.management.base import BaseCommand
+
+from game.order_book import rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-item market depth summaries (count, min, median price)'
+
+    def handle(self, *args, **options):
+        items = rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt market depth for {items} items.'))
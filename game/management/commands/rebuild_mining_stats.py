@@ -0,0 +1,27 @@
+# game/management/commands/rebuild_mining_stats.py
+"""
+Recompute the persisted mining_power / mining_consumption columns.
+Use after bulk inventory imports or raw SQL edits that bypass the signals.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from game.mining_stats import refresh_mining_stats
+from game.models import PlayerProfile
+
+
+class Command(BaseCommand):
+    help = 'Rebuild persisted mining power/consumption for all players'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Profiles per UPDATE statement')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        ids = list(PlayerProfile.objects.order_by('pk').values_list('pk', flat=True))
+        updated = 0
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            with transaction.atomic():
+                updated += refresh_mining_stats(PlayerProfile.objects.filter(pk__range=(chunk[0], chunk[-1])))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt mining stats for {updated} profiles.'))
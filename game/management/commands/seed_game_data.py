@@ -0,0 +1,21 @@
+# game/management/commands/seed_game_data.py
+"""
+Sync default achievements and daily quests into the database.
+Runs automatically after `migrate`; a no-op when the defaults are unchanged.
+"""
+from django.core.management.base import BaseCommand
+
+from game.seeding import seed_game_data
+
+
+class Command(BaseCommand):
+    help = 'Seed default achievements and quests (skipped when their version hash is unchanged)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-sync even if the stored hash matches')
+
+    def handle(self, *args, **options):
+        if seed_game_data(force=options['force']):
+            self.stdout.write(self.style.SUCCESS('Default game data synced.'))
+        else:
+            self.stdout.write('Default game data already up to date.')
@@ -0,0 +1,45 @@
+# game/management/commands/settle_mining.py
+"""
+Settle offline mining income for every player with active miners.
+Run once from cron/systemd timer, or keep it running with --loop.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from game import mining
+
+
+class Command(BaseCommand):
+    help = 'Settle pending mining income for all players in chunks and report throughput'
+
+    def add_arguments(self, parser):
+        config = getattr(settings, 'GAME_MINING_SETTLEMENT', {})
+        parser.add_argument('--chunk-size', type=int, default=config.get('CHUNK_SIZE', 500))
+        parser.add_argument('--loop', action='store_true', help='Run forever, sleeping --interval between runs')
+        parser.add_argument('--interval', type=int, default=config.get('INTERVAL', 900), help='Seconds between runs')
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_once(options['chunk_size'], options['verbosity'])
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def run_once(self, chunk_size, verbosity):
+        def report(totals):
+            if verbosity > 1:
+                self.stdout.write(f'  {totals.scanned} scanned, {totals.settled} settled, '
+                                  f'{self.rate(totals):.0f} profiles/s')
+
+        totals = mining.settle_all(chunk_size=chunk_size, on_chunk=report)
+        self.stdout.write(self.style.SUCCESS(
+            f'Settled {totals.settled}/{totals.scanned} profiles in {totals.seconds:.2f}s '
+            f'({self.rate(totals):.0f} profiles/s): +{totals.coins:,} coins, +{totals.diamonds} diamonds'
+        ))
+        return totals
+
+    @staticmethod
+    def rate(totals):
+        return totals.scanned / totals.seconds if totals.seconds else 0.0
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:04
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def backfill_effective_stats(apps, schema_editor):
+    PlayerProfile = apps.get_model('game', 'PlayerProfile')
+    GameItem = apps.get_model('game', 'GameItem')
+    profiles = list(PlayerProfile.objects.filter(
+        Q(slot_1__isnull=False) | Q(slot_2__isnull=False) | Q(slot_3__isnull=False)
+    ))
+    slot_ids = {pk for p in profiles for pk in (p.slot_1_id, p.slot_2_id, p.slot_3_id) if pk}
+    items = GameItem.objects.in_bulk(slot_ids)
+    for profile in profiles:
+        slot_items = [items[pk] for pk in (profile.slot_1_id, profile.slot_2_id, profile.slot_3_id) if pk in items]
+        profile.effective_click_bonus = sum(item.buff_click_coins for item in slot_items)
+        profile.effective_luck = 1.0 + sum(item.buff_luck / 100 for item in slot_items if item.buff_luck > 0)
+        profile.effective_mining_multiplier = 1.0 + sum(item.buff_mining_speed / 100 for item in slot_items)
+    PlayerProfile.objects.bulk_update(
+        profiles, ['effective_click_bonus', 'effective_luck', 'effective_mining_multiplier'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_prestigemultiplier_prestigereward'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerprofile',
+            name='effective_click_bonus',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playerprofile',
+            name='effective_luck',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AddField(
+            model_name='playerprofile',
+            name='effective_mining_multiplier',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.RunPython(backfill_effective_stats, migrations.RunPython.noop),
+    ]
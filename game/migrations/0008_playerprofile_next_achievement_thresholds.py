@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_playerprofile_effective_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerprofile',
+            name='next_achievement_coins',
+            field=models.BigIntegerField(blank=True, default=0, null=True),
+        ),
+        migrations.AddField(
+            model_name='playerprofile',
+            name='next_achievement_diamonds',
+            field=models.IntegerField(blank=True, default=0, null=True),
+        ),
+        migrations.AddField(
+            model_name='playerprofile',
+            name='next_achievement_miners',
+            field=models.IntegerField(blank=True, default=0, null=True),
+        ),
+    ]
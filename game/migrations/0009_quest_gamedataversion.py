@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_playerprofile_next_achievement_thresholds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameDataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('digest', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Quest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50, unique=True)),
+                ('title', models.CharField(max_length=100)),
+                ('quest_type', models.CharField(choices=[('CLICK', 'Click'), ('MINE', 'Mine')], max_length=10)),
+                ('goal', models.IntegerField(default=0)),
+                ('reward_coins', models.IntegerField(default=0)),
+                ('reward_diamonds', models.IntegerField(default=0)),
+                ('reward_xp', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
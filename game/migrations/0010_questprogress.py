@@ -0,0 +1,59 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_todays_progress(apps, schema_editor):
+    # Older days reset lazily now, so only today's UserQuest state is worth keeping
+    UserQuest = apps.get_model('game', 'UserQuest')
+    Quest = apps.get_model('game', 'Quest')
+    QuestProgress = apps.get_model('game', 'QuestProgress')
+    today = timezone.now().date()
+    rows = list(UserQuest.objects.filter(reset_at=today))
+    quests = {q.code: q for q in Quest.objects.all()}
+    for uq in rows:
+        if uq.code not in quests:
+            quests[uq.code] = Quest.objects.create(
+                code=uq.code, title=uq.title, quest_type=uq.quest_type, goal=uq.goal,
+                reward_coins=uq.reward_coins, reward_diamonds=uq.reward_diamonds, reward_xp=uq.reward_xp,
+            )
+    QuestProgress.objects.bulk_create([
+        QuestProgress(
+            user_id=uq.user_id, quest=quests[uq.code], day=today,
+            goal=uq.goal, progress=min(uq.progress, uq.goal), completed=uq.completed,
+        )
+        for uq in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0009_quest_gamedataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('goal', models.IntegerField(default=0)),
+                ('progress', models.IntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('quest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='game.quest')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'quest', 'day')},
+            },
+        ),
+        migrations.RunPython(copy_todays_progress, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='UserQuest',
+        ),
+    ]
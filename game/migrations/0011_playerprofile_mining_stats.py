@@ -0,0 +1,42 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:14
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_mining_stats(apps, schema_editor):
+    PlayerProfile = apps.get_model('game', 'PlayerProfile')
+    Inventory = apps.get_model('game', 'Inventory')
+
+    def active_miner_sum(expression):
+        totals = Inventory.objects.filter(
+            player=OuterRef('pk'), item__item_type='MINER', is_active=True
+        ).order_by().values('player').annotate(total=Sum(expression)).values('total')
+        return Coalesce(Subquery(totals), 0)
+
+    PlayerProfile.objects.update(
+        mining_power=active_miner_sum(F('item__mining_rate') * F('quantity')),
+        mining_consumption=active_miner_sum(F('item__electricity_consumption') * F('quantity')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0010_questprogress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerprofile',
+            name='mining_consumption',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playerprofile',
+            name='mining_power',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_mining_stats, migrations.RunPython.noop),
+    ]
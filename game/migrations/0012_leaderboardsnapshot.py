@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0011_playerprofile_mining_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('coins', 'Coins'), ('mining_power', 'Mining Power'), ('click_level', 'Click Level'), ('prestige', 'Prestige')], max_length=20)),
+                ('rank', models.IntegerField()),
+                ('username', models.CharField(max_length=150)),
+                ('value', models.BigIntegerField(default=0)),
+                ('generated_at', models.DateTimeField()),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_ranks', to='game.playerprofile')),
+            ],
+            options={
+                'unique_together': {('category', 'player'), ('category', 'rank')},
+            },
+        ),
+    ]
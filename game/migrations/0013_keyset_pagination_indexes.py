@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0012_leaderboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['player', 'quantity', 'id'], name='inventory_player_qty_id'),
+        ),
+        migrations.AddIndex(
+            model_name='marketlisting',
+            index=models.Index(fields=['created_at', 'id'], name='marketlisting_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='userachievement',
+            index=models.Index(fields=['player', 'achieved_at', 'id'], name='userachievement_player_at_id'),
+        ),
+    ]
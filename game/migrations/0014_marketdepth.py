@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def backfill_market_depth(apps, schema_editor):
+    MarketListing = apps.get_model('game', 'MarketListing')
+    MarketDepth = apps.get_model('game', 'MarketDepth')
+
+    depths = []
+    for row in MarketListing.objects.order_by().values('item_id').annotate(count=Count('id'), low=Min('price')):
+        count = row['count']
+        prices = MarketListing.objects.filter(item_id=row['item_id']).order_by('price').values_list('price', flat=True)
+        middle = list(prices[(count - 1) // 2:count // 2 + 1])
+        depths.append(MarketDepth(
+            item_id=row['item_id'], listing_count=count, min_price=row['low'],
+            median_price=sum(middle) / len(middle),
+        ))
+    MarketDepth.objects.bulk_create(depths, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0013_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketDepth',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='market_depth', serialize=False, to='game.gameitem')),
+                ('listing_count', models.IntegerField(default=0)),
+                ('min_price', models.IntegerField(blank=True, null=True)),
+                ('median_price', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='marketlisting',
+            index=models.Index(fields=['item', 'price', 'created_at'], name='marketlisting_item_price_at'),
+        ),
+        migrations.RunPython(backfill_market_depth, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:44
+
+from django.db import migrations, models
+
+
+def backfill_midpoints(apps, schema_editor):
+    MarketListing = apps.get_model('game', 'MarketListing')
+    MarketDepth = apps.get_model('game', 'MarketDepth')
+
+    for depth in MarketDepth.objects.all():
+        keys = MarketListing.objects.filter(item_id=depth.item_id).order_by('price', 'created_at', 'id')
+        mid = keys.values_list('price', 'created_at', 'id')[(depth.listing_count - 1) // 2:][:1]
+        if mid:
+            depth.mid_price, depth.mid_created_at, depth.mid_listing_id = mid[0]
+            depth.save(update_fields=['mid_price', 'mid_created_at', 'mid_listing_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0014_marketdepth'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketdepth',
+            name='mid_created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketdepth',
+            name='mid_listing_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketdepth',
+            name='mid_price',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_midpoints, migrations.RunPython.noop),
+    ]
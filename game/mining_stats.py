@@ -0,0 +1,82 @@
+# game/mining_stats.py
+"""
+Persisted mining aggregates on PlayerProfile.
+
+mining_power (SUM(mining_rate * quantity)) and mining_consumption
+(SUM(electricity_consumption * quantity)) over a player's active miners
+are stored on the profile, so reads are a column fetch and the power
+leaderboard can use an index. They are recomputed with one correlated
+UPDATE, inside the same transaction, whenever:
+- an Inventory row is saved or deleted (quantity / is_active changes),
+- a MINER GameItem is edited (rate / consumption changes).
+
+`manage.py rebuild_mining_stats` recomputes every profile in bulk.
+"""
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import GameItem, Inventory, PlayerProfile
+
+
+STAT_FIELDS = ['mining_power', 'mining_consumption']
+
+
+def _active_miner_sum(expression):
+    totals = Inventory.objects.filter(
+        player=OuterRef('pk'), item__item_type='MINER', is_active=True
+    ).order_by().values('player').annotate(total=Sum(expression)).values('total')
+    return Coalesce(Subquery(totals), 0)
+
+
+def stat_expressions():
+    """UPDATE expressions for STAT_FIELDS."""
+    return {
+        'mining_power': _active_miner_sum(F('item__mining_rate') * F('quantity')),
+        'mining_consumption': _active_miner_sum(F('item__electricity_consumption') * F('quantity')),
+    }
+
+
+def refresh_mining_stats(queryset):
+    """Recompute the aggregates for every profile in `queryset` with one UPDATE."""
+    return queryset.update(**stat_expressions())
+
+
+def refresh_profile(profile_id):
+    return refresh_mining_stats(PlayerProfile.objects.filter(pk=profile_id))
+
+
+def _on_inventory_changed(sender, instance, **kwargs):
+    # Skip non-miner rows when the item is already loaded; otherwise recompute
+    if Inventory.item.is_cached(instance) and instance.item.item_type != 'MINER':
+        return
+    refresh_profile(instance.player_id)
+
+
+def _on_item_pre_save(sender, instance, **kwargs):
+    if instance.pk:
+        instance._old_mining_fields = GameItem.objects.filter(pk=instance.pk).values_list(
+            'item_type', 'mining_rate', 'electricity_consumption'
+        ).first()
+
+
+def _on_item_saved(sender, instance, created, **kwargs):
+    old = getattr(instance, '_old_mining_fields', None)
+    if created or old is None:
+        return
+    new = (instance.item_type, instance.mining_rate, instance.electricity_consumption)
+    if old != new and 'MINER' in (old[0], new[0]):
+        refresh_mining_stats(PlayerProfile.objects.filter(
+            pk__in=Inventory.objects.filter(item=instance).values('player_id')
+        ))
+
+
+def setup_mining_stats_signals():
+    """
+    Connect Inventory/GameItem signals that keep the mining aggregates current.
+    Called from the app's ready() method.
+    """
+    post_save.connect(_on_inventory_changed, sender=Inventory, dispatch_uid='mining_stats_inventory_saved')
+    post_delete.connect(_on_inventory_changed, sender=Inventory, dispatch_uid='mining_stats_inventory_deleted')
+    pre_save.connect(_on_item_pre_save, sender=GameItem, dispatch_uid='mining_stats_item_pre_save')
+    post_save.connect(_on_item_saved, sender=GameItem, dispatch_uid='mining_stats_item_saved')
@@ -75,14 +75,40 @@ class PlayerProfile(models.Model):
     slot_2 = models.ForeignKey(GameItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='slot2_users')
     slot_3 = models.ForeignKey(GameItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='slot3_users')
 
+    # آمار مؤثر اسلات‌ها (محاسبه‌شده در game/effective_stats.py)
+    effective_click_bonus = models.IntegerField(default=0)
+    effective_luck = models.FloatField(default=1.0)
+    effective_mining_multiplier = models.FloatField(default=1.0)
+
+    # آستانه بعدی دستاوردها برای هر معیار (game/achievements.py)؛ 0 یعنی نیاز به بررسی
+    next_achievement_coins = models.BigIntegerField(null=True, blank=True, default=0)
+    next_achievement_diamonds = models.IntegerField(null=True, blank=True, default=0)
+    next_achievement_miners = models.IntegerField(null=True, blank=True, default=0)
+
+    # مجموع قدرت/مصرف ماینرهای فعال (به‌روزرسانی در game/mining_stats.py)
+    mining_power = models.BigIntegerField(default=0, db_index=True)
+    mining_consumption = models.BigIntegerField(default=0)
+
     # زمان‌ها
     last_mined_at = models.DateTimeField(null=True, blank=True)
     last_daily_claim = models.DateTimeField(null=True, blank=True)
     daily_streak = models.IntegerField(default=0)
 
+    # Maintained with set-based UPDATEs by game/mining_stats.py; a full save()
+    # of an instance loaded earlier must not write back stale values.
+    MAINTAINED_FIELDS = ('mining_power', 'mining_consumption')
+
     def __str__(self):
         return self.user.username
 
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not self._state.adding and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.MAINTAINED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 class Inventory(models.Model):
     player = models.ForeignKey(PlayerProfile, on_delete=models.CASCADE)
     item = models.ForeignKey(GameItem, on_delete=models.CASCADE)
@@ -91,6 +117,10 @@ class Inventory(models.Model):
 
     class Meta:
         unique_together = ('player', 'item') # جلوگیری از تکرار آیتم در دیتابیس
+        indexes = [
+            # Keyset pagination of a player's inventory (game/pagination.py)
+            models.Index(fields=['player', 'quantity', 'id'], name='inventory_player_qty_id'),
+        ]
 
     def __str__(self):
         return f"{self.player.user.username} - {self.item.name} ({self.quantity})"
@@ -101,9 +131,38 @@ class MarketListing(models.Model):
     price = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination, newest first (game/pagination.py)
+            models.Index(fields=['created_at', 'id'], name='marketlisting_created_id'),
+            # Per-item order book, cheapest first (game/order_book.py)
+            models.Index(fields=['item', 'price', 'created_at'], name='marketlisting_item_price_at'),
+        ]
+
     def __str__(self):
         return f"{self.item.name} by {self.seller.user.username}"
 
+
+class MarketDepth(models.Model):
+    """
+    Order-book summary of one item's open listings, kept current on every
+    listing create/delete (game/order_book.py). Items without listings
+    have no row.
+    """
+    item = models.OneToOneField(GameItem, on_delete=models.CASCADE, primary_key=True, related_name='market_depth')
+    listing_count = models.IntegerField(default=0)
+    min_price = models.IntegerField(null=True, blank=True)
+    median_price = models.FloatField(null=True, blank=True)
+    # Book-order key (price, created_at, id) of the lower-median listing;
+    # the median is maintained by stepping it on every insert/remove
+    mid_price = models.IntegerField(null=True, blank=True)
+    mid_created_at = models.DateTimeField(null=True, blank=True)
+    mid_listing_id = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.item.name}: {self.listing_count} @ {self.min_price}+"
+
 class PromoCode(models.Model):
     code = models.CharField(max_length=50, unique=True)
     reward_coins = models.IntegerField(default=0)
@@ -125,24 +184,38 @@ QUEST_TYPE_CHOICES = [
     ('MINE', 'Mine'),
 ]
 
-class UserQuest(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    code = models.CharField(max_length=50)
+class Quest(models.Model):
+    """
+    Daily quest definition, seeded from game/seeding.py DEFAULT_QUESTS.
+    """
+    code = models.CharField(max_length=50, unique=True)
     title = models.CharField(max_length=100)
     quest_type = models.CharField(max_length=10, choices=QUEST_TYPE_CHOICES)
     goal = models.IntegerField(default=0)
-    progress = models.IntegerField(default=0)
     reward_coins = models.IntegerField(default=0)
     reward_diamonds = models.IntegerField(default=0)
     reward_xp = models.IntegerField(default=0)
-    reset_at = models.DateField(null=True, blank=True)
+
+    def __str__(self):
+        return self.title
+
+class QuestProgress(models.Model):
+    """
+    A user's progress on one quest for one day (game/quests.py).
+    A new day starts with no rows, so daily resets need no writes.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    quest = models.ForeignKey(Quest, on_delete=models.CASCADE)
+    day = models.DateField()
+    goal = models.IntegerField(default=0)  # کپی از Quest.goal برای آپدیت تک‌دستوری
+    progress = models.IntegerField(default=0)
     completed = models.BooleanField(default=False)
 
     class Meta:
-        unique_together = ('user', 'code')
+        unique_together = ('user', 'quest', 'day')
 
     def __str__(self):
-        return f"{self.user.username} - {self.code}"
+        return f"{self.user.username} - {self.quest.code} ({self.day})"
 
 class Achievement(models.Model):
     code = models.CharField(max_length=50, unique=True)
@@ -165,6 +238,10 @@ class UserAchievement(models.Model):
 
     class Meta:
         unique_together = ('player', 'achievement')
+        indexes = [
+            # Keyset pagination of a player's achievements (game/pagination.py)
+            models.Index(fields=['player', 'achieved_at', 'id'], name='userachievement_player_at_id'),
+        ]
 
     def __str__(self):
         return f"{self.player.user.username} - {self.achievement.title}"
@@ -227,3 +304,42 @@ class PrestigeReward(models.Model):
     
     def __str__(self):
         return f"Prestige {self.prestige_level} - {self.reward_type}: {self.reward_amount}"
+
+
+
+class GameDataVersion(models.Model):
+    """
+    Content hash of seeded static data, so re-seeding is a no-op when nothing changed.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    digest = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}: {self.digest[:12]}"
+
+
+class LeaderboardSnapshot(models.Model):
+    """
+    Materialized ranking for one leaderboard category (game/leaderboard_snapshots.py).
+    Rebuilt periodically; page N is a range read on (category, rank).
+    """
+    CATEGORY_CHOICES = [
+        ('coins', 'Coins'),
+        ('mining_power', 'Mining Power'),
+        ('click_level', 'Click Level'),
+        ('prestige', 'Prestige'),
+    ]
+
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    rank = models.IntegerField()
+    player = models.ForeignKey(PlayerProfile, on_delete=models.CASCADE, related_name='leaderboard_ranks')
+    username = models.CharField(max_length=150)
+    value = models.BigIntegerField(default=0)
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = [('category', 'rank'), ('category', 'player')]
+
+    def __str__(self):
+        return f"{self.category} #{self.rank}: {self.username}"
@@ -0,0 +1,218 @@
+# game/order_book.py
+"""
+Per-item order book over MarketListing.
+
+Listings are indexed by (item, price, created_at), so "cheapest N copies of
+item X" and price-range browsing are index range scans in price order
+(oldest listing first at equal price) instead of a table scan.
+
+Each item's depth summary (listing count, min price, median price) lives
+in MarketDepth and is maintained incrementally. The row stores the
+book-order key (price, created_at, id) of the lower-median listing. An
+insert or removal only moves that key by one position: one seek past the
+old key, plus one more for the upper middle when the count is even and
+one for the min price. Those are index seeks with an OFFSET bounded by the
+size of the change, never by the size of the book. Readers (the market
+page, the depth endpoint) never aggregate the listing table.
+
+apply_changes() runs inside the transaction that changed the listings,
+after the change, and locks the item's MarketDepth row. Concurrent writers
+of one item are therefore applied one after the other, each on top of the
+other's committed state. Changes it can't express as a delta fall back to
+refresh_depth(), a full O(n) recompute for the item. Those are listing
+updates and multi-row deletes such as cascades or admin bulk deletes.
+`manage.py rebuild_market_depth` recomputes every item.
+
+Bulk writes (game/trading.py) wrap their inserts/deletes in deferred()
+and pass the whole batch to apply_changes() once.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save
+
+from .models import GameItem, MarketDepth, MarketListing
+
+
+BOOK_ORDERING = ('price', 'created_at', 'id')
+KEY_FIELDS = ('price', 'created_at', 'id')
+
+
+def book(item_id, min_price=None, max_price=None):
+    """Open listings of `item_id` within an optional price range, cheapest first."""
+    queryset = MarketListing.objects.filter(item_id=item_id)
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+    return queryset.order_by(*BOOK_ORDERING)
+
+
+def cheapest(item_id, count=10, max_price=None):
+    """The `count` cheapest listings of `item_id` (with sellers)."""
+    return list(book(item_id, max_price=max_price).select_related('seller__user')[:count])
+
+
+def listing_key(listing):
+    """Book-order key of a listing instance."""
+    return (listing.price, listing.created_at, listing.pk)
+
+
+def _nth_after(item_id, key, n):
+    # n-th (0-based) key strictly after `key` in book order
+    price, created_at, listing_id = key
+    after = book(item_id).filter(
+        Q(price__gt=price) | Q(price=price, created_at__gt=created_at) |
+        Q(price=price, created_at=created_at, id__gt=listing_id)
+    )
+    return after.values_list(*KEY_FIELDS)[n:n + 1].first()
+
+
+def _nth_before(item_id, key, n):
+    # n-th (0-based) key strictly before `key`, walking towards the cheapest
+    price, created_at, listing_id = key
+    before = MarketListing.objects.filter(item_id=item_id).filter(
+        Q(price__lt=price) | Q(price=price, created_at__lt=created_at) |
+        Q(price=price, created_at=created_at, id__lt=listing_id)
+    ).order_by('-price', '-created_at', '-id')
+    return before.values_list(*KEY_FIELDS)[n:n + 1].first()
+
+
+def _fill(depth, count, mid):
+    """Set the summary fields of `depth` from its count and lower-median key."""
+    depth.listing_count = count
+    depth.mid_price, depth.mid_created_at, depth.mid_listing_id = mid
+    if count % 2:
+        depth.median_price = float(mid[0])
+    else:
+        upper = _nth_after(depth.item_id, mid, 0)
+        depth.median_price = (mid[0] + upper[0]) / 2 if upper else float(mid[0])
+    depth.min_price = book(depth.item_id).values_list('price', flat=True).first()
+    return depth
+
+
+def _recompute(depth):
+    keys = book(depth.item_id).values_list(*KEY_FIELDS)
+    count = keys.count()
+    if not count:
+        depth.delete()
+        return None
+    _fill(depth, count, keys[(count - 1) // 2])
+    depth.save()
+    return depth
+
+
+@transaction.atomic
+def refresh_depth(item_id):
+    """
+    Recompute the MarketDepth row of one item from scratch (O(n) in its
+    listings); items without listings have none. Returns the row or None.
+    """
+    # Row lock serializes writers of the same item
+    depth, _ = MarketDepth.objects.select_for_update().get_or_create(item_id=item_id)
+    return _recompute(depth)
+
+
+@transaction.atomic
+def apply_changes(item_id, inserted=(), removed=()):
+    """
+    Apply listings inserted/removed for `item_id` (as listing_key() tuples)
+    to its MarketDepth row by moving the lower-median key. Call in the
+    transaction that made the changes, after them. Returns the row or None.
+    """
+    depth, created = MarketDepth.objects.select_for_update().get_or_create(item_id=item_id)
+    count = depth.listing_count + len(inserted) - len(removed)
+    keys = [*inserted, *removed]
+    if created or depth.mid_listing_id is None or count <= 0 or any(k[2] is None for k in keys):
+        return _recompute(depth)
+
+    mid = (depth.mid_price, depth.mid_created_at, depth.mid_listing_id)
+    # Listings now before the old median key, and how far the median has to move
+    position = (depth.listing_count - 1) // 2
+    position += sum(key < mid for key in inserted) - sum(key < mid for key in removed)
+    shift = (count - 1) // 2 - position
+    if mid[2] in {key[2] for key in removed}:
+        # The old median listing is gone: `position` is where its successor now sits
+        new_mid = _nth_after(item_id, mid, shift) if shift >= 0 else _nth_before(item_id, mid, -shift - 1)
+    elif shift > 0:
+        new_mid = _nth_after(item_id, mid, shift - 1)
+    elif shift < 0:
+        new_mid = _nth_before(item_id, mid, -shift - 1)
+    else:
+        new_mid = mid
+    if new_mid is None:
+        # The stored state disagrees with the listings (raw SQL edits...): start over
+        return _recompute(depth)
+    _fill(depth, count, new_mid)
+    depth.save()
+    return depth
+
+
+def rebuild_all():
+    """Recompute every item's depth: one grouped query plus a few seeks per item."""
+    stats = MarketListing.objects.order_by().values('item_id').annotate(count=Count('id'))
+    depths = [
+        _fill(
+            MarketDepth(item_id=row['item_id']), row['count'],
+            book(row['item_id']).values_list(*KEY_FIELDS)[(row['count'] - 1) // 2],
+        )
+        for row in stats
+    ]
+    with transaction.atomic():
+        MarketDepth.objects.all().delete()
+        MarketDepth.objects.bulk_create(depths, batch_size=500)
+    return len(depths)
+
+
+def depth_summaries(item_ids=None):
+    """Depth rows of every item with open listings (or of `item_ids`), by item."""
+    queryset = MarketDepth.objects.select_related('item')
+    if item_ids is not None:
+        queryset = queryset.filter(item_id__in=item_ids)
+    return queryset.order_by('item_id')
+
+
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred():
+    """Skip per-listing depth maintenance inside the block; the caller applies the batch."""
+    _deferred.depth = getattr(_deferred, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _deferred.depth -= 1
+
+
+def _on_listing_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or getattr(_deferred, 'depth', 0):
+        return
+    if created:
+        apply_changes(instance.item_id, inserted=[listing_key(instance)])
+    else:
+        # Price edits move the listing within the book
+        refresh_depth(instance.item_id)
+
+
+def _on_listing_deleted(sender, instance, origin=None, **kwargs):
+    if getattr(_deferred, 'depth', 0):
+        return
+    if origin is instance:
+        apply_changes(instance.item_id, removed=[listing_key(instance)])
+    elif getattr(origin, 'model', type(origin)) is GameItem:
+        return  # the item's MarketDepth row is deleted with it
+    else:
+        # Several rows went in one query; a per-row delta would see them all gone
+        refresh_depth(instance.item_id)
+
+
+def setup_order_book_signals():
+    """
+    Keep MarketDepth current on listing changes.
+    Called from the app's ready() method.
+    """
+    post_save.connect(_on_listing_saved, sender=MarketListing, dispatch_uid='order_book_listing_saved')
+    post_delete.connect(_on_listing_deleted, sender=MarketListing, dispatch_uid='order_book_listing_deleted')
@@ -0,0 +1,148 @@
+# game/pagination.py
+"""
+Pagination classes for the REST API.
+"""
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class LeaderboardPagination(PageNumberPagination):
+    """
+    Page-number pagination where `limit` picks the page size (capped).
+    """
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+def encode_cursor(values, reverse=False):
+    """Opaque cursor for a row's ordering values (JSON, base64url)."""
+    values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+    return urlsafe_b64encode(json.dumps([values, reverse], separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(values, reverse) of a cursor; raises ValueError when malformed."""
+    try:
+        values, reverse = json.loads(urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError, binascii.Error) as exc:
+        raise ValueError('invalid cursor') from exc
+    if not isinstance(values, list):
+        raise ValueError('invalid cursor')
+    return values, bool(reverse)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a fixed, unique `ordering` such as
+    ('-created_at', '-id'). The cursor holds the ordering values of the row
+    at the edge of the page, so the next page is
+    `WHERE (created_at, id) < (:x, :y) ORDER BY created_at DESC, id DESC LIMIT n + 1`:
+    with a matching composite index every page costs the same at any depth,
+    and no OFFSET or COUNT(*) is run. Responses carry `next` and `previous`
+    links only.
+    """
+    ordering = ('-id',)
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _seek(self, model, values, reverse):
+        # Rows strictly after `values` in the (possibly reversed) ordering
+        condition, equal = Q(), {}
+        for (field, descending), raw in zip(self._fields(), values):
+            value = model._meta.get_field(field).to_python(raw)
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_page(self, queryset, cursor=None, page_size=None):
+        """
+        One page of `queryset` starting at `cursor`.
+        Returns (rows, next_cursor, previous_cursor); raises ValueError for
+        a malformed cursor.
+        """
+        page_size = page_size or self.page_size
+        values, reverse = decode_cursor(cursor) if cursor else (None, False)
+        if values is not None and len(values) != len(self.ordering):
+            raise ValueError('invalid cursor')
+        ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(queryset.model, values, reverse))
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        next_cursor = encode_cursor(self._values(rows[-1])) if has_next and rows else None
+        previous_cursor = encode_cursor(self._values(rows[0]), reverse=True) if has_previous and rows else None
+        return rows, next_cursor, previous_cursor
+
+    def _values(self, row):
+        return [getattr(row, field) for field, _ in self._fields()]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            rows, self.next_cursor, self.previous_cursor = self.get_page(
+                queryset, request.query_params.get(self.cursor_query_param), self.get_page_size(request)
+            )
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        return rows
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link(self.next_cursor),
+            'previous': self._link(self.previous_cursor),
+            'results': data,
+        })
+
+
+class MarketListingPagination(KeysetPagination):
+    """Newest listings first; uses the (created_at, id) index."""
+    ordering = ('-created_at', '-id')
+
+
+class OrderBookPagination(KeysetPagination):
+    """Cheapest first, oldest first at equal price; uses the (item, price, created_at) index."""
+    ordering = ('price', 'created_at', 'id')
+
+
+class AchievementPagination(KeysetPagination):
+    """Most recently unlocked first; uses the (player, achieved_at, id) index."""
+    ordering = ('-achieved_at', '-id')
+
+
+class InventoryPagination(KeysetPagination):
+    """Largest stacks first; uses the (player, quantity, id) index."""
+    ordering = ('-quantity', '-id')
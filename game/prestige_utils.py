@@ -6,6 +6,8 @@ When players prestige, they reset their progress but gain permanent multipliers
 from django.db import transaction
 from django.utils import timezone
 from .models import PlayerProfile, Inventory, PrestigeMultiplier, PrestigeReward
+from . import level_curve, write_behind
+from .effective_stats import apply_effective_stats
 
 
 class PrestigeSystem:
@@ -42,6 +44,7 @@ class PrestigeSystem:
         Returns a dict with prestige results.
         """
         prestige_stats = PrestigeMultiplier.objects.select_for_update().get(player=profile)
+        write_behind.flush_profile(profile)
         
         # Check requirements
         required_coins = cls.get_next_prestige_cost(profile)
@@ -64,7 +67,7 @@ class PrestigeSystem:
         profile.electricity = profile.max_electricity
         profile.click_level = 1
         profile.click_xp = 0
-        profile.click_xp_to_next = 100
+        profile.click_xp_to_next = level_curve.xp_to_next(1)
         profile.active_boost_until = None
         profile.boost_multiplier = 1.0
         profile.equipped_skin = None
@@ -72,6 +75,7 @@ class PrestigeSystem:
         profile.slot_1 = None
         profile.slot_2 = None
         profile.slot_3 = None
+        apply_effective_stats(profile, {})
         profile.save()
         
         # Update prestige stats
@@ -0,0 +1,68 @@
+# game/quests.py
+"""
+Date-sharded daily quest progress.
+
+Progress lives in QuestProgress rows keyed by (user, quest, day), so the
+daily reset is implicit: a new day simply has no rows yet and nothing is
+rewritten at midnight. Rows are created on the first increment of the day.
+
+An increment is one UPDATE covering all of the user's quests of a type
+(progress capped at the quest goal). Quests that just reached their goal
+are flagged in a second UPDATE and their rewards are applied to the
+caller's locked profile, which the caller saves in the same transaction.
+"""
+from django.db.models import BooleanField, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+
+from . import level_curve
+from .models import Quest, QuestProgress
+
+
+def quests_for_day(user, day=None):
+    """All quest definitions annotated with `user`'s progress/completed for `day` (default today)."""
+    day = day or timezone.now().date()
+    today_rows = QuestProgress.objects.filter(user=user, quest=OuterRef('pk'), day=day)
+    return Quest.objects.annotate(
+        progress=Coalesce(Subquery(today_rows.values('progress')[:1]), Value(0), output_field=IntegerField()),
+        completed=Coalesce(Subquery(today_rows.values('completed')[:1]), Value(False), output_field=BooleanField()),
+    ).order_by('code')
+
+
+def _create_today_rows(profile, quests, day):
+    QuestProgress.objects.bulk_create(
+        [QuestProgress(user_id=profile.user_id, quest_id=q.id, day=day, goal=q.goal) for q in quests],
+        ignore_conflicts=True,
+    )
+
+
+def update_quest_progress(profile, quest_type, amount=1):
+    """
+    Add `amount` to every quest of `quest_type` for today and grant the
+    rewards of quests that just completed. `profile` should be locked by the
+    caller and is modified in place but not saved.
+    Returns the list of quests completed by this call.
+    """
+    quests = {q.id: q for q in Quest.objects.filter(quest_type=quest_type)}
+    if not quests:
+        return []
+    day = timezone.now().date()
+    rows = QuestProgress.objects.filter(user_id=profile.user_id, quest_id__in=quests, day=day)
+
+    updated = rows.update(progress=Least(F('progress') + amount, F('goal')))
+    if updated < len(quests):
+        # First progress of the day on (some of) these quests
+        _create_today_rows(profile, quests.values(), day)
+        rows.filter(progress=0).update(progress=Least(amount, F('goal')))
+
+    finished = list(rows.filter(completed=False, progress__gte=F('goal')).values_list('id', 'quest_id'))
+    if not finished:
+        return []
+    QuestProgress.objects.filter(id__in=[row_id for row_id, _ in finished]).update(completed=True)
+
+    completed = [quests[quest_id] for _, quest_id in finished]
+    for quest in completed:
+        profile.coins += quest.reward_coins
+        profile.diamonds += quest.reward_diamonds
+        level_curve.apply_xp(profile, quest.reward_xp)
+    return completed
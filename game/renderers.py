@@ -0,0 +1,83 @@
+# game/renderers.py
+"""
+JSON encoding for the API and the JsonResponse views.
+
+dumps() uses orjson when it is installed (and enabled by
+settings.GAME_JSON['ENCODER']) and the stdlib json module otherwise.
+Values orjson can't encode natively (Decimal, lazy strings, datetimes in
+Django's format...) go through the same `default` hook the stdlib path
+uses, so both produce the same documents.
+
+- FastJSONRenderer: drop-in for rest_framework.renderers.JSONRenderer,
+  registered in REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].
+- FastJsonResponse: drop-in for django.http.JsonResponse.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+DEFAULTS = {
+    'ENCODER': 'auto',  # 'auto' (orjson if installed), 'orjson' or 'stdlib'
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'GAME_JSON', {})}
+
+
+def use_orjson():
+    encoder = get_config()['ENCODER']
+    if encoder == 'orjson' and orjson is None:
+        raise ImportError("GAME_JSON['ENCODER'] is 'orjson' but orjson is not installed")
+    return orjson is not None and encoder != 'stdlib'
+
+
+def dumps(data, encoder_class=DjangoJSONEncoder, ensure_ascii=False):
+    """Compact UTF-8 JSON bytes."""
+    if not ensure_ascii and use_orjson():
+        return orjson.dumps(
+            data, default=encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(
+        data, cls=encoder_class, ensure_ascii=ensure_ascii, separators=(',', ':'),
+    ).encode('utf-8')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by dumps(). Indented output (browsable API,
+    `; indent=N` in Accept) still goes through the stdlib renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = dumps(data, self.encoder_class, self.ensure_ascii)
+        # Like JSONRenderer: keep the output valid JavaScript too
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    JsonResponse encoded with dumps(). Like JsonResponse, `data` must be a
+    dict unless safe=False.
+    """
+
+    def __init__(self, data, encoder=DjangoJSONEncoder, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError('In order to allow non-dict objects to be serialized set the safe parameter to False.')
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data, encoder), **kwargs)
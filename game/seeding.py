@@ -0,0 +1,166 @@
+# game/seeding.py
+"""
+Seeding of static game data (default achievements and daily quests).
+
+The defaults are synced into the database once, after `migrate` (via a
+post_migrate hook) or with `manage.py seed_game_data`. A content hash of
+the defaults is stored in GameDataVersion, so repeat runs are a single
+SELECT and request handlers never have to get_or_create static rows.
+Per-user quest progress is created lazily (game/quests.py).
+"""
+import hashlib
+import json
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_migrate
+from django.utils import timezone
+
+
+DEFAULT_ACHIEVEMENTS = [
+    {
+        'code': 'coins_1k',
+        'title': 'تازه پولدار',
+        'description': 'رسیدن به ۱,۰۰۰ کوین',
+        'icon': 'fas fa-coins',
+        'target_coins': 1000,
+        'target_diamonds': 0,
+        'target_miners': 0,
+        'reward_coins': 0,
+        'reward_diamonds': 2,
+    },
+    {
+        'code': 'coins_100k',
+        'title': 'میلیونر کوچولو',
+        'description': 'رسیدن به ۱۰۰,۰۰۰ کوین',
+        'icon': 'fas fa-gem',
+        'target_coins': 100000,
+        'target_diamonds': 0,
+        'target_miners': 0,
+        'reward_coins': 0,
+        'reward_diamonds': 10,
+    },
+    {
+        'code': 'diamond_10',
+        'title': 'کالکتر الماس',
+        'description': 'جمع کردن ۱۰ الماس',
+        'icon': 'fas fa-diamond',
+        'target_coins': 0,
+        'target_diamonds': 10,
+        'target_miners': 0,
+        'reward_coins': 2000,
+        'reward_diamonds': 0,
+    },
+    {
+        'code': 'miner_owner',
+        'title': 'اولین ماینر',
+        'description': 'داشتن حداقل یک ماینر',
+        'icon': 'fas fa-hammer',
+        'target_coins': 0,
+        'target_diamonds': 0,
+        'target_miners': 1,
+        'reward_coins': 500,
+        'reward_diamonds': 1,
+    },
+]
+
+DEFAULT_QUESTS = [
+    {
+        'code': 'click_500',
+        'title': '۵۰۰ کلیک',
+        'quest_type': 'CLICK',
+        'goal': 500,
+        'reward_coins': 1000,
+        'reward_diamonds': 2,
+        'reward_xp': 50,
+    },
+    {
+        'code': 'click_2k',
+        'title': '۲۰۰۰ کلیک',
+        'quest_type': 'CLICK',
+        'goal': 2000,
+        'reward_coins': 4000,
+        'reward_diamonds': 5,
+        'reward_xp': 150,
+    },
+    {
+        'code': 'mine_5',
+        'title': '۵ بار ماین',
+        'quest_type': 'MINE',
+        'goal': 5,
+        'reward_coins': 5000,
+        'reward_diamonds': 3,
+        'reward_xp': 100,
+    },
+]
+
+VERSION_KEY = 'defaults'
+
+
+def defaults_digest():
+    payload = json.dumps(
+        {'achievements': DEFAULT_ACHIEVEMENTS, 'quests': DEFAULT_QUESTS},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _sync_definitions(model, rows):
+    """Create missing rows and update changed ones, keyed by `code`."""
+    existing = {obj.code: obj for obj in model.objects.filter(code__in=[r['code'] for r in rows])}
+    to_create, to_update = [], []
+    fields = [f for f in rows[0] if f != 'code']
+    for row in rows:
+        obj = existing.get(row['code'])
+        if obj is None:
+            to_create.append(model(**row))
+        elif any(getattr(obj, f) != row[f] for f in fields):
+            for f in fields:
+                setattr(obj, f, row[f])
+            to_update.append(obj)
+    model.objects.bulk_create(to_create)
+    if to_update:
+        model.objects.bulk_update(to_update, fields)
+    return len(to_create) + len(to_update)
+
+
+@transaction.atomic
+def seed_game_data(force=False):
+    """
+    Sync DEFAULT_ACHIEVEMENTS and DEFAULT_QUESTS into the database.
+    Returns False without writing anything when the stored hash matches.
+    """
+    from .achievements import invalidate_achievement_index, reset_thresholds
+    from .models import Achievement, GameDataVersion, Quest, QuestProgress
+
+    digest = defaults_digest()
+    version = GameDataVersion.objects.filter(key=VERSION_KEY).first()
+    if version and version.digest == digest and not force:
+        return False
+
+    if _sync_definitions(Achievement, DEFAULT_ACHIEVEMENTS):
+        invalidate_achievement_index()
+        reset_thresholds()
+
+    if _sync_definitions(Quest, DEFAULT_QUESTS):
+        # Today's progress rows carry a copy of the goal
+        today = timezone.now().date()
+        for q in Quest.objects.filter(code__in=[row['code'] for row in DEFAULT_QUESTS]):
+            QuestProgress.objects.filter(quest=q, day=today).exclude(goal=q.goal).update(goal=q.goal)
+
+    GameDataVersion.objects.update_or_create(key=VERSION_KEY, defaults={'digest': digest})
+    return True
+
+
+def _seed_after_migrate(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    from .models import GameDataVersion
+    # Skip when migrating backwards past the tables seeding needs
+    if GameDataVersion._meta.db_table in connections[using].introspection.table_names():
+        seed_game_data()
+
+
+def setup_seeding_signals(app_config):
+    """
+    Seed after `migrate`.
+    Called from the app's ready() method.
+    """
+    post_migrate.connect(_seed_after_migrate, sender=app_config, dispatch_uid='game_seed_after_migrate')
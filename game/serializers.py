@@ -3,7 +3,7 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import (
     GameItem, PlayerProfile, Inventory, MarketListing,
-    UserQuest, UserAchievement, Achievement, AuctionListing
+    Quest, UserAchievement, Achievement, AuctionListing
 )
 
 
@@ -29,6 +29,11 @@ class GameItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class CatalogItemSerializer(GameItemSerializer):
+    """GameItemSerializer for catalog records (game/catalog.py)."""
+    image = serializers.CharField(source='image_url', read_only=True)
+
+
 class InventorySerializer(serializers.ModelSerializer):
     item = GameItemSerializer(read_only=True)
     item_id = serializers.IntegerField(write_only=True)
@@ -46,7 +51,6 @@ class PlayerProfileSerializer(serializers.ModelSerializer):
     slot_1 = GameItemSerializer(read_only=True)
     slot_2 = GameItemSerializer(read_only=True)
     slot_3 = GameItemSerializer(read_only=True)
-    mining_power = serializers.SerializerMethodField()
     
     class Meta:
         model = PlayerProfile
@@ -58,10 +62,37 @@ class PlayerProfileSerializer(serializers.ModelSerializer):
             'last_mined_at', 'daily_streak', 'mining_power'
         ]
         read_only_fields = ['id', 'user', 'mining_power']
-    
-    def get_mining_power(self, obj):
-        from .utils import calculate_mining_power
-        return calculate_mining_power(obj)
+
+
+# Scalar columns of the lean profile representation (lean_profile_data)
+LEAN_PROFILE_FIELDS = (
+    'id', 'coins', 'diamonds', 'energy', 'max_energy', 'electricity', 'max_electricity',
+    'click_level', 'click_xp', 'click_xp_to_next', 'boost_multiplier', 'daily_streak', 'mining_power',
+)
+LEAN_ITEM_FIELDS = ('equipped_skin', 'avatar', 'slot_1', 'slot_2', 'slot_3')
+
+
+def _iso(value):
+    # Same format as DRF's DateTimeField
+    if value is None:
+        return None
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def lean_profile_data(profile, catalog_ref=None):
+    """
+    Read-optimized PlayerProfile representation built by hand: equipped
+    items are ids resolved against the separately cached item catalog
+    (`catalog_ref`, e.g. its URL and ETag) instead of nested serializers.
+    """
+    data = {field: getattr(profile, field) for field in LEAN_PROFILE_FIELDS}
+    data['username'] = profile.user.username
+    data['active_boost_until'] = _iso(profile.active_boost_until)
+    data['last_mined_at'] = _iso(profile.last_mined_at)
+    data['items'] = {field: getattr(profile, f'{field}_id') for field in LEAN_ITEM_FIELDS}
+    data['catalog'] = catalog_ref
+    return data
 
 
 class MarketListingSerializer(serializers.ModelSerializer):
@@ -77,10 +108,13 @@ class MarketListingSerializer(serializers.ModelSerializer):
 
 
 class UserQuestSerializer(serializers.ModelSerializer):
+    """A Quest annotated with the user's progress for the day (game.quests.quests_for_day)."""
     quest_type_display = serializers.CharField(source='get_quest_type_display', read_only=True)
+    progress = serializers.IntegerField(read_only=True)
+    completed = serializers.BooleanField(read_only=True)
     
     class Meta:
-        model = UserQuest
+        model = Quest
         fields = [
             'id', 'code', 'title', 'quest_type', 'quest_type_display',
             'goal', 'progress', 'reward_coins', 'reward_diamonds',
@@ -48,10 +48,22 @@ class GameAPI {
         return this.request('/player/profile/me/');
     }
 
+    // Profile with equipped items as ids; resolve them with getCatalog()
+    async getLeanProfile() {
+        return this.request('/player/profile/me/lean/');
+    }
+
     async click() {
         return this.request('/player/profile/click/', { method: 'POST' });
     }
 
+    async clickBatch(count, windowMs) {
+        return this.request('/player/profile/click_batch/', {
+            method: 'POST',
+            body: { count: count, window_ms: windowMs }
+        });
+    }
+
     async collectMine() {
         return this.request('/player/profile/collect-mine/', { method: 'POST' });
     }
@@ -80,6 +92,10 @@ class GameAPI {
         return this.request(endpoint);
     }
 
+    async getCatalog() {
+        return this.request('/shop/catalog/');
+    }
+
     async getShopCategories() {
         return this.request('/shop/categories/');
     }
@@ -89,6 +105,19 @@ class GameAPI {
         return this.request('/marketplace/');
     }
 
+    // Order book of one item, cheapest first; options: limit, minPrice, maxPrice, cursor
+    async getOrderBook(itemId, { limit = 10, minPrice = null, maxPrice = null, cursor = null } = {}) {
+        const params = new URLSearchParams({ limit });
+        if (minPrice !== null) params.set('min_price', minPrice);
+        if (maxPrice !== null) params.set('max_price', maxPrice);
+        if (cursor) params.set('cursor', cursor);
+        return this.request(`/marketplace/items/${itemId}/book/?${params}`);
+    }
+
+    async getMarketDepth(itemIds = null) {
+        return this.request(itemIds ? `/marketplace/depth/?item=${itemIds.join(',')}` : '/marketplace/depth/');
+    }
+
     async listItem(itemId, price) {
         return this.request('/marketplace/list_item/', {
             method: 'POST',
@@ -103,6 +132,21 @@ class GameAPI {
         });
     }
 
+    async listItemBulk(itemId, quantity, price) {
+        return this.request('/marketplace/list_bulk/', {
+            method: 'POST',
+            body: { item_id: itemId, quantity: quantity, price: price }
+        });
+    }
+
+    // Buys up to `quantity` of the cheapest listings priced at most maxPrice
+    async buyCheapest(itemId, quantity, maxPrice) {
+        return this.request('/marketplace/buy_bulk/', {
+            method: 'POST',
+            body: { item_id: itemId, quantity: quantity, max_price: maxPrice }
+        });
+    }
+
     // Quests
     async getQuests() {
         return this.request('/quests/');
@@ -135,6 +179,22 @@ class GameAPI {
         return this.request(`/leaderboard/top/?limit=${limit}`);
     }
 
+    async getMyRank() {
+        return this.request('/leaderboard/me/');
+    }
+
+    async getLeaderboardAround(radius = 5) {
+        return this.request(`/leaderboard/around/?radius=${radius}`);
+    }
+
+    async getCategoryLeaderboard(category, page = 1, limit = 20) {
+        return this.request(`/leaderboard/category/${category}/?page=${page}&limit=${limit}`);
+    }
+
+    async getMyRanks() {
+        return this.request('/leaderboard/ranks/');
+    }
+
     // Casino
     async playBlackjack(bet) {
         return this.request('/casino/blackjack/', {
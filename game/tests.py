@@ -1,3 +1,1065 @@
-from django.test import TestCase
+import gzip
+import json
+import random
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from uuid import UUID
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import JsonResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from . import (
+    achievements, catalog, item_search, leaderboard, leaderboard_snapshots, level_curve, mining, order_book, serializers,
+    trading, write_behind,
+)
+from .cache_utils import GameCacheManager
+from .click_utils import ClickEngine
+from .drop_table import DropEntry, DropTable, get_drop_table
+from .effective_stats import apply_effective_stats
+from .models import (
+    Achievement, GameItem, Inventory, LeaderboardSnapshot, MarketDepth, MarketListing, PlayerProfile, PrestigeMultiplier,
+    Quest, QuestProgress,
+)
+from .pagination import MarketListingPagination, decode_cursor, encode_cursor
+from .quests import quests_for_day, update_quest_progress
+from .renderers import FastJSONRenderer, FastJsonResponse
+
+
+def make_profile(username, **fields):
+    user = User.objects.create(username=username)
+    if fields:
+        PlayerProfile.objects.filter(user=user).update(**fields)
+    return PlayerProfile.objects.get(user=user)
+
+
+# No diamond and no loot: every roll lands above the odds
+no_luck = mock.patch('game.click_utils.random.uniform', return_value=10 ** 6)
+
+
+@no_luck
+class ClickBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.profile = make_profile('clicker', coins=0, energy=100)
+        self.client.force_login(self.profile.user)
+
+    def batch(self, count, window_ms=1000):
+        return self.client.post(reverse('click_batch'), {'count': count, 'window_ms': window_ms})
+
+    def test_applies_the_batch(self, _):
+        response = self.batch(10)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['applied'], 10)
+        profile = PlayerProfile.objects.get(pk=self.profile.pk)
+        self.assertEqual((profile.coins, profile.energy, profile.click_xp), (10, 90, 10))
+
+    def test_capped_by_energy(self, _):
+        PlayerProfile.objects.filter(pk=self.profile.pk).update(energy=3)
+        self.assertEqual(self.batch(10).json()['applied'], 3)
+        self.assertEqual(PlayerProfile.objects.get(pk=self.profile.pk).energy, 0)
+        cache.clear()
+        self.assertEqual(self.batch(1).status_code, 400)
+
+    def test_rate_limited_by_window(self, _):
+        self.assertEqual(self.batch(ClickEngine.MAX_CLICKS_PER_SECOND + 1).status_code, 429)
+        self.assertEqual(self.batch(5).status_code, 200)
+        # The next window is clamped to the time since the previous batch
+        self.assertEqual(self.batch(5, window_ms=ClickEngine.MAX_BATCH_WINDOW_MS).status_code, 429)
+
+    def test_rejects_bad_input(self, _):
+        for data in ({'count': 'x', 'window_ms': 1000}, {'count': 0, 'window_ms': 1000}, {'count': 5}):
+            self.assertEqual(self.client.post(reverse('click_batch'), data).status_code, 400)
+
+    def test_batch_matches_single_clicks(self, _):
+        batched = PlayerProfile(energy=500, click_level=1, click_xp=0, click_xp_to_next=100)
+        single = PlayerProfile(energy=500, click_level=1, click_xp=0, click_xp_to_next=100)
+        ClickEngine.apply_clicks(batched, 300, roll_loot=False)
+        for _ in range(300):
+            ClickEngine.apply_clicks(single, 1, roll_loot=False)
+        fields = ('coins', 'energy', 'click_level', 'click_xp', 'click_xp_to_next')
+        self.assertEqual([getattr(batched, f) for f in fields], [getattr(single, f) for f in fields])
+
+
+@no_luck
+@override_settings(GAME_WRITE_BEHIND={'ENABLED': True, 'FLUSH_THRESHOLD': 10 ** 6, 'FLUSH_INTERVAL': 10 ** 6})
+class WriteBehindTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        write_behind._buffer = None
+        self.buffer = write_behind.get_buffer()
+        self.addCleanup(setattr, write_behind, '_buffer', None)
+        self.addCleanup(self.buffer.close)
+        self.profile = make_profile('clicker', coins=100, energy=5)
+        self.client.force_login(self.profile.user)
+
+    def fetch(self):
+        return PlayerProfile.objects.get(pk=self.profile.pk)
+
+    def test_merge_and_flush(self, _):
+        self.buffer.record(self.profile.id, coins=3, click_xp=3)
+        self.buffer.record(self.profile.id, coins=2, click_xp=2)
+        self.assertEqual(write_behind.merge_pending(self.fetch()).coins, 105)
+        self.assertEqual(self.fetch().coins, 100)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual((self.fetch().coins, self.fetch().click_xp), (105, 5))
+        self.assertEqual(self.buffer.pending(self.profile.id), {})
+
+    def test_flush_profile_reloads_buffered_fields(self, _):
+        self.buffer.record(self.profile.id, coins=7)
+        write_behind.flush_profile(self.profile)
+        self.assertEqual(self.profile.coins, 107)
+
+    def test_flusher_thread_flushes_idle_deltas(self, _):
+        buffer = write_behind.WriteBehindBuffer(write_behind.LocalDeltaStore(), 0.01, 10 ** 6)
+        flushed = threading.Event()
+        with mock.patch.object(buffer, 'flush', side_effect=lambda profile_ids=None: flushed.set() or 0):
+            thread = buffer.start_flusher()
+            self.assertTrue(flushed.wait(5))
+            buffer.close()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_buffered_clicks_reserve_energy(self, _):
+        for _ in range(5):
+            self.assertEqual(self.client.post(reverse('click_coin')).status_code, 200)
+        self.assertEqual(self.client.post(reverse('click_coin')).status_code, 400)
+        profile = self.fetch()
+        self.assertEqual((profile.energy, profile.coins), (0, 100))
+        self.assertEqual(self.buffer.pending(self.profile.id), {'coins': 5, 'click_xp': 5})
+
+    def test_reservation_is_conditional(self, _):
+        # A stale read can't overspend: the UPDATE re-checks the row
+        self.assertTrue(write_behind.reserve_energy(self.profile.pk, 5))
+        self.assertFalse(write_behind.reserve_energy(self.profile.pk))
+        self.assertEqual(self.fetch().energy, 0)
+
+    def test_locked_batch_sees_buffered_clicks(self, _):
+        for _ in range(5):
+            self.client.post(reverse('click_coin'))
+        response = self.client.post(reverse('click_batch'), {'count': 5, 'window_ms': 1000})
+        self.assertEqual(response.status_code, 400)
+        profile = self.fetch()
+        self.assertEqual((profile.energy, profile.coins, profile.click_xp), (0, 105, 5))
+
+    def test_locked_click_applies_buffered_level_ups(self, _):
+        self.buffer.record(self.profile.id, click_xp=level_curve.total_xp_for_level(3))
+        self.client.post('/api/player/profile/click/')
+        profile = self.fetch()
+        self.assertEqual(profile.click_level, 3)
+        self.assertEqual(profile.click_xp_to_next, level_curve.xp_to_next(3))
+
+
+class FixedRng:
+    """Stands in for `random` in DropTable.roll: returns the queued draws."""
+
+    def __init__(self, *draws):
+        self.draws = list(draws)
+
+    def uniform(self, a, b):
+        return self.draws.pop(0)
+
+
+def entry_ids(table):
+    return [entry.id for entry in table.entries]
+
+
+class DropTableTests(TestCase):
+    def setUp(self):
+        self.table = DropTable([DropEntry(1, 'a', 10.0), DropEntry(2, 'b', 5.0), DropEntry(3, 'c', 0.5)])
+        catalog.refresh()
+
+    def test_prefix_sums(self):
+        self.assertEqual(self.table.prefix_sums, (10.0, 15.0, 15.5))
+        self.assertEqual(self.table.total_chance, 15.5)
+
+    def test_roll_boundaries(self):
+        rolls = [self.table.roll(rng=FixedRng(draw)) for draw in (0.0, 9.99, 10.0, 15.2, 15.5, 99.0)]
+        self.assertEqual([entry and entry.id for entry in rolls], [1, 1, 2, 3, None, None])
+
+    def test_luck_divides_the_draw(self):
+        self.assertEqual(self.table.roll(2.0, rng=FixedRng(24.0)).id, 2)
+
+    def test_distribution(self):
+        rng = random.Random(7)
+        rolls = 200_000
+        counts = {}
+        for _ in range(rolls):
+            entry = self.table.roll(rng=rng)
+            counts[entry and entry.id] = counts.get(entry and entry.id, 0) + 1
+        for entry in self.table.entries:
+            self.assertAlmostEqual(counts[entry.id] / rolls * 100, entry.drop_chance, delta=0.25)
+
+    def test_empty_table(self):
+        self.assertIsNone(DropTable([]).roll())
+
+    def test_rebuilt_after_item_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            item = GameItem.objects.create(name='Gem', item_type='SKIN', can_drop=True, drop_chance=2.5)
+        self.assertIn(item.id, entry_ids(get_drop_table()))
+        with self.captureOnCommitCallbacks(execute=True):
+            item.can_drop = False
+            item.save()
+        self.assertNotIn(item.id, entry_ids(get_drop_table()))
+
+    def test_follows_the_shared_generation(self):
+        table = get_drop_table()
+        # Saved by another worker: this process only sees the shared generation move
+        item = GameItem.objects.create(name='Gem', item_type='SKIN', can_drop=True, drop_chance=2.5)
+        GameCacheManager.invalidate_namespace(GameCacheManager.CATALOG_PREFIX)
+        self.assertIs(get_drop_table(), table)
+        catalog.sync()  # what every request does on request_started
+        self.assertIn(item.id, entry_ids(get_drop_table()))
+
+
+class LevelCurveTests(TestCase):
+    @staticmethod
+    def loop(level, xp, xp_to_next):
+        # The per-level loop the curve replaced
+        while xp >= xp_to_next:
+            xp -= xp_to_next
+            level += 1
+            xp_to_next = int(xp_to_next * 1.35)
+        return level, xp, xp_to_next
+
+    def test_matches_the_loop(self):
+        rng = random.Random(1)
+        for _ in range(2000):
+            level = rng.randint(1, 40)
+            xp = rng.randint(0, 10 ** rng.randint(1, 7))
+            self.assertEqual(
+                level_curve.resolve(level, xp),
+                self.loop(level, xp, level_curve.xp_to_next(level)),
+                (level, xp),
+            )
+
+    def test_xp_to_next_matches_the_loop(self):
+        xp_to_next = 100
+        for level in range(1, 60):
+            self.assertEqual(level_curve.xp_to_next(level), xp_to_next, level)
+            xp_to_next = int(xp_to_next * 1.35)
+
+    def test_apply_xp(self):
+        profile = PlayerProfile(click_level=1, click_xp=90, click_xp_to_next=100)
+        self.assertEqual(level_curve.apply_xp(profile, 150), 2)
+        self.assertEqual((profile.click_level, profile.click_xp, profile.click_xp_to_next), (3, 5, 182))
+
+
+class EffectiveStatsTests(TestCase):
+    def setUp(self):
+        self.item = GameItem.objects.create(
+            name='Ring', item_type='SKIN', price_diamonds=5, stock=10,
+            buff_click_coins=4, buff_luck=50, buff_mining_speed=20,
+        )
+        self.profile = make_profile('wearer', diamonds=100)
+        self.profile.slot_1 = self.item
+        apply_effective_stats(self.profile, {self.item.id: self.item})
+        self.profile.save()
+
+    def stats(self):
+        profile = PlayerProfile.objects.get(pk=self.profile.pk)
+        return profile.effective_click_bonus, profile.effective_luck, profile.effective_mining_multiplier
+
+    def test_equipped(self):
+        self.assertEqual(self.stats(), (4, 1.5, 1.2))
+
+    def test_item_edit_propagates(self):
+        self.item.buff_click_coins = 9
+        self.item.buff_luck = 0
+        self.item.save()
+        self.assertEqual(self.stats(), (9, 1.0, 1.2))
+
+    def test_non_buff_edit_leaves_players_alone(self):
+        PlayerProfile.objects.filter(pk=self.profile.pk).update(effective_click_bonus=0)
+        self.item.stock = 3
+        self.item.description = 'Shiny'
+        self.item.save()
+        self.assertEqual(self.stats()[0], 0)
+
+    def test_purchase_does_not_rewrite_equipped_players(self):
+        self.client.force_login(self.profile.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('buy_item'), {'item_id': self.item.id})
+        self.assertEqual(response.json()['status'], 'success')
+        # The buyer's own save writes every column; the equipped players' bulk_update must not run
+        self.assertFalse([q['sql'] for q in queries if '"effective_luck" = CASE' in q['sql']])
+
+    def test_item_delete_resets(self):
+        self.item.delete()
+        self.assertEqual(self.stats(), (0, 1.0, 1.0))
+
+
+class AchievementTests(TestCase):
+    def setUp(self):
+        Achievement.objects.all().delete()
+        self.achievement = Achievement.objects.create(code='rich', title='Rich', target_coins=1000, reward_diamonds=3)
+        self.profile = make_profile('achiever', coins=500)
+
+    def fetch_threshold(self, profile):
+        return PlayerProfile.objects.get(pk=profile.pk).next_achievement_coins
+
+    def test_thresholds(self):
+        self.assertEqual(achievements.check_achievements(self.profile), [])
+        self.assertEqual(self.profile.next_achievement_coins, 1000)
+
+        self.profile.coins = 1200
+        unlocked = achievements.check_achievements(self.profile)
+        self.assertEqual([ua.achievement_id for ua in unlocked], [self.achievement.id])
+        self.assertEqual(self.profile.diamonds, 3)
+        self.assertIsNone(self.profile.next_achievement_coins)
+        self.assertEqual(achievements.check_achievements(self.profile), [])
+
+    def test_target_edit_resets_affected_players_only(self):
+        achievements.check_achievements(self.profile)
+        other = make_profile('other', coins=0, next_achievement_coins=200)
+
+        self.achievement.title = 'Very rich'
+        self.achievement.save()
+        self.assertEqual(self.fetch_threshold(self.profile), 1000)
+
+        self.achievement.target_coins = 600
+        self.achievement.save()
+        self.assertEqual(self.fetch_threshold(self.profile), 0)
+        self.assertEqual(self.fetch_threshold(other), 200)
+        self.assertNotIn(other.pk, achievements.profiles_affected_by(self.achievement).values_list('pk', flat=True))
+
+    def test_edit_moves_the_shared_generation_on_commit(self):
+        generation = achievements.sync()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.achievement.target_coins = 600
+            self.achievement.save()
+        self.assertNotEqual(GameCacheManager.get_generation(GameCacheManager.ACHIEVEMENTS_PREFIX), generation)
+
+    def test_follows_the_shared_generation(self):
+        index = achievements.get_achievement_index()
+        # Edited by another worker: this process only sees the shared generation move
+        Achievement.objects.filter(pk=self.achievement.pk).update(target_coins=400)
+        GameCacheManager.invalidate_namespace(GameCacheManager.ACHIEVEMENTS_PREFIX)
+        self.assertIs(achievements.get_achievement_index(), index)
+
+        self.client.get(reverse('login'))  # every request reads the generation
+        self.assertEqual(achievements.get_achievement_index().targets['coins'], (400,))
+        self.profile.next_achievement_coins = 0
+        self.assertEqual(len(achievements.check_achievements(self.profile)), 1)
+
+
+class QuestTests(TestCase):
+    def setUp(self):
+        Quest.objects.all().delete()
+        self.quest = Quest.objects.create(code='click3', title='Click', quest_type='CLICK', goal=3, reward_coins=10)
+        self.profile = make_profile('quester', coins=0)
+
+    def test_progress_completes_once(self):
+        self.assertEqual(update_quest_progress(self.profile, 'CLICK', 2), [])
+        self.assertEqual(update_quest_progress(self.profile, 'CLICK', 2), [self.quest])
+        self.assertEqual(update_quest_progress(self.profile, 'CLICK', 5), [])
+        row = QuestProgress.objects.get(user=self.profile.user, quest=self.quest)
+        self.assertEqual((row.progress, row.completed), (3, True))
+        self.assertEqual(self.profile.coins, 10)
+
+    def test_other_quest_types_untouched(self):
+        self.assertEqual(update_quest_progress(self.profile, 'MINE', 5), [])
+        self.assertFalse(QuestProgress.objects.exists())
+
+    def test_new_day_starts_empty(self):
+        update_quest_progress(self.profile, 'CLICK', 5)
+        today = timezone.now().date()
+        QuestProgress.objects.update(day=today - timedelta(days=1))
+
+        quest = quests_for_day(self.profile.user).get(pk=self.quest.pk)
+        self.assertEqual((quest.progress, quest.completed), (0, False))
+        self.assertEqual(update_quest_progress(self.profile, 'CLICK', 3), [self.quest])
+        self.assertEqual(self.profile.coins, 20)
+        self.assertEqual(QuestProgress.objects.filter(day=today).count(), 1)
+
+
+class MiningSettlementTests(TestCase):
+    def stacks(self, *rows):
+        stacks = mining.MinerArrays()
+        for row in rows:
+            stacks.append(*row)
+        return stacks
+
+    def test_settle(self):
+        result = mining.settle(self.stacks((10, 2, 0.0, 3), (4, 1, 0.0, 1)), hours=2, electricity=100)
+        self.assertEqual(result.status, mining.SETTLED)
+        self.assertEqual((result.coins, result.electricity_used, result.diamonds), (68, 14, 0))
+
+    def test_electricity_cuts_production_short(self):
+        result = mining.settle(self.stacks((10, 2, 0.0, 3)), hours=2, electricity=6)
+        self.assertEqual((result.actual_hours, result.coins, result.electricity_used), (1, 30, 6))
+
+    def test_mining_multiplier(self):
+        self.assertEqual(mining.settle(self.stacks((10, 0, 0.0, 1)), 1, 100, mining_multiplier=1.5).coins, 15)
+
+    def test_diamonds_follow_the_expected_rate(self):
+        rng = random.Random(3)
+        stacks = self.stacks((1, 0, 5.0, 4))  # 5% per hour per miner
+        runs = 2000
+        total = sum(mining.settle(stacks, 10, 100, rng=rng).diamonds for _ in range(runs))
+        self.assertAlmostEqual(total / runs, 0.05 * 10 * 4, delta=0.1)
+
+    def test_statuses(self):
+        self.assertEqual(mining.settle(self.stacks((10, 2, 0.0, 1)), 0.001, 100).status, mining.TOO_SOON)
+        self.assertEqual(mining.settle(mining.EMPTY_MINERS, 1, 100).status, mining.NO_MINERS)
+        self.assertEqual(mining.settle(self.stacks((10, 2, 0.0, 1)), 1, 0).status, mining.NO_ELECTRICITY)
+
+    def test_settle_chunk(self):
+        item = GameItem.objects.create(name='Rig', item_type='MINER', mining_rate=5, electricity_consumption=1)
+        now = timezone.now()
+        profile = make_profile('miner', coins=0, electricity=100, last_mined_at=now - timedelta(hours=2))
+        idle = make_profile('idle', coins=0, last_mined_at=now - timedelta(hours=2))
+        Inventory.objects.create(player=profile, item=item, quantity=2)
+
+        results = mining.settle_chunk([profile.pk, idle.pk], now, rng=random.Random(0))
+        self.assertEqual(list(results), [profile.pk])
+        profile.refresh_from_db()
+        self.assertEqual((profile.coins, profile.electricity, profile.last_mined_at), (20, 96, now))
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        leaderboard._board = None
+        self.addCleanup(setattr, leaderboard, '_board', None)
+        # Diamonds 50, 40, 40, 30, ... 0: players 1 and 2 tie
+        self.profiles = [
+            make_profile(f'p{i}', diamonds=diamonds) for i, diamonds in enumerate([50, 40, 40, 30, 20, 10, 0])
+        ]
+
+    def pk(self, i):
+        return self.profiles[i].pk
+
+    def test_top_and_rank(self):
+        board = leaderboard.get_leaderboard()
+        self.assertEqual([e.profile_id for e in board.top(3)], [self.pk(0), self.pk(1), self.pk(2)])
+        self.assertEqual([e.rank for e in board.top(2, 2)], [3, 4])
+        # Ties are broken by profile id
+        self.assertEqual(board.rank(self.pk(2)), leaderboard.Entry(3, self.pk(2), 40))
+        self.assertIsNone(board.rank(0))
+        self.assertEqual(board.size(), 7)
+
+    def test_updates_move_players(self):
+        board = leaderboard.get_leaderboard()
+        board.top(1)
+        board.update({self.pk(6): 45})
+        self.assertEqual(board.rank(self.pk(6)).rank, 2)
+        self.assertEqual(board.rank(self.pk(1)).rank, 3)
+        board.remove(self.pk(0))
+        self.assertEqual(board.rank(self.pk(6)).rank, 1)
+        self.assertEqual(board.size(), 6)
+
+    def test_saves_reach_the_board_on_commit(self):
+        leaderboard.rank(self.pk(6))
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = self.profiles[6]
+            profile.diamonds = 100
+            profile.save()
+        self.assertEqual(leaderboard.rank(profile.pk).rank, 1)
+
+    def test_around(self):
+        self.assertEqual([e.rank for e in leaderboard.around(self.pk(3), 2)], [2, 3, 4, 5, 6])
+        self.assertEqual([e.rank for e in leaderboard.around(self.pk(0), 2)], [1, 2, 3])
+        self.assertEqual([e.rank for e in leaderboard.around(self.pk(6), 1)], [6, 7])
+        self.assertEqual(leaderboard.around(0), [])
+
+    def test_around_endpoint(self):
+        self.client.force_login(self.profiles[3].user)
+        rows = self.client.get('/api/leaderboard/around/', {'radius': 1}).json()
+        self.assertEqual([(row['rank'], row['is_me']) for row in rows], [(3, False), (4, True), (5, False)])
+        # A bad radius falls back to the default
+        self.assertEqual(len(self.client.get('/api/leaderboard/around/', {'radius': 'x'}).json()), 7)
+
+    def test_me_endpoint(self):
+        self.client.force_login(self.profiles[1].user)
+        self.assertEqual(
+            self.client.get('/api/leaderboard/me/').json(), {'rank': 2, 'diamonds': 40, 'total_players': 7},
+        )
+
+
+class LeaderboardSnapshotTests(TestCase):
+    def setUp(self):
+        self.a = make_profile('a', coins=300, click_level=2, click_xp=5)
+        self.b = make_profile('b', coins=300, click_level=2, click_xp=50)
+        self.c = make_profile('c', coins=900, click_level=1)
+        PrestigeMultiplier.objects.create(player=self.b, prestige_count=2)
+
+    def ranking(self, category):
+        return [(row.rank, row.player_id, row.value) for row in leaderboard_snapshots.get_page(category, 1, 10)]
+
+    def test_build_ranks_every_category(self):
+        leaderboard_snapshots.build_all()
+        a, b, c = self.a.pk, self.b.pk, self.c.pk
+        # Ties fall back to id, click level to XP, missing prestige rows count as 0
+        self.assertEqual(self.ranking('coins'), [(1, c, 900), (2, a, 300), (3, b, 300)])
+        self.assertEqual(self.ranking('click_level'), [(1, b, 2), (2, a, 2), (3, c, 1)])
+        self.assertEqual(self.ranking('prestige'), [(1, b, 2), (2, a, 0), (3, c, 0)])
+
+    def test_rebuild_replaces_the_snapshot(self):
+        leaderboard_snapshots.build_snapshot('coins')
+        PlayerProfile.objects.filter(pk=self.a.pk).update(coins=1000)
+        make_profile('d', coins=1)
+        leaderboard_snapshots.build_snapshot('coins')
+        self.assertEqual(LeaderboardSnapshot.objects.filter(category='coins').count(), 4)
+        self.assertEqual(self.ranking('coins')[0][1], self.a.pk)
+
+    def test_pages_size_and_player_ranks(self):
+        leaderboard_snapshots.build_all()
+        self.assertEqual([row.rank for row in leaderboard_snapshots.get_page('coins', 2, 2)], [3])
+        self.assertEqual(leaderboard_snapshots.get_size('coins'), 3)
+        self.assertEqual(leaderboard_snapshots.get_size('mining_power'), 3)
+        ranks = leaderboard_snapshots.get_player_ranks(self.b.pk)
+        self.assertEqual({category: row.rank for category, row in ranks.items()},
+                         {'coins': 3, 'mining_power': 2, 'click_level': 1, 'prestige': 1})
+
+    def test_category_endpoint(self):
+        leaderboard_snapshots.build_all()
+        self.client.force_login(self.a.user)
+        data = self.client.get('/api/leaderboard/category/coins/').json()
+        self.assertEqual((data['count'], data['results'][0]['username']), (3, 'c'))
+        self.assertEqual(self.client.get('/api/leaderboard/category/nope/').status_code, 400)
+
+
+class CacheManagerTests(TestCase):
+    namespace = GameCacheManager.LEADERBOARD_PREFIX
+
+    def setUp(self):
+        cache.clear()
+        GameCacheManager.stats.reset()
+        self.calls = []
+
+    def compute(self, value='fresh'):
+        def compute():
+            self.calls.append(value)
+            return value
+        return compute
+
+    def counters(self):
+        return GameCacheManager.stats.snapshot()[self.namespace]
+
+    def expire(self, key):
+        cache_key = GameCacheManager.make_key(self.namespace, key)
+        _, value = cache.get(cache_key)
+        cache.set(cache_key, (0, value))
+        return cache_key
+
+    def test_miss_then_hit(self):
+        self.assertEqual(GameCacheManager.get_or_compute(self.namespace, 'k', self.compute()), 'fresh')
+        self.assertEqual(GameCacheManager.get_or_compute(self.namespace, 'k', self.compute('again')), 'fresh')
+        self.assertEqual(self.calls, ['fresh'])
+        counters = self.counters()
+        self.assertEqual((counters['misses'], counters['hits'], counters['computes']), (1, 1, 1))
+
+    def test_stale_value_served_while_another_request_recomputes(self):
+        GameCacheManager.get_or_compute(self.namespace, 'k', self.compute('old'))
+        cache_key = self.expire('k')
+        cache.add(f'lock:{cache_key}', 1)
+        self.assertEqual(GameCacheManager.get_or_compute(self.namespace, 'k', self.compute('new')), 'old')
+        self.assertEqual(self.calls, ['old'])
+
+        cache.delete(f'lock:{cache_key}')
+        self.assertEqual(GameCacheManager.get_or_compute(self.namespace, 'k', self.compute('new')), 'new')
+        self.assertEqual(self.counters()['stale_hits'], 2)
+
+    def test_miss_waits_for_the_lock_holder(self):
+        cache_key = GameCacheManager.make_key(self.namespace, 'k')
+        cache.add(f'lock:{cache_key}', 1)
+        holder = threading.Timer(0.1, lambda: cache.set(cache_key, (float('inf'), 'theirs')))
+        holder.start()
+        self.assertEqual(GameCacheManager.get_or_compute(self.namespace, 'k', self.compute()), 'theirs')
+        holder.join()
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.counters()['lock_waits'], 1)
+
+    @mock.patch.object(GameCacheManager, 'LOCK_WAIT', 0.1)
+    def test_miss_computes_when_the_lock_holder_never_finishes(self):
+        cache.add(f'lock:{GameCacheManager.make_key(self.namespace, "k")}', 1)
+        self.assertEqual(GameCacheManager.get_or_compute(self.namespace, 'k', self.compute()), 'fresh')
+        self.assertEqual(self.calls, ['fresh'])
+
+    def test_generation_bump_orphans_versioned_keys(self):
+        GameCacheManager.get_or_compute(self.namespace, 'k', self.compute('old'))
+        cache.delete(GameCacheManager.DEBOUNCE_KEY.format(self.namespace))
+        self.assertTrue(GameCacheManager.invalidate_namespace(self.namespace))
+        self.assertEqual(GameCacheManager.get_or_compute(self.namespace, 'k', self.compute('new')), 'new')
+
+    def test_bumps_are_debounced(self):
+        generation = GameCacheManager.get_generation(self.namespace)
+        self.assertTrue(GameCacheManager.invalidate_namespace(self.namespace))
+        self.assertFalse(GameCacheManager.invalidate_namespace(self.namespace))
+        bumped = GameCacheManager.get_generation(self.namespace)
+        self.assertEqual(bumped, generation + 1)
+        # The deferred bump is applied by the first read after the window
+        cache.delete(GameCacheManager.DEBOUNCE_KEY.format(self.namespace))
+        self.assertEqual(GameCacheManager.get_generation(self.namespace), bumped + 1)
+        self.assertEqual(GameCacheManager.get_generation(self.namespace), bumped + 1)
+
+    def test_undebounced_namespace_bumps_every_time(self):
+        namespace = GameCacheManager.CATALOG_PREFIX
+        generation = GameCacheManager.get_generation(namespace)
+        GameCacheManager.invalidate_namespace(namespace)
+        GameCacheManager.invalidate_namespace(namespace)
+        self.assertEqual(GameCacheManager.get_generation(namespace), generation + 2)
+
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.item = GameItem.objects.create(name='Ring', item_code='ring', item_type='SKIN', price_diamonds=5)
+        catalog.refresh()
+        self.profile = make_profile('shopper', diamonds=100)
+        self.client.force_login(self.profile.user)
+
+    def generation(self):
+        return GameCacheManager.get_generation(GameCacheManager.CATALOG_PREFIX)
+
+    def test_edit_refreshes_after_commit(self):
+        generation = self.generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.price_diamonds = 7
+            self.item.save()
+        self.assertNotEqual(self.generation(), generation)
+        self.assertEqual(catalog.get_item(self.item.id).price_diamonds, 7)
+
+    def test_unchanged_save_keeps_the_generation(self):
+        generation = self.generation()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.item.save()
+        self.assertEqual((callbacks, self.generation()), ([], generation))
+
+    def test_buying_an_unlimited_item_keeps_the_generation(self):
+        snapshot = catalog.get_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(reverse('buy_item'), {'item_id': self.item.id}).status_code, 200)
+        self.assertIs(catalog.get_snapshot(), snapshot)
+
+    def test_buying_a_limited_item_publishes_the_stock(self):
+        GameItem.objects.filter(pk=self.item.pk).update(stock=2)
+        catalog.refresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('buy_item'), {'item_id': self.item.id})
+        self.assertEqual(catalog.get_item(self.item.id).stock, 1)
+
+    def test_other_processes_follow_the_generation(self):
+        self.assertEqual([r.id for r in catalog.shop_items('SKIN')], [self.item.id])
+        # Edited by another worker: only the shared generation moves here
+        GameItem.objects.filter(pk=self.item.pk).update(is_hidden_in_shop=True)
+        GameCacheManager.invalidate_namespace(GameCacheManager.CATALOG_PREFIX)
+        self.assertEqual(len(catalog.shop_items('SKIN')), 1)
+
+        self.client.get(reverse('login'))  # every request reads the generation
+        self.assertEqual(catalog.shop_items('SKIN'), ())
+        self.assertIsNone(catalog.get_item(self.item.id).image_url)
+
+    def test_local_lru(self):
+        lru, loads = catalog.LocalLRU(maxsize=2, ttl=60), []
+        for key in 'abca':
+            lru.get(key, lambda key=key: loads.append(key) or key)
+        # 'a' was evicted by 'c', then reloaded
+        self.assertEqual(loads, ['a', 'b', 'c', 'a'])
+        self.assertEqual(lru.get('c', lambda: 'reloaded'), 'c')
+
+
+def item_row(id, item_type='SKIN', price_diamonds=5, **fields):
+    record = dict.fromkeys(catalog.RECORD_FIELDS, 0)
+    record.update(id=id, name=f'item {id}', item_type=item_type, item_code=f'code{id}', description='', image='')
+    record.update({'price_diamonds': price_diamonds, 'is_hidden_in_shop': False, 'can_drop': False, **fields})
+    return tuple(record[field] for field in catalog.RECORD_FIELDS)
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        self.snapshot = catalog.CatalogSnapshot(3, [
+            item_row(1),
+            item_row(2, 'MINER'),
+            item_row(3, is_hidden_in_shop=True),
+            item_row(4, price_diamonds=0),
+            item_row(5, 'ENERGY'),
+        ])
+
+    def test_indexes(self):
+        snapshot = self.snapshot
+        self.assertEqual((snapshot.generation, len(snapshot)), (3, 5))
+        self.assertEqual(snapshot.by_id[2].item_type, 'MINER')
+        self.assertIs(snapshot.by_code['code2'], snapshot.by_id[2])
+        self.assertEqual([r.id for r in snapshot.by_type['SKIN']], [1, 3, 4])
+        self.assertIsInstance(snapshot.by_type['SKIN'], tuple)
+
+    def test_shop_lists_priced_visible_non_energy_items(self):
+        self.assertEqual([r.id for r in self.snapshot.shop], [1, 2])
+
+    def test_shop_json_is_built_once_and_script_safe(self):
+        snapshot = catalog.CatalogSnapshot(1, [item_row(1, name='</script><b>&')])
+        payload = snapshot.shop_json
+        self.assertIs(snapshot.shop_json, payload)
+        self.assertNotIn('<', payload)
+        self.assertEqual(json.loads(payload)[0]['name'], '</script><b>&')
+
+    def test_category_payloads_are_memoized(self):
+        payload = self.snapshot.category_payload('MINER')
+        self.assertIs(self.snapshot.category_payload('MINER'), payload)
+        self.assertIs(self.snapshot.category_payload(None), self.snapshot.category_payload('ALL'))
+        self.assertEqual(json.loads(payload.body)['count'], 1)
+
+    def test_build_snapshot_reads_the_shared_rows(self):
+        cache.clear()
+        GameItem.objects.create(name='Pick', item_code='pick', item_type='MINER', price_diamonds=3)
+        with self.assertNumQueries(1):
+            first = catalog.build_snapshot(7)
+        with self.assertNumQueries(0):
+            second = catalog.build_snapshot(7)
+        self.assertEqual(first.items, second.items)
+        self.assertEqual(second.by_code['pick'].price_diamonds, 3)
+
+
+class ShopPayloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        GameItem.objects.create(name='Ring', item_code='ring', item_type='SKIN', price_diamonds=5)
+        catalog.refresh()
+        self.client.force_login(make_profile('browser').user)
+
+    def shop(self, **headers):
+        return self.client.get(reverse('shop-list'), headers=headers)
+
+    def test_page_envelope(self):
+        response = self.shop()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_etag_revalidates_to_304(self):
+        etag = self.shop()['ETag']
+        response = self.shop(if_none_match=etag)
+        self.assertEqual((response.status_code, response['ETag']), (304, etag))
+        self.assertEqual(self.shop(if_none_match=f'W/{etag}').status_code, 304)
+        self.assertEqual(self.shop(if_none_match='"stale"').status_code, 200)
+
+    def test_each_encoding_has_its_own_etag(self):
+        plain = self.shop()
+        gzipped = self.shop(accept_encoding='br, gzip;q=0.5')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped.content), plain.content)
+        self.assertNotEqual(gzipped['ETag'], plain['ETag'])
+        self.assertIn('Accept-Encoding', gzipped['Vary'])
+        # A cached gzip body does not validate an identity request, nor the reverse
+        self.assertEqual(self.shop(if_none_match=gzipped['ETag']).status_code, 200)
+        self.assertEqual(self.shop(accept_encoding='gzip', if_none_match=plain['ETag']).status_code, 200)
+        self.assertEqual(self.shop(accept_encoding='gzip', if_none_match=gzipped['ETag']).status_code, 304)
+
+    def test_gzip_refused_by_q_value(self):
+        for accept in ('gzip;q=0', 'gzip;q=0, identity', '*;q=0', 'br'):
+            self.assertNotIn('Content-Encoding', self.shop(accept_encoding=accept), accept)
+        self.assertEqual(self.shop(accept_encoding='*')['Content-Encoding'], 'gzip')
+
+    def test_catalog_edit_changes_the_etag(self):
+        etag = self.shop()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            GameItem.objects.filter(item_code='ring').get().delete()
+        self.assertEqual(self.shop(if_none_match=etag).status_code, 200)
+
+
+class ItemSearchTests(TestCase):
+    def setUp(self):
+        self.index = item_search.SearchIndex([
+            catalog.ItemRecord._make(item_row(1, name='کلید طلایی', item_code='gold_key')),
+            catalog.ItemRecord._make(item_row(2, name='ماینر ۳ هسته‌ای', item_code='miner3')),
+            catalog.ItemRecord._make(item_row(3, name='کیف', item_code='bag')),
+            catalog.ItemRecord._make(item_row(4, name='Golden Pickaxe', item_code='pick_gold')),
+        ])
+
+    def ids(self, query):
+        return [record.id for record in self.index.search(query)]
+
+    def test_normalize(self):
+        normalize = item_search.normalize
+        self.assertEqual(normalize('كليد'), 'کلید')  # Arabic kaf/yeh
+        self.assertEqual(normalize('ماینر ٣'), normalize('ماینر ۳'))
+        self.assertEqual(normalize('ماینر ۳'), 'ماینر 3')
+        self.assertEqual(normalize('کـــیف'), 'کیف')  # tatweel
+        self.assertEqual(normalize('کَیف'), 'کیف')  # diacritics
+        self.assertEqual(normalize('هسته‌ای'), 'هسته ای')  # ZWNJ
+        self.assertEqual(normalize('  GOLD-Key '), 'gold key')
+
+    def test_arabic_spelling_finds_persian_names(self):
+        self.assertEqual(self.ids('كليد'), [1])
+        self.assertEqual(self.ids('ماینر 3'), [2])
+
+    def test_zwnj_variants_match(self):
+        for query in ('هسته‌ای', 'هسته ای', 'هستهای'):
+            self.assertEqual(self.ids(query), [2], query)
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.ids('gold'), [4, 1])
+        self.assertEqual(self.ids('golden key'), [])
+        self.assertEqual(self.ids(''), [])
+
+    def test_ranking(self):
+        self.assertEqual(self.ids('کیف'), [3])
+        self.assertEqual(self.ids('pick'), [4])  # code prefix, word prefix
+        self.assertEqual(self.index.search('gold', limit=1)[0].id, 4)
+
+    def test_shop_api_uses_the_index(self):
+        cache.clear()
+        GameItem.objects.create(name='کلید طلایی', item_code='gold_key', item_type='SKIN', price_diamonds=5)
+        catalog.refresh()
+        self.client.force_login(make_profile('searcher').user)
+        results = self.client.get(reverse('shop-list'), {'q': 'كليد'}).json()['results']
+        self.assertEqual([item['item_code'] for item in results], ['gold_key'])
+
+
+class LeanProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.skin = GameItem.objects.create(name='Cape', item_code='cape', item_type='SKIN', price_diamonds=5)
+        catalog.refresh()
+        self.profile = make_profile('lean', coins=42, equipped_skin=self.skin)
+        self.client.force_login(self.profile.user)
+
+    def test_me_lean(self):
+        url = reverse('player-profile-me-lean')
+        self.client.get(url)  # warm the catalog payload
+        with self.assertNumQueries(3):  # session, user, profile
+            data = self.client.get(url).json()
+        full = self.client.get(reverse('player-profile-me')).json()
+        for field in serializers.LEAN_PROFILE_FIELDS + ('active_boost_until', 'last_mined_at'):
+            self.assertEqual(data[field], full[field], field)
+        self.assertEqual((data['username'], data['coins']), ('lean', 42))
+        self.assertEqual(data['items'], {
+            'equipped_skin': self.skin.id, 'avatar': None, 'slot_1': None, 'slot_2': None, 'slot_3': None,
+        })
+        catalog_response = self.client.get(data['catalog']['url'])
+        self.assertEqual(catalog_response['ETag'], data['catalog']['etag'])
+        self.assertIn(self.skin.id, [item['id'] for item in catalog_response.json()])
+
+    def test_bench_serializers(self):
+        out = StringIO()
+        call_command('bench_serializers', profiles=1, rounds=1, stdout=out)
+        self.assertEqual([line.split()[0] for line in out.getvalue().splitlines()[1:]], ['baseline', 'serializer', 'lean'])
+
+
+class FastJSONRendererTests(TestCase):
+    data = {
+        'int': 1, 'float': 1.5, 'none': None, 'bool': True, 'list': [1, 'a', {'nested': []}],
+        'text': 'ماینر ۳ <b>&é', 1: 'int key',
+        'decimal': Decimal('12.50'), 'when': datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=dt_timezone.utc),
+        'day': date(2024, 1, 2), 'uuid': UUID(int=1), 'lazy': gettext_lazy('Shop'),
+    }
+
+    def test_matches_json_renderer(self):
+        expected = JSONRenderer().render(self.data)
+        for encoder in ('auto', 'stdlib'):
+            with self.subTest(encoder=encoder), override_settings(GAME_JSON={'ENCODER': encoder}):
+                self.assertEqual(FastJSONRenderer().render(self.data), expected)
+
+    def test_indented_output_uses_the_stdlib_renderer(self):
+        media_type = 'application/json; indent=2'
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, media_type),
+            JSONRenderer().render(self.data, media_type),
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_fast_json_response(self):
+        data = {key: value for key, value in self.data.items() if key not in ('lazy', 'uuid')}
+        self.assertEqual(json.loads(FastJsonResponse(data).content), json.loads(JsonResponse(data).content))
+        with self.assertRaises(TypeError):
+            FastJsonResponse([1])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        item = GameItem.objects.create(name='Rig', item_code='rig', item_type='MINER')
+        self.seller = make_profile('seller')
+        listings = MarketListing.objects.bulk_create(
+            [MarketListing(seller=self.seller, item=item, price=1) for _ in range(7)]
+        )
+        # Ties on created_at are broken by id
+        MarketListing.objects.filter(pk__in=[listing.pk for listing in listings[:4]]).update(created_at=timezone.now())
+        self.expected = list(MarketListing.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def test_cursor_round_trip(self):
+        now = timezone.now()
+        values, reverse = decode_cursor(encode_cursor([now, 42], reverse=True))
+        self.assertEqual((values, reverse), ([now.isoformat(), 42], True))
+        self.assertEqual(decode_cursor(encode_cursor(['a'])), (['a'], False))
+        for cursor in ('not a cursor', encode_cursor([1])[:-2], 'eyJhIjoxfQ=='):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_walks_every_listing_once_and_back(self):
+        paginator, queryset = MarketListingPagination(), MarketListing.objects.all()
+        seen, cursor, pages = [], None, []
+        while True:
+            rows, cursor, previous = paginator.get_page(queryset, cursor, 3)
+            pages.append((rows, previous))
+            seen.extend(row.pk for row in rows)
+            if not cursor:
+                break
+        self.assertEqual(seen, self.expected)
+        self.assertIsNone(pages[0][1])
+        # The previous cursor of each page leads back to the page before it
+        for (rows, _), (_, previous) in zip(pages, pages[1:]):
+            self.assertEqual([row.pk for row in paginator.get_page(queryset, previous, 3)[0]], [row.pk for row in rows])
+
+    def test_api_follows_next_links(self):
+        self.client.force_login(make_profile('browser').user)
+        seen, url = [], reverse('marketplace-list') + '?limit=3'
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(listing['id'] for listing in data['results'])
+            url = data['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(self.client.get(reverse('marketplace-list'), {'cursor': 'bogus'}).status_code, 404)
+
+
+class OrderBookDepthTests(TestCase):
+    def setUp(self):
+        self.item = GameItem.objects.create(name='Rig', item_code='rig', item_type='MINER')
+        self.seller = make_profile('seller')
+
+    def list_at(self, *prices):
+        return [MarketListing.objects.create(seller=self.seller, item=self.item, price=price) for price in prices]
+
+    def assert_depth_matches_listings(self):
+        prices = sorted(MarketListing.objects.filter(item=self.item).values_list('price', flat=True))
+        depth = MarketDepth.objects.filter(item=self.item).first()
+        if not prices:
+            self.assertIsNone(depth)
+            return
+        middle = prices[(len(prices) - 1) // 2:len(prices) // 2 + 1]
+        self.assertEqual(
+            (depth.listing_count, depth.min_price, depth.median_price),
+            (len(prices), prices[0], sum(middle) / len(middle)),
+        )
+
+    def test_incremental_median_matches_recompute(self):
+        rng = random.Random(5)
+        for _ in range(150):
+            listing = MarketListing.objects.filter(item=self.item).order_by('?').first()
+            if listing and rng.random() < 0.4:
+                listing.delete()
+            else:
+                self.list_at(rng.randint(1, 6))
+            self.assert_depth_matches_listings()
+        self.assertEqual(order_book.rebuild_all(), MarketDepth.objects.count())
+        self.assert_depth_matches_listings()
+
+    def test_edits_and_bulk_deletes_recompute(self):
+        listings = self.list_at(5, 3, 8, 8)
+        listings[0].price = 1
+        listings[0].save()
+        self.assert_depth_matches_listings()
+        MarketListing.objects.filter(price=8).delete()
+        self.assert_depth_matches_listings()
+
+    def test_insert_is_a_few_index_seeks(self):
+        self.list_at(*range(1, 60))
+        with CaptureQueriesContext(connection) as queries:
+            self.list_at(2)
+        seeks = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'FROM "game_marketlisting"' in q['sql']]
+        # Median successor/predecessor, upper middle and min price, never an aggregate
+        self.assertLessEqual(len(seeks), 3)
+        for sql in seeks:
+            self.assertTrue(sql.endswith('LIMIT 1'), sql)
+            self.assertNotIn('COUNT(', sql)
+        self.assert_depth_matches_listings()
+
+    def test_book_is_cheapest_then_oldest_first(self):
+        listings = self.list_at(5, 3, 5, 9)
+        self.assertEqual(
+            [listing.pk for listing in order_book.book(self.item.id, max_price=5)],
+            [listings[1].pk, listings[0].pk, listings[2].pk],
+        )
+        self.assertEqual([listing.price for listing in order_book.cheapest(self.item.id, 2)], [3, 5])
+
+
+class BulkTradeTests(TestCase):
+    def setUp(self):
+        Achievement.objects.all().delete()
+        self.item = GameItem.objects.create(name='Rig', item_code='rig', item_type='MINER')
+        self.sellers = [make_profile(f'seller{i}', diamonds=0) for i in range(2)]
+        self.buyer = make_profile('buyer', diamonds=100)
+        for seller, prices in zip(self.sellers, ([10, 10, 30], [7, 7, 12])):
+            for price in prices:
+                MarketListing.objects.create(seller=seller, item=self.item, price=price)
+        MarketListing.objects.create(seller=self.buyer, item=self.item, price=1)
+
+    def diamonds(self, profile):
+        return PlayerProfile.objects.get(pk=profile.pk).diamonds
+
+    def test_lock_profiles_in_primary_key_order(self):
+        ids = [self.buyer.pk, self.sellers[1].pk, self.sellers[0].pk]
+        with CaptureQueriesContext(connection) as queries:
+            locked = trading.lock_profiles(ids)
+        self.assertEqual(list(locked), sorted(ids))
+        self.assertIn('ORDER BY "game_playerprofile"."id" ASC', queries[0]['sql'])
+
+    def test_buys_cheapest_first_and_fills_partially(self):
+        # 7 + 7 + 10 + 10 = 34; the next listing (12) is beyond max_price 11
+        trade = trading.buy_cheapest(self.buyer.pk, self.item.id, 10, max_price=11)
+        self.assertEqual((trade.status, trade.count, trade.diamonds), (trading.BOUGHT, 4, 34))
+        self.assertEqual(self.diamonds(self.buyer), 66)
+        self.assertEqual(self.diamonds(self.sellers[0]), 18)
+        self.assertEqual(self.diamonds(self.sellers[1]), 14)
+        self.assertEqual(Inventory.objects.get(player=self.buyer, item=self.item).quantity, 4)
+        # The buyer's own listing is never bought
+        self.assertTrue(MarketListing.objects.filter(seller=self.buyer).exists())
+
+    def test_stops_when_diamonds_run_out(self):
+        PlayerProfile.objects.filter(pk=self.buyer.pk).update(diamonds=20)
+        trade = trading.buy_cheapest(self.buyer.pk, self.item.id, 5, max_price=100)
+        self.assertEqual((trade.count, trade.diamonds), (2, 14))
+        self.assertEqual(self.diamonds(self.buyer), 6)
+
+        PlayerProfile.objects.filter(pk=self.buyer.pk).update(diamonds=1)
+        trade = trading.buy_cheapest(self.buyer.pk, self.item.id, 5, max_price=100)
+        self.assertEqual(trade.status, trading.NOT_ENOUGH_DIAMONDS)
+
+    def test_balances_use_set_based_updates(self):
+        with CaptureQueriesContext(connection) as queries:
+            trading.buy_cheapest(self.buyer.pk, self.item.id, 4, max_price=11)
+        balance_updates = [
+            q['sql'] for q in queries
+            if q['sql'].startswith('UPDATE "game_playerprofile" SET "diamonds" = ("game_playerprofile"."diamonds"')
+        ]
+        self.assertEqual(len(balance_updates), 2)
+
+    def test_list_units_locks_the_profile_before_the_inventory(self):
+        Inventory.objects.create(player=self.buyer, item=self.item, quantity=5)
+        with CaptureQueriesContext(connection) as queries:
+            trading.list_units(self.buyer.pk, self.item.id, 2, 9)
+        statements = [q['sql'] for q in queries]
+        inventory_update = next(i for i, sql in enumerate(statements) if sql.startswith('UPDATE "game_inventory"'))
+        self.assertTrue(any(
+            sql.startswith('SELECT') and 'FROM "game_playerprofile"' in sql for sql in statements[:inventory_update]
+        ))
+
+    def test_list_units_and_depth(self):
+        Inventory.objects.create(player=self.buyer, item=self.item, quantity=5)
+        trade = trading.list_units(self.buyer.pk, self.item.id, 4, 9)
+        self.assertEqual((trade.status, trade.count), (trading.LISTED, 4))
+        self.assertEqual(Inventory.objects.get(player=self.buyer, item=self.item).quantity, 1)
+        self.assertEqual(trading.list_units(self.buyer.pk, self.item.id, 2, 9).status, trading.NOT_ENOUGH_ITEMS)
+
+        trading.buy_cheapest(self.sellers[0].pk, self.item.id, 3, max_price=9)
+        prices = sorted(MarketListing.objects.filter(item=self.item).values_list('price', flat=True))
+        depth = MarketDepth.objects.get(item=self.item)
+        middle = prices[(len(prices) - 1) // 2:len(prices) // 2 + 1]
+        self.assertEqual(
+            (depth.listing_count, depth.min_price, depth.median_price),
+            (len(prices), prices[0], sum(middle) / len(middle)),
+        )
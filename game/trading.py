@@ -0,0 +1,168 @@
+# game/trading.py
+"""
+Bulk marketplace trades, each in one transaction.
+
+- list_units(): move `quantity` units of an item from a player's inventory
+  into as many listings at one price: a lock on the player's profile, a
+  conditional UPDATE of the inventory row and one bulk INSERT.
+- buy_cheapest(): buy up to `quantity` of the cheapest listings of an item
+  priced at most `max_price` (skipping the buyer's own), cheapest first,
+  for as long as the buyer's diamonds last.
+
+Every market write takes its locks in the same order: listings (in book
+order), then player profiles by primary key (lock_profiles), then
+inventory rows, then the item's MarketDepth row (order_book). Two trades over the same rows queue instead of
+deadlocking. Concurrent bulk buyers skip listings another buyer holds.
+
+Balances move with set-based UPDATEs: one for the buyer, one for all
+sellers (a CASE over seller ids, as in write_behind), one inventory upsert
+and one DELETE of the bought listings. Those bypass post_save, so the
+leaderboard, caches, mining stats and MarketDepth (one apply_changes()
+per batch) are updated here the way the signals would have.
+"""
+from collections import defaultdict, namedtuple
+
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+
+from . import catalog, leaderboard, mining_stats, order_book
+from .achievements import check_achievements
+from .cache_utils import GameCacheManager
+from .models import Inventory, MarketListing, PlayerProfile
+
+
+MAX_UNITS = 100  # listings per bulk list/buy request
+MARKET_TAX = 0.1  # share of the price kept by the market, as in buy_listing
+
+LISTED = 'listed'
+BOUGHT = 'bought'
+NOT_ENOUGH_ITEMS = 'not_enough_items'
+NO_LISTINGS = 'no_listings'
+NOT_ENOUGH_DIAMONDS = 'not_enough_diamonds'
+
+MESSAGES = {
+    NOT_ENOUGH_ITEMS: 'به این تعداد آیتم در موجودی شما نیست',
+    NO_LISTINGS: 'آگهی با این قیمت پیدا نشد',
+    NOT_ENOUGH_DIAMONDS: 'الماس کافی ندارید',
+}
+
+# count: listings created/bought, diamonds: asking total/amount spent
+Trade = namedtuple('Trade', 'status count diamonds listing_ids')
+
+
+def parse_order(quantity, price):
+    """Validate a bulk request's quantity and (max) price: ((quantity, price), None) or (None, message)."""
+    try:
+        quantity, price = int(quantity), int(price)
+    except (TypeError, ValueError):
+        return None, 'تعداد یا قیمت نامعتبر است'
+    if price < 1:
+        return None, 'قیمت باید بزرگتر از صفر باشد'
+    if not 1 <= quantity <= MAX_UNITS:
+        return None, f'تعداد باید بین 1 و {MAX_UNITS} باشد'
+    return (quantity, price), None
+
+
+def lock_profiles(profile_ids):
+    """Lock the given profiles in primary-key order; returns {pk: profile}."""
+    profiles = PlayerProfile.objects.select_for_update().filter(pk__in=set(profile_ids)).order_by('pk')
+    return {profile.pk: profile for profile in profiles}
+
+
+def seller_profit(price):
+    return price - int(price * MARKET_TAX)
+
+
+def _inventory_changed(profile_id, item_id):
+    # What the Inventory post_save receivers would have done
+    item = catalog.get_item(item_id)
+    if item is None or item.item_type == 'MINER':
+        mining_stats.refresh_profile(profile_id)
+
+
+def _add_units(profile_id, item_id, quantity):
+    # The profile row is locked, so no concurrent insert can race the create
+    updated = Inventory.objects.filter(player_id=profile_id, item_id=item_id).update(
+        quantity=F('quantity') + quantity
+    )
+    if updated:
+        _inventory_changed(profile_id, item_id)
+    else:
+        Inventory.objects.create(player_id=profile_id, item_id=item_id, quantity=quantity)
+
+
+@transaction.atomic
+def list_units(profile_id, item_id, quantity, price):
+    """List `quantity` units of `item_id` owned by `profile_id` at `price` each."""
+    # Profile before inventory, as every market write does (refresh_profile updates it below)
+    lock_profiles([profile_id])
+    taken = Inventory.objects.filter(
+        player_id=profile_id, item_id=item_id, quantity__gte=quantity
+    ).update(quantity=F('quantity') - quantity)
+    if not taken:
+        return Trade(NOT_ENOUGH_ITEMS, 0, 0, [])
+    _inventory_changed(profile_id, item_id)
+
+    listings = MarketListing.objects.bulk_create([
+        MarketListing(seller_id=profile_id, item_id=item_id, price=price) for _ in range(quantity)
+    ])
+    order_book.apply_changes(item_id, inserted=[order_book.listing_key(listing) for listing in listings])
+    return Trade(LISTED, quantity, quantity * price, [listing.pk for listing in listings])
+
+
+@transaction.atomic
+def buy_cheapest(buyer_id, item_id, quantity, max_price):
+    """
+    Buy up to `quantity` listings of `item_id` priced at most `max_price`,
+    cheapest (then oldest) first.
+    """
+    candidates = list(
+        order_book.book(item_id, max_price=max_price).exclude(seller_id=buyer_id)
+        .select_for_update(skip_locked=True).values_list('id', 'seller_id', 'price', 'created_at')[:quantity]
+    )
+    if not candidates:
+        return Trade(NO_LISTINGS, 0, 0, [])
+
+    profiles = lock_profiles([buyer_id, *(row[1] for row in candidates)])
+    buyer = profiles[buyer_id]
+
+    # Cheapest first: take the longest prefix the buyer can pay for
+    spent, bought = 0, []
+    for listing_id, seller_id, price, created_at in candidates:
+        if spent + price > buyer.diamonds:
+            break
+        spent += price
+        bought.append((listing_id, seller_id, price, created_at))
+    if not bought:
+        return Trade(NOT_ENOUGH_DIAMONDS, 0, 0, [])
+
+    profits = defaultdict(int)
+    for _, seller_id, price, _ in bought:
+        profits[seller_id] += seller_profit(price)
+
+    PlayerProfile.objects.filter(pk=buyer_id).update(diamonds=F('diamonds') - spent)
+    PlayerProfile.objects.filter(pk__in=list(profits)).update(diamonds=F('diamonds') + Case(
+        *[When(pk=pk, then=Value(profit)) for pk, profit in profits.items()],
+        default=Value(0), output_field=models.IntegerField(),
+    ))
+    buyer.diamonds -= spent
+    for seller_id, profit in profits.items():
+        profiles[seller_id].diamonds += profit
+
+    listing_ids = [row[0] for row in bought]
+    with order_book.deferred():
+        MarketListing.objects.filter(pk__in=listing_ids).delete()
+    _add_units(buyer_id, item_id, len(bought))
+    order_book.apply_changes(item_id, removed=[
+        (price, created_at, listing_id) for listing_id, _, price, created_at in bought
+    ])
+
+    touched = [buyer_id, *profits]
+    leaderboard.record_scores({pk: profiles[pk].diamonds for pk in touched})
+    transaction.on_commit(GameCacheManager.invalidate_leaderboard)
+
+    check_achievements(buyer, inventory_changed=True)
+    for seller_id in profits:
+        check_achievements(profiles[seller_id])
+    return Trade(BOUGHT, len(bought), spent, listing_ids)
+
@@ -19,6 +19,7 @@ urlpatterns = [
 
     # API ها
     path('api/click/', views.click_coin, name='click_coin'),
+    path('api/click/batch/', views.click_batch, name='click_batch'),
     path('api/buy/', views.buy_item, name='buy_item'),
     path('api/mine/', views.claim_mining, name='claim_mining'),
     path('api/daily/', views.claim_daily_reward, name='claim_daily'),
@@ -33,6 +34,8 @@ urlpatterns = [
     
     path('api/market/sell/', views.create_listing, name='market_sell'),
     path('api/market/buy/', views.buy_listing, name='market_buy'),
+    path('api/market/sell/bulk/', views.create_listings_bulk, name='market_sell_bulk'),
+    path('api/market/buy/bulk/', views.buy_listings_bulk, name='market_buy_bulk'),
     path('api/auction/create/', views.create_auction, name='auction_create'),
     path('api/auction/bid/', views.bid_auction, name='auction_bid'),
 
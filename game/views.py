@@ -2,11 +2,9 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
-from django.http import JsonResponse
 from django.utils import timezone
 from datetime import timedelta
 from django.db import transaction
-from django.db.models import Q
 
 from .models import (
     PlayerProfile,
@@ -18,192 +16,31 @@ from .models import (
     Achievement,
     UserAchievement,
     AuctionListing,
-    UserQuest,
 )
+from .achievements import check_achievements
+from .click_utils import ClickEngine
+from .effective_stats import apply_effective_stats
+from .quests import quests_for_day, update_quest_progress
+from .pagination import MarketListingPagination
+from .renderers import FastJsonResponse
+from .cache_utils import GameCacheManager
+from . import catalog, leaderboard, mining, order_book, trading, write_behind
 
 import random
 
 
-DEFAULT_ACHIEVEMENTS = [
-    {
-        'code': 'coins_1k',
-        'title': 'تازه پولدار',
-        'description': 'رسیدن به ۱,۰۰۰ کوین',
-        'icon': 'fas fa-coins',
-        'target_coins': 1000,
-        'target_diamonds': 0,
-        'target_miners': 0,
-        'reward_coins': 0,
-        'reward_diamonds': 2,
-    },
-    {
-        'code': 'coins_100k',
-        'title': 'میلیونر کوچولو',
-        'description': 'رسیدن به ۱۰۰,۰۰۰ کوین',
-        'icon': 'fas fa-gem',
-        'target_coins': 100000,
-        'target_diamonds': 0,
-        'target_miners': 0,
-        'reward_coins': 0,
-        'reward_diamonds': 10,
-    },
-    {
-        'code': 'diamond_10',
-        'title': 'کالکتر الماس',
-        'description': 'جمع کردن ۱۰ الماس',
-        'icon': 'fas fa-diamond',
-        'target_coins': 0,
-        'target_diamonds': 10,
-        'target_miners': 0,
-        'reward_coins': 2000,
-        'reward_diamonds': 0,
-    },
-    {
-        'code': 'miner_owner',
-        'title': 'اولین ماینر',
-        'description': 'داشتن حداقل یک ماینر',
-        'icon': 'fas fa-hammer',
-        'target_coins': 0,
-        'target_diamonds': 0,
-        'target_miners': 1,
-        'reward_coins': 500,
-        'reward_diamonds': 1,
-    },
-]
-
-DEFAULT_QUESTS = [
-    {
-        'code': 'click_500',
-        'title': '۵۰۰ کلیک',
-        'quest_type': 'CLICK',
-        'goal': 500,
-        'reward_coins': 1000,
-        'reward_diamonds': 2,
-        'reward_xp': 50,
-    },
-    {
-        'code': 'click_2k',
-        'title': '۲۰۰۰ کلیک',
-        'quest_type': 'CLICK',
-        'goal': 2000,
-        'reward_coins': 4000,
-        'reward_diamonds': 5,
-        'reward_xp': 150,
-    },
-    {
-        'code': 'mine_5',
-        'title': '۵ بار ماین',
-        'quest_type': 'MINE',
-        'goal': 5,
-        'reward_coins': 5000,
-        'reward_diamonds': 3,
-        'reward_xp': 100,
-    },
-]
-
-
-def ensure_default_achievements():
-    for data in DEFAULT_ACHIEVEMENTS:
-        Achievement.objects.get_or_create(
-            code=data['code'],
-            defaults={
-                'title': data['title'],
-                'description': data['description'],
-                'icon': data['icon'],
-                'target_coins': data['target_coins'],
-                'target_diamonds': data['target_diamonds'],
-                'target_miners': data['target_miners'],
-                'reward_coins': data['reward_coins'],
-                'reward_diamonds': data['reward_diamonds'],
-            },
-        )
-
-
-def check_achievements(profile: PlayerProfile):
-    ensure_default_achievements()
-
-    miners_count = Inventory.objects.filter(player=profile, item__item_type='MINER', quantity__gt=0).count()
-    achievements = Achievement.objects.all()
-
-    unlocked_codes = set(
-        UserAchievement.objects.filter(player=profile).values_list('achievement__code', flat=True)
-    )
-
-    newly_unlocked = []
-    for ach in achievements:
-        if ach.code in unlocked_codes:
-            continue
-        if ach.target_coins and profile.coins < ach.target_coins:
-            continue
-        if ach.target_diamonds and profile.diamonds < ach.target_diamonds:
-            continue
-        if ach.target_miners and miners_count < ach.target_miners:
-            continue
-        ua = UserAchievement.objects.create(player=profile, achievement=ach)
-        if ach.reward_coins:
-            profile.coins += ach.reward_coins
-        if ach.reward_diamonds:
-            profile.diamonds += ach.reward_diamonds
-        newly_unlocked.append(ua)
-
-    if newly_unlocked:
-        profile.save()
-    return newly_unlocked
-
-
-def ensure_daily_quests(user):
-    today = timezone.now().date()
-    for q in DEFAULT_QUESTS:
-        uq, _ = UserQuest.objects.get_or_create(
-            user=user,
-            code=q['code'],
-            defaults={
-                'title': q['title'],
-                'quest_type': q['quest_type'],
-                'goal': q['goal'],
-                'reward_coins': q['reward_coins'],
-                'reward_diamonds': q['reward_diamonds'],
-                'reward_xp': q['reward_xp'],
-                'reset_at': today,
-            }
-        )
-        if uq.reset_at != today:
-            uq.progress = 0
-            uq.completed = False
-            uq.reset_at = today
-            uq.save()
-
-
-def update_quest_progress(user, quest_type, amount=1):
-    today = timezone.now().date()
-    quests = UserQuest.objects.filter(user=user, quest_type=quest_type)
-    for uq in quests:
-        if uq.reset_at != today:
-            uq.progress = 0
-            uq.completed = False
-            uq.reset_at = today
-        if uq.completed:
-            uq.save()
-            continue
-        uq.progress += amount
-        if uq.progress >= uq.goal:
-            uq.completed = True
-            profile = user.playerprofile
-            profile.coins += uq.reward_coins
-            profile.diamonds += uq.reward_diamonds
-            profile.click_xp += uq.reward_xp
-            profile.save()
-        uq.save()
+MARKET_PAGE_SIZE = 100  # listings per market page
+MARKET_DEPTH_ROWS = 50  # items in the market page's order-book summary
 
 
 # صفحات
 @login_required(login_url='/login/')
 def index(request):
     profile, _ = PlayerProfile.objects.get_or_create(user=request.user)
+    write_behind.merge_pending(profile)
     energy_percent = (profile.energy / 1000) * 100
 
-    ensure_daily_quests(request.user)
-    quests = UserQuest.objects.filter(user=request.user).order_by('code')
+    quests = quests_for_day(request.user)
     now = timezone.now()
     active_boost = None
     if profile.active_boost_until and profile.active_boost_until > now and profile.boost_multiplier > 1:
@@ -253,43 +90,10 @@ def logout_view(request):
 # صفحات بازی
 @login_required(login_url='/login/')
 def shop_page(request):
-    items = GameItem.objects.filter(price_diamonds__gt=0, is_hidden_in_shop=False).exclude(item_type='ENERGY')
-
     category = request.GET.get('cat')
-    if category and category != 'ALL':
-        items = items.filter(item_type=category)
-
-    search_query = request.GET.get('q')
-    if search_query:
-        items = items.filter(
-            Q(name__icontains=search_query) |
-            Q(item_code__icontains=search_query)
-        )
-    
-    # Serialize items to JSON for the template
-    import json
-    from django.core.serializers.json import DjangoJSONEncoder
-    
-    items_data = []
-    for item in items:
-        item_dict = {
-            'id': item.id,
-            'name': item.name,
-            'item_type': item.item_type,
-            'item_code': item.item_code,
-            'description': item.description,
-            'price_diamonds': item.price_diamonds,
-            'stock': item.stock,
-            'mining_rate': item.mining_rate,
-            'buff_click_coins': item.buff_click_coins,
-            'buff_mining_speed': item.buff_mining_speed,
-        }
-        if item.image:
-            item_dict['image_url'] = item.image.url
-        items_data.append(item_dict)
-    
+    # Prebuilt payload from the catalog snapshot (game/catalog.py)
     return render(request, 'shop.html', {
-        'items_json': json.dumps(items_data, DjangoJSONEncoder),
+        'items_json': catalog.shop_json(category, request.GET.get('q')),
         'current_cat': category
     })
 
@@ -304,19 +108,11 @@ def miner_room(request):
         quantity__gt=0
     ).select_related('item')
     
-    active_miners = miners.filter(is_active=True)
-    
-    # Use database aggregation instead of Python loops
-    from django.db.models import F, Sum
-    stats = active_miners.aggregate(
-        total_rate=Sum(F('item__mining_rate') * F('quantity')),
-        total_consumption=Sum(F('item__electricity_consumption') * F('quantity'))
-    )
-    
-    total_rate = stats['total_rate'] or 0
-    total_consumption = stats['total_consumption'] or 0
+    # Maintained aggregates (game/mining_stats.py) instead of a SUM per request
+    total_rate = profile.mining_power
+    total_consumption = profile.mining_consumption
 
-    energy_packs = GameItem.objects.filter(item_type='ENERGY')
+    energy_packs = catalog.items_of_type('ENERGY')
 
     return render(request, 'miner_room.html', {
         'miners': miners,
@@ -329,10 +125,16 @@ def miner_room(request):
 
 @login_required(login_url='/login/')
 def market_page(request):
-    # Optimize: Use select_related for related fields
-    listings = MarketListing.objects.exclude(
-        seller=request.user.playerprofile
-    ).select_related('item', 'seller', 'seller__user').order_by('-created_at')[:100]
+    profile = request.user.playerprofile
+    # One keyset query on the (created_at, id) index per page, first page included,
+    # so next_cursor is set exactly when more listings exist
+    queryset = MarketListing.objects.select_related('item', 'seller', 'seller__user').exclude(seller=profile)
+    try:
+        listings, next_cursor, _ = MarketListingPagination().get_page(
+            queryset, request.GET.get('cursor'), MARKET_PAGE_SIZE
+        )
+    except ValueError:
+        return redirect('market')
     
     my_inventory = Inventory.objects.filter(
         player=request.user.playerprofile, quantity__gt=0
@@ -344,6 +146,9 @@ def market_page(request):
 
     return render(request, 'market.html', {
         'listings': listings,
+        'next_cursor': next_cursor,
+        # Maintained per-item summaries (game/order_book.py), no aggregation here
+        'depth': order_book.depth_summaries()[:MARKET_DEPTH_ROWS],
         'my_inventory': my_inventory,
         'auctions': auctions,
     })
@@ -364,9 +169,9 @@ def inventory_page(request):
 
 @login_required(login_url='/login/')
 def leaderboard_page(request):
-    # Optimize: Use select_related and limit results
-    top_players = PlayerProfile.objects.select_related('user').order_by('-diamonds')[:100]
-    return render(request, 'leaderboard.html', {'top_players': top_players})
+    top_players = GameCacheManager.get_leaderboard(1, 100)
+    my_rank = leaderboard.rank(request.user.playerprofile.pk)
+    return render(request, 'leaderboard.html', {'top_players': top_players, 'my_rank': my_rank})
 
 
 @login_required(login_url='/login/')
@@ -394,7 +199,6 @@ def achievements_page(request):
     profile = request.user.playerprofile
     user_achievements = UserAchievement.objects.filter(player=profile).select_related('achievement')
     unlocked = {ua.achievement_id for ua in user_achievements}
-    ensure_default_achievements()
     achievements = Achievement.objects.all()
     return render(request, 'achievements.html', {
         'achievements': achievements,
@@ -405,106 +209,156 @@ def achievements_page(request):
 # API ها
 def _require_auth_json(request):
     if not request.user.is_authenticated:
-        return JsonResponse({'status': 'error', 'message': 'برای انجام این درخواست باید لاگین کنید'}, status=401)
+        return FastJsonResponse({'status': 'error', 'message': 'برای انجام این درخواست باید لاگین کنید'}, status=401)
     return None
 
 
 def _deduct_diamonds(profile: PlayerProfile, amount: int):
     if amount < 1:
-        return False, JsonResponse({'status': 'error', 'message': 'مبلغ شرط نامعتبر است'}, status=400)
+        return False, FastJsonResponse({'status': 'error', 'message': 'مبلغ شرط نامعتبر است'}, status=400)
     if profile.diamonds < amount:
-        return False, JsonResponse({'status': 'error', 'message': 'الماس کافی ندارید'}, status=400)
+        return False, FastJsonResponse({'status': 'error', 'message': 'الماس کافی ندارید'}, status=400)
     profile.diamonds -= amount
     return True, None
 
 
+def _no_energy_response():
+    return FastJsonResponse({
+        'status': 'error',
+        'message': 'انرژی کافی نیست',
+        'can_refill': True,
+        'refill_cost': ClickEngine.REFILL_COST,
+        'refill_amount': ClickEngine.REFILL_AMOUNT
+    }, status=400)
+
+
 def click_coin(request):
     auth_error = _require_auth_json(request)
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Only POST method allowed'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Only POST method allowed'}, status=405)
+
+    if write_behind.is_enabled():
+        return _click_coin_buffered(request)
 
     with transaction.atomic():
         profile = PlayerProfile.objects.select_for_update().get(user=request.user)
 
         if profile.energy < 1:
-            cost = 2
-            refill_amount = 50
-            return JsonResponse({
-                'status': 'error',
-                'message': 'انرژی کافی نیست',
-                'can_refill': True,
-                'refill_cost': cost,
-                'refill_amount': refill_amount
-            }, status=400)
-
-        profile.energy -= 1
-
-        extra_coins = 0
-        luck_multiplier = 1.0
-
-        active_slots = [profile.slot_1, profile.slot_2, profile.slot_3]
-        for item in active_slots:
-            if item:
-                extra_coins += item.buff_click_coins
-                if item.buff_luck > 0:
-                    luck_multiplier += (item.buff_luck / 100)
-
-        base_coin = 1 + (profile.click_level - 1)  # هر لول کلیک +1 کوین پایه
-        boost_active = profile.active_boost_until and profile.active_boost_until > timezone.now() and profile.boost_multiplier > 1
-        current_multiplier = profile.boost_multiplier if boost_active else 1.0
-        if not boost_active and profile.boost_multiplier != 1.0:
-            profile.boost_multiplier = 1.0
-            profile.active_boost_until = None
-
-        gained = int((base_coin + extra_coins) * current_multiplier)
-        gained = max(gained, 1)
-        profile.coins += gained
-        
-        diamond_found = False
-        chance_threshold = 1 * luck_multiplier 
-        
-        if random.uniform(0, 1000) <= chance_threshold:
-            profile.diamonds += 1
-            diamond_found = True
-
-        # XP برای لول کلیک
-        profile.click_xp += gained
-        leveled_up = False
-        while profile.click_xp >= profile.click_xp_to_next:
-            profile.click_xp -= profile.click_xp_to_next
-            profile.click_level += 1
-            profile.click_xp_to_next = int(profile.click_xp_to_next * 1.35)
-            leveled_up = True
-
-        loot_found = None
-        droppable_items = GameItem.objects.filter(can_drop=True)
-        for item in droppable_items:
-            final_drop_chance = item.drop_chance * luck_multiplier
-            if random.uniform(0, 100) <= final_drop_chance:
-                inv_item, _ = Inventory.objects.get_or_create(player=profile, item=item)
-                inv_item.quantity += 1
-                inv_item.save()
-                loot_found = item.name
-                break
+            return _no_energy_response()
+
+        result = ClickEngine.apply_clicks(profile, 1)
 
         profile.save()
-        check_achievements(profile)
+        check_achievements(profile, inventory_changed=bool(result['loot']))
+
+        return _click_response(profile, result)
+
+
+def _click_response(profile, result):
+    return FastJsonResponse({
+        'status': 'success',
+        'new_coins': profile.coins,
+        'new_diamonds': profile.diamonds,
+        'new_energy': profile.energy,
+        'loot': result['loot'][0] if result['loot'] else None,
+        'diamond_found': result['diamonds_found'] > 0,
+        'click_level': profile.click_level,
+        'click_xp': profile.click_xp,
+        'click_xp_to_next': profile.click_xp_to_next,
+        'leveled_up': result['leveled_up'],
+        'boost_multiplier': result['boost_multiplier'],
+        'boost_seconds': result['boost_seconds'],
+    })
+
 
-        return JsonResponse({
+def _click_coin_buffered(request):
+    """
+    Write-behind click: the click's energy is reserved with a conditional
+    UPDATE and a plain click (coins/XP only) is recorded in the buffer
+    without locking or saving the profile. Clicks that also find a diamond,
+    loot, a level-up or expire a boost flush the buffer and are applied
+    under the row lock as usual.
+    """
+    buffer = write_behind.get_buffer()
+    profile = PlayerProfile.objects.get(user=request.user)
+    if not write_behind.reserve_energy(profile.pk):
+        return _no_energy_response()
+    buffer.merge(profile)
+    # The row was read before the reservation; apply_clicks spends the unit in memory
+    profile.energy = max(profile.energy, 1)
+
+    boost_was_set = profile.boost_multiplier != 1.0
+    result = ClickEngine.apply_clicks(profile, 1)
+    boost_cleared = boost_was_set and profile.boost_multiplier == 1.0
+
+    if not (result['diamonds_found'] or result['leveled_up'] or result['loot'] or boost_cleared):
+        buffer.record(profile.id, coins=result['gained'], click_xp=result['gained'])
+        return _click_response(profile, result)
+
+    with transaction.atomic():
+        profile = PlayerProfile.objects.select_for_update().get(pk=profile.pk)
+        # Energy was already taken by the reservation; only the buffered counters move
+        levels_gained = ClickEngine.sync_pending(profile)
+        ClickEngine.get_boost(profile)
+        profile.coins += result['gained']
+        profile.diamonds += result['diamonds_found']
+        profile.click_xp += result['gained']
+        result['leveled_up'] = levels_gained + ClickEngine.resolve_level_ups(profile) > 0
+        profile.save()
+        check_achievements(profile, inventory_changed=bool(result['loot']))
+    return _click_response(profile, result)
+
+
+def click_batch(request):
+    """Apply several client-side clicks in one locked transaction."""
+    auth_error = _require_auth_json(request)
+    if auth_error:
+        return auth_error
+    if request.method != 'POST':
+        return FastJsonResponse({'status': 'error', 'message': 'Only POST method allowed'}, status=405)
+
+    try:
+        count = int(request.POST.get('count'))
+        window_ms = int(request.POST.get('window_ms'))
+    except (TypeError, ValueError):
+        return FastJsonResponse({'status': 'error', 'message': 'تعداد کلیک یا بازه زمانی نامعتبر است'}, status=400)
+    if count < 1 or window_ms < 1:
+        return FastJsonResponse({'status': 'error', 'message': 'تعداد کلیک یا بازه زمانی نامعتبر است'}, status=400)
+
+    with transaction.atomic():
+        profile = PlayerProfile.objects.select_for_update().get(user=request.user)
+        levels_gained = ClickEngine.sync_pending(profile)
+
+        if count > ClickEngine.max_clicks_for_window(profile.id, window_ms):
+            return FastJsonResponse({'status': 'error', 'message': 'تعداد کلیک‌ها بیش از حد مجاز است'}, status=429)
+
+        if profile.energy < 1:
+            return _no_energy_response()
+
+        result = ClickEngine.apply_clicks(profile, count)
+        result['leveled_up'] = result['leveled_up'] or levels_gained > 0
+
+        profile.save()
+        check_achievements(profile, inventory_changed=bool(result['loot']))
+        ClickEngine.mark_batch(profile.id)
+
+        return FastJsonResponse({
             'status': 'success',
+            'applied': result['applied'],
+            'gained': result['gained'],
             'new_coins': profile.coins,
             'new_diamonds': profile.diamonds,
             'new_energy': profile.energy,
-            'loot': loot_found,
-            'diamond_found': diamond_found,
+            'loot': result['loot'],
+            'diamonds_found': result['diamonds_found'],
             'click_level': profile.click_level,
             'click_xp': profile.click_xp,
             'click_xp_to_next': profile.click_xp_to_next,
-            'leveled_up': leveled_up,
-            'boost_multiplier': current_multiplier,
-            'boost_seconds': int((profile.active_boost_until - timezone.now()).total_seconds()) if boost_active else 0
+            'leveled_up': result['leveled_up'],
+            'boost_multiplier': result['boost_multiplier'],
+            'boost_seconds': result['boost_seconds'],
         })
 
 
@@ -513,28 +367,28 @@ def buy_item(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     item_id = request.POST.get('item_id')
     if not item_id:
-        return JsonResponse({'status': 'error', 'message': 'آیتم نامعتبر است'}, status=400)
+        return FastJsonResponse({'status': 'error', 'message': 'آیتم نامعتبر است'}, status=400)
 
     with transaction.atomic():
         try:
             item = GameItem.objects.select_for_update().get(id=item_id)
         except GameItem.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'آیتم یافت نشد'}, status=404)
+            return FastJsonResponse({'status': 'error', 'message': 'آیتم یافت نشد'}, status=404)
 
         profile = PlayerProfile.objects.select_for_update().get(user=request.user)
 
         if item.is_hidden_in_shop or item.price_diamonds <= 0:
-            return JsonResponse({'status': 'error', 'message': 'خرید این آیتم مجاز نیست'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'خرید این آیتم مجاز نیست'}, status=400)
 
         if item.stock == 0:
-            return JsonResponse({'status': 'error', 'message': 'موجودی آیتم تمام شده است'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'موجودی آیتم تمام شده است'}, status=400)
 
         if profile.diamonds < item.price_diamonds:
-            return JsonResponse({'status': 'error', 'message': 'الماس کافی ندارید'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'الماس کافی ندارید'}, status=400)
 
         profile.diamonds -= item.price_diamonds
 
@@ -543,16 +397,16 @@ def buy_item(request):
         else:
             if item.stock > 0:
                 item.stock -= 1
+                item.save(update_fields=['stock'])
             inv_item, _ = Inventory.objects.select_for_update().get_or_create(
                 player=profile, item=item, defaults={'quantity': 0}
             )
             inv_item.quantity += 1
             inv_item.save()
-            item.save()
 
         profile.save()
-        check_achievements(profile)
-        return JsonResponse({'status': 'success', 'message': f'{item.name} با موفقیت خریداری شد'})
+        check_achievements(profile, inventory_changed=item.item_type != 'ENERGY')
+        return FastJsonResponse({'status': 'success', 'message': f'{item.name} با موفقیت خریداری شد'})
 
 
 def claim_mining(request):
@@ -560,72 +414,31 @@ def claim_mining(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Only POST method allowed'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Only POST method allowed'}, status=405)
 
     with transaction.atomic():
         profile = PlayerProfile.objects.select_for_update().get(user=request.user)
         now = timezone.now()
-        last_time = profile.last_mined_at or now
-        diff = now - last_time
-        hours_passed = diff.total_seconds() / 3600
-
-        if hours_passed < 0.016:
-            return JsonResponse({'status': 'error', 'message': '???? ??? ???!'}, status=400)
-
-        user_items = Inventory.objects.select_for_update().filter(player=profile, item__item_type='MINER', is_active=True)
-
-        mining_multiplier = 1.0
-        active_slots = [profile.slot_1, profile.slot_2, profile.slot_3]
-        for item in active_slots:
-            if item:
-                mining_multiplier += (item.buff_mining_speed / 100)
-
-        total_production = 0
-        total_consumption = 0
-        diamond_income = 0
-
-        for inv in user_items:
-            qty = inv.quantity
-            miner = inv.item
-            total_production += (miner.mining_rate * qty) * mining_multiplier
-            total_consumption += miner.electricity_consumption * qty
-
-            if miner.miner_diamond_chance > 0:
-                chance_factor = (miner.miner_diamond_chance / 100) * hours_passed * qty
-                if chance_factor > 1:
-                    diamond_income += int(chance_factor)
-                elif random.random() < chance_factor:
-                    diamond_income += 1
-
-        if total_production == 0:
-            profile.last_mined_at = now
-            profile.save()
-            return JsonResponse({'status': 'error', 'message': '?????? ???? ????? ??????'}, status=400)
+        result = mining.settle_profile(profile, now)
 
-        required_electricity = int(total_consumption * hours_passed)
+        if result.status == mining.TOO_SOON:
+            return FastJsonResponse({'status': 'error', 'message': '???? ??? ???!'}, status=400)
 
-        if profile.electricity <= 0 and required_electricity > 0:
-            return JsonResponse({'status': 'error', 'message': '??? ??????!'}, status=400)
-
-        actual_hours = hours_passed
-        if required_electricity > profile.electricity:
-            if total_consumption > 0:
-                ratio = profile.electricity / required_electricity
-                actual_hours = hours_passed * ratio
-            profile.electricity = 0
-        else:
-            profile.electricity -= required_electricity
+        if result.status == mining.NO_MINERS:
+            profile.last_mined_at = now
+            profile.save()
+            return FastJsonResponse({'status': 'error', 'message': '?????? ???? ????? ??????'}, status=400)
 
-        coin_income = int(total_production * actual_hours)
+        if result.status == mining.NO_ELECTRICITY:
+            return FastJsonResponse({'status': 'error', 'message': '??? ??????!'}, status=400)
 
-        profile.coins += coin_income
-        profile.diamonds += diamond_income
-        profile.last_mined_at = now
+        coin_income = result.coins
+        diamond_income = result.diamonds
+        update_quest_progress(profile, 'MINE', 1)
         profile.save()
-        update_quest_progress(request.user, 'MINE', 1)
         check_achievements(profile)
 
-    return JsonResponse({
+    return FastJsonResponse({
         'status': 'success',
         'message': f'{coin_income} ???? ? {diamond_income} ????? ?? ??? ??????',
         'new_coins': profile.coins,
@@ -638,7 +451,7 @@ def create_listing(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     item_id = request.POST.get('item_id')
     price_raw = request.POST.get('price')
@@ -646,22 +459,22 @@ def create_listing(request):
     try:
         price = int(price_raw)
     except (TypeError, ValueError):
-        return JsonResponse({'status': 'error', 'message': 'قیمت نامعتبر است'}, status=400)
+        return FastJsonResponse({'status': 'error', 'message': 'قیمت نامعتبر است'}, status=400)
 
     if price < 1:
-        return JsonResponse({'status': 'error', 'message': 'قیمت باید بزرگتر از صفر باشد'}, status=400)
+        return FastJsonResponse({'status': 'error', 'message': 'قیمت باید بزرگتر از صفر باشد'}, status=400)
 
     with transaction.atomic():
         profile = PlayerProfile.objects.select_for_update().get(user=request.user)
         try:
             inv_item = Inventory.objects.select_for_update().get(player=profile, item_id=item_id, quantity__gt=0)
         except Inventory.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'آیتم در موجودی شما نیست'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'آیتم در موجودی شما نیست'}, status=400)
 
         inv_item.quantity -= 1
         inv_item.save()
         MarketListing.objects.create(seller=profile, item=inv_item.item, price=price)
-        return JsonResponse({'status': 'success', 'message': 'آگهی با موفقیت ثبت شد'})
+        return FastJsonResponse({'status': 'success', 'message': 'آگهی با موفقیت ثبت شد'})
 
 
 def buy_listing(request):
@@ -669,7 +482,7 @@ def buy_listing(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     listing_id = request.POST.get('listing_id')
 
@@ -677,23 +490,22 @@ def buy_listing(request):
         try:
             listing = MarketListing.objects.select_for_update().get(id=listing_id)
         except MarketListing.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'آگهی پیدا نشد'}, status=404)
-
-        buyer = PlayerProfile.objects.select_for_update().get(user=request.user)
+            return FastJsonResponse({'status': 'error', 'message': 'آگهی پیدا نشد'}, status=404)
 
-        if listing.seller == buyer:
-            return JsonResponse({'status': 'error', 'message': 'نمی‌توانید آگهی خودتان را بخرید'}, status=400)
+        buyer_id = PlayerProfile.objects.values_list('pk', flat=True).get(user=request.user)
 
-        if buyer.diamonds < listing.price:
-            return JsonResponse({'status': 'error', 'message': 'الماس کافی ندارید'}, status=400)
+        if listing.seller_id == buyer_id:
+            return FastJsonResponse({'status': 'error', 'message': 'نمی‌توانید آگهی خودتان را بخرید'}, status=400)
 
-        seller = PlayerProfile.objects.select_for_update().get(pk=listing.seller_id)
+        # Profiles are locked in pk order, like every other market write (game/trading.py)
+        profiles = trading.lock_profiles([buyer_id, listing.seller_id])
+        buyer, seller = profiles[buyer_id], profiles[listing.seller_id]
 
-        tax = int(listing.price * 0.1)
-        seller_profit = listing.price - tax
+        if buyer.diamonds < listing.price:
+            return FastJsonResponse({'status': 'error', 'message': 'الماس کافی ندارید'}, status=400)
 
         buyer.diamonds -= listing.price
-        seller.diamonds += seller_profit
+        seller.diamonds += trading.seller_profit(listing.price)
 
         buyer.save()
         seller.save()
@@ -703,9 +515,60 @@ def buy_listing(request):
         buyer_inv.save()
 
         listing.delete()
-        check_achievements(buyer)
+        check_achievements(buyer, inventory_changed=True)
         check_achievements(seller)
-        return JsonResponse({'status': 'success', 'message': f'{listing.item.name} با موفقیت خریداری شد'})
+        return FastJsonResponse({'status': 'success', 'message': f'{listing.item.name} با موفقیت خریداری شد'})
+
+
+def create_listings_bulk(request):
+    auth_error = _require_auth_json(request)
+    if auth_error:
+        return auth_error
+    if request.method != 'POST':
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+
+    order, error = trading.parse_order(request.POST.get('quantity'), request.POST.get('price'))
+    if error:
+        return FastJsonResponse({'status': 'error', 'message': error}, status=400)
+    quantity, price = order
+
+    item = catalog.get_item(request.POST.get('item_id'))
+    if item is None:
+        return FastJsonResponse({'status': 'error', 'message': 'آیتم پیدا نشد'}, status=404)
+
+    profile_id = PlayerProfile.objects.values_list('pk', flat=True).get(user=request.user)
+    trade = trading.list_units(profile_id, item.id, quantity, price)
+    if trade.status != trading.LISTED:
+        return FastJsonResponse({'status': 'error', 'message': trading.MESSAGES[trade.status]}, status=400)
+    return FastJsonResponse({'status': 'success', 'message': f'{trade.count} آگهی با موفقیت ثبت شد', 'listed': trade.count})
+
+
+def buy_listings_bulk(request):
+    auth_error = _require_auth_json(request)
+    if auth_error:
+        return auth_error
+    if request.method != 'POST':
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+
+    order, error = trading.parse_order(request.POST.get('quantity'), request.POST.get('max_price'))
+    if error:
+        return FastJsonResponse({'status': 'error', 'message': error}, status=400)
+    quantity, max_price = order
+
+    item = catalog.get_item(request.POST.get('item_id'))
+    if item is None:
+        return FastJsonResponse({'status': 'error', 'message': 'آیتم پیدا نشد'}, status=404)
+
+    buyer_id = PlayerProfile.objects.values_list('pk', flat=True).get(user=request.user)
+    trade = trading.buy_cheapest(buyer_id, item.id, quantity, max_price)
+    if trade.status != trading.BOUGHT:
+        return FastJsonResponse({'status': 'error', 'message': trading.MESSAGES[trade.status]}, status=400)
+    return FastJsonResponse({
+        'status': 'success',
+        'message': f'{trade.count} عدد {item.name} با موفقیت خریداری شد',
+        'bought': trade.count,
+        'spent': trade.diamonds,
+    })
 
 
 def _finalize_auction(auction: AuctionListing):
@@ -732,9 +595,9 @@ def _finalize_auction(auction: AuctionListing):
         seller.save()
         auction.is_active = False
         auction.save()
-        check_achievements(buyer)
+        check_achievements(buyer, inventory_changed=True)
         check_achievements(seller)
-        return True, JsonResponse({'status': 'success', 'message': 'حراج به پایان رسید و برنده مشخص شد'})
+        return True, FastJsonResponse({'status': 'success', 'message': 'حراج به پایان رسید و برنده مشخص شد'})
     else:
         # no bids -> برگرداندن آیتم به فروشنده
         seller_inv, _ = Inventory.objects.select_for_update().get_or_create(
@@ -744,7 +607,7 @@ def _finalize_auction(auction: AuctionListing):
         seller_inv.save()
         auction.is_active = False
         auction.save()
-        return True, JsonResponse({'status': 'error', 'message': 'حراج بدون پیشنهاد پایان یافت و آیتم برگشت داده شد'})
+        return True, FastJsonResponse({'status': 'error', 'message': 'حراج بدون پیشنهاد پایان یافت و آیتم برگشت داده شد'})
 
 
 def create_auction(request):
@@ -752,7 +615,7 @@ def create_auction(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     item_id = request.POST.get('item_id')
     start_raw = request.POST.get('start_price')
@@ -764,30 +627,30 @@ def create_auction(request):
         if start_price < 1:
             raise ValueError
     except (TypeError, ValueError):
-        return JsonResponse({'status': 'error', 'message': 'قیمت شروع نامعتبر است'}, status=400)
+        return FastJsonResponse({'status': 'error', 'message': 'قیمت شروع نامعتبر است'}, status=400)
 
     buy_now_price = None
     if buy_now_raw:
         try:
             buy_now_price = int(buy_now_raw)
             if buy_now_price < start_price:
-                return JsonResponse({'status': 'error', 'message': 'خرید فوری باید بزرگتر از قیمت شروع باشد'}, status=400)
+                return FastJsonResponse({'status': 'error', 'message': 'خرید فوری باید بزرگتر از قیمت شروع باشد'}, status=400)
         except (TypeError, ValueError):
-            return JsonResponse({'status': 'error', 'message': 'خرید فوری نامعتبر است'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'خرید فوری نامعتبر است'}, status=400)
 
     try:
         duration_hours = int(duration_hours_raw)
         if duration_hours < 1 or duration_hours > 168:
             raise ValueError
     except (TypeError, ValueError):
-        return JsonResponse({'status': 'error', 'message': 'مدت زمان نامعتبر است'}, status=400)
+        return FastJsonResponse({'status': 'error', 'message': 'مدت زمان نامعتبر است'}, status=400)
 
     with transaction.atomic():
         profile = PlayerProfile.objects.select_for_update().get(user=request.user)
         try:
             inv_item = Inventory.objects.select_for_update().get(player=profile, item_id=item_id, quantity__gt=0)
         except Inventory.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'آیتم در موجودی نیست'}, status=404)
+            return FastJsonResponse({'status': 'error', 'message': 'آیتم در موجودی نیست'}, status=404)
 
         inv_item.quantity -= 1
         inv_item.save()
@@ -803,7 +666,7 @@ def create_auction(request):
             is_active=True,
         )
 
-        return JsonResponse({'status': 'success', 'message': 'حراج ایجاد شد'})
+        return FastJsonResponse({'status': 'success', 'message': 'حراج ایجاد شد'})
 
 
 def bid_auction(request):
@@ -811,7 +674,7 @@ def bid_auction(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     auction_id = request.POST.get('auction_id')
     bid_raw = request.POST.get('bid_amount')
@@ -821,22 +684,22 @@ def bid_auction(request):
         try:
             auction = AuctionListing.objects.select_for_update().get(id=auction_id)
         except AuctionListing.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'حراج پیدا نشد'}, status=404)
+            return FastJsonResponse({'status': 'error', 'message': 'حراج پیدا نشد'}, status=404)
 
         finalized, resp = _finalize_auction(auction)
         if finalized:
-            return resp or JsonResponse({'status': 'error', 'message': 'حراج فعال نیست'}, status=400)
+            return resp or FastJsonResponse({'status': 'error', 'message': 'حراج فعال نیست'}, status=400)
 
         buyer = PlayerProfile.objects.select_for_update().get(user=request.user)
         if auction.seller_id == buyer.id:
-            return JsonResponse({'status': 'error', 'message': 'نمی‌توانید حراج خود را بخرید'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'نمی‌توانید حراج خود را بخرید'}, status=400)
 
         if buy_now_flag:
             if not auction.buy_now_price:
-                return JsonResponse({'status': 'error', 'message': 'خرید فوری فعال نیست'}, status=400)
+                return FastJsonResponse({'status': 'error', 'message': 'خرید فوری فعال نیست'}, status=400)
             price = auction.buy_now_price
             if buyer.diamonds < price:
-                return JsonResponse({'status': 'error', 'message': 'الماس کافی ندارید'}, status=400)
+                return FastJsonResponse({'status': 'error', 'message': 'الماس کافی ندارید'}, status=400)
 
             # refund previous bidder if exists
             if auction.current_bidder_id:
@@ -862,22 +725,22 @@ def bid_auction(request):
 
             auction.is_active = False
             auction.save()
-            check_achievements(buyer)
+            check_achievements(buyer, inventory_changed=True)
             check_achievements(seller)
-            return JsonResponse({'status': 'success', 'message': 'آیتم با خرید فوری دریافت شد'})
+            return FastJsonResponse({'status': 'success', 'message': 'آیتم با خرید فوری دریافت شد'})
 
         # normal bid
         try:
             bid_amount = int(bid_raw)
         except (TypeError, ValueError):
-            return JsonResponse({'status': 'error', 'message': 'مبلغ پیشنهاد نامعتبر است'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'مبلغ پیشنهاد نامعتبر است'}, status=400)
 
         min_allowed = auction.current_price + 1
         if bid_amount < min_allowed:
-            return JsonResponse({'status': 'error', 'message': f'حداقل پیشنهاد {min_allowed} الماس است'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': f'حداقل پیشنهاد {min_allowed} الماس است'}, status=400)
 
         if buyer.diamonds < bid_amount:
-            return JsonResponse({'status': 'error', 'message': 'الماس کافی ندارید'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'الماس کافی ندارید'}, status=400)
 
         # refund previous bidder
         if auction.current_bidder_id:
@@ -892,7 +755,7 @@ def bid_auction(request):
         auction.current_price = bid_amount
         auction.save()
 
-        return JsonResponse({'status': 'success', 'message': 'پیشنهاد ثبت شد'})
+        return FastJsonResponse({'status': 'success', 'message': 'پیشنهاد ثبت شد'})
 
 
 def play_blackjack(request):
@@ -900,13 +763,13 @@ def play_blackjack(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     bet_raw = request.POST.get('bet')
     try:
         bet = int(bet_raw)
     except (TypeError, ValueError):
-        return JsonResponse({'status': 'error', 'message': 'مبلغ شرط نامعتبر است'}, status=400)
+        return FastJsonResponse({'status': 'error', 'message': 'مبلغ شرط نامعتبر است'}, status=400)
 
     with transaction.atomic():
         profile = PlayerProfile.objects.select_for_update().get(user=request.user)
@@ -934,7 +797,7 @@ def play_blackjack(request):
         profile.save()
         check_achievements(profile)
 
-    return JsonResponse({
+    return FastJsonResponse({
         'status': 'success',
         'result': result,
         'player': player_score,
@@ -949,7 +812,7 @@ def play_crash(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     bet_raw = request.POST.get('bet')
     target_raw = request.POST.get('target')
@@ -957,9 +820,9 @@ def play_crash(request):
         bet = int(bet_raw)
         target = float(target_raw)
     except (TypeError, ValueError):
-        return JsonResponse({'status': 'error', 'message': 'مقدار شرط یا ضریب نامعتبر است'}, status=400)
+        return FastJsonResponse({'status': 'error', 'message': 'مقدار شرط یا ضریب نامعتبر است'}, status=400)
     if target < 1.1 or target > 10:
-        return JsonResponse({'status': 'error', 'message': 'ضریب باید بین 1.1 و 10 باشد'}, status=400)
+        return FastJsonResponse({'status': 'error', 'message': 'ضریب باید بین 1.1 و 10 باشد'}, status=400)
 
     with transaction.atomic():
         profile = PlayerProfile.objects.select_for_update().get(user=request.user)
@@ -987,7 +850,7 @@ def play_crash(request):
         profile.save()
         check_achievements(profile)
 
-    return JsonResponse({
+    return FastJsonResponse({
         'status': 'success',
         'crash_at': crash_at,
         'win': win,
@@ -1001,13 +864,13 @@ def play_slots(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     bet_raw = request.POST.get('bet')
     try:
         bet = int(bet_raw)
     except (TypeError, ValueError):
-        return JsonResponse({'status': 'error', 'message': 'مبلغ شرط نامعتبر است'}, status=400)
+        return FastJsonResponse({'status': 'error', 'message': 'مبلغ شرط نامعتبر است'}, status=400)
 
     reels = ['🍌', '💎', '⭐', '7️⃣', '🍀', '🔥']
 
@@ -1034,7 +897,7 @@ def play_slots(request):
         profile.save()
         check_achievements(profile)
 
-    return JsonResponse({
+    return FastJsonResponse({
         'status': 'success',
         'spin': spin,
         'payout': payout,
@@ -1049,7 +912,7 @@ def redeem_code(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     code_text = request.POST.get('code', '').strip()
     user = request.user
@@ -1058,16 +921,16 @@ def redeem_code(request):
         try:
             promo = PromoCode.objects.select_for_update().get(code=code_text)
         except PromoCode.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'کد پیدا نشد'}, status=404)
+            return FastJsonResponse({'status': 'error', 'message': 'کد پیدا نشد'}, status=404)
 
         profile = PlayerProfile.objects.select_for_update().get(user=user)
 
         if promo.expiry_date and timezone.now() > promo.expiry_date:
-            return JsonResponse({'status': 'error', 'message': 'کد منقضی شده است'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'کد منقضی شده است'}, status=400)
         if promo.current_uses >= promo.max_uses:
-            return JsonResponse({'status': 'error', 'message': 'حداکثر استفاده از این کد انجام شده است'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'حداکثر استفاده از این کد انجام شده است'}, status=400)
         if UsedPromo.objects.filter(user=user, code=promo).exists():
-            return JsonResponse({'status': 'error', 'message': 'این کد قبلا توسط شما استفاده شده است'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'این کد قبلا توسط شما استفاده شده است'}, status=400)
 
         profile.coins += promo.reward_coins
         profile.diamonds += promo.reward_diamonds
@@ -1078,7 +941,7 @@ def redeem_code(request):
         promo.save()
         UsedPromo.objects.create(user=user, code=promo)
 
-        return JsonResponse({'status': 'success', 'message': f'{promo.reward_diamonds} الماس دریافت کردید'})
+        return FastJsonResponse({'status': 'success', 'message': f'{promo.reward_diamonds} الماس دریافت کردید'})
 
 
 def equip_skin(request):
@@ -1086,21 +949,21 @@ def equip_skin(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     item_id = request.POST.get('item_id')
     profile = request.user.playerprofile
     try:
         inventory_item = Inventory.objects.get(player=profile, item_id=item_id)
     except Inventory.DoesNotExist:
-        return JsonResponse({'status': 'error', 'message': 'آیتم در موجودی نیست'}, status=404)
+        return FastJsonResponse({'status': 'error', 'message': 'آیتم در موجودی نیست'}, status=404)
 
-    if inventory_item.item.item_type != 'SKIN':
-        return JsonResponse({'status': 'error', 'message': 'این آیتم پوسته نیست'}, status=400)
+    if catalog.get_item(inventory_item.item_id).item_type != 'SKIN':
+        return FastJsonResponse({'status': 'error', 'message': 'این آیتم پوسته نیست'}, status=400)
 
-    profile.equipped_skin = inventory_item.item
+    profile.equipped_skin_id = inventory_item.item_id
     profile.save()
-    return JsonResponse({'status': 'success', 'message': 'پوسته equip شد'})
+    return FastJsonResponse({'status': 'success', 'message': 'پوسته equip شد'})
 
 
 def equip_avatar(request):
@@ -1108,21 +971,21 @@ def equip_avatar(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     item_id = request.POST.get('item_id')
     profile = request.user.playerprofile
     try:
         inv_item = Inventory.objects.get(player=profile, item_id=item_id)
     except Inventory.DoesNotExist:
-        return JsonResponse({'status': 'error', 'message': 'آیتم در موجودی نیست'}, status=404)
+        return FastJsonResponse({'status': 'error', 'message': 'آیتم در موجودی نیست'}, status=404)
 
-    if inv_item.item.item_type != 'AVATAR':
-        return JsonResponse({'status': 'error', 'message': 'این آیتم آواتار نیست'}, status=400)
+    if catalog.get_item(inv_item.item_id).item_type != 'AVATAR':
+        return FastJsonResponse({'status': 'error', 'message': 'این آیتم آواتار نیست'}, status=400)
 
-    profile.avatar = inv_item.item
+    profile.avatar_id = inv_item.item_id
     profile.save()
-    return JsonResponse({'status': 'success', 'message': 'آواتار equip شد'})
+    return FastJsonResponse({'status': 'success', 'message': 'آواتار equip شد'})
 
 
 def equip_slot(request):
@@ -1130,14 +993,14 @@ def equip_slot(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     item_id = request.POST.get('item_id')
     slot_num = request.POST.get('slot_num')
     profile = request.user.playerprofile
 
     if slot_num not in ('1', '2', '3'):
-        return JsonResponse({'status': 'error', 'message': 'شماره اسلات نامعتبر است'}, status=400)
+        return FastJsonResponse({'status': 'error', 'message': 'شماره اسلات نامعتبر است'}, status=400)
 
     with transaction.atomic():
         profile = PlayerProfile.objects.select_for_update().get(pk=profile.pk)
@@ -1149,23 +1012,25 @@ def equip_slot(request):
                 profile.slot_2 = None
             else:
                 profile.slot_3 = None
+            apply_effective_stats(profile)
             profile.save()
-            return JsonResponse({'status': 'success', 'message': 'اسلات خالی شد'})
+            return FastJsonResponse({'status': 'success', 'message': 'اسلات خالی شد'})
 
         try:
             inv_item = Inventory.objects.get(player=profile, item_id=item_id)
         except Inventory.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'آیتم در موجودی نیست'}, status=404)
+            return FastJsonResponse({'status': 'error', 'message': 'آیتم در موجودی نیست'}, status=404)
 
         if slot_num == '1':
-            profile.slot_1 = inv_item.item
+            profile.slot_1_id = inv_item.item_id
         elif slot_num == '2':
-            profile.slot_2 = inv_item.item
+            profile.slot_2_id = inv_item.item_id
         else:
-            profile.slot_3 = inv_item.item
+            profile.slot_3_id = inv_item.item_id
 
+        apply_effective_stats(profile)
         profile.save()
-        return JsonResponse({'status': 'success', 'message': 'اسلات تنظیم شد'})
+        return FastJsonResponse({'status': 'success', 'message': 'اسلات تنظیم شد'})
 
 
 def sell_to_shop(request):
@@ -1173,7 +1038,7 @@ def sell_to_shop(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     item_id = request.POST.get('item_id')
     profile = request.user.playerprofile
@@ -1181,45 +1046,46 @@ def sell_to_shop(request):
         try:
             inv_item = Inventory.objects.select_for_update().get(player=profile, item_id=item_id, quantity__gt=0)
         except Inventory.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'آیتم در موجودی نیست'}, status=404)
+            return FastJsonResponse({'status': 'error', 'message': 'آیتم در موجودی نیست'}, status=404)
 
         item = inv_item.item
         if item.sell_price <= 0:
-            return JsonResponse({'status': 'error', 'message': 'این آیتم قابل فروش نیست'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'این آیتم قابل فروش نیست'}, status=400)
 
         profile = PlayerProfile.objects.select_for_update().get(pk=profile.pk)
         profile.diamonds += item.sell_price
         inv_item.quantity -= 1
         inv_item.save()
-        update_quest_progress(request.user, 'CLICK', 1)
+        update_quest_progress(profile, 'CLICK', 1)
         profile.save()
         check_achievements(profile)
-        return JsonResponse({'status': 'success', 'message': f'{item.sell_price} الماس دریافت شد'})
+        return FastJsonResponse({'status': 'success', 'message': f'{item.sell_price} الماس دریافت شد'})
 
 def energy_refill_click(request):
     auth_error = _require_auth_json(request)
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
-    cost = 2
-    amount = 50
+    cost = ClickEngine.REFILL_COST
+    amount = ClickEngine.REFILL_AMOUNT
     with transaction.atomic():
         profile = PlayerProfile.objects.select_for_update().get(user=request.user)
+        write_behind.flush_profile(profile)
         if profile.diamonds < cost:
-            return JsonResponse({'status': 'error', 'message': 'الماس کافی نیست'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'الماس کافی نیست'}, status=400)
         profile.diamonds -= cost
         profile.energy = min(profile.max_energy, profile.energy + amount)
         profile.save()
-    return JsonResponse({'status': 'success', 'new_energy': profile.energy, 'diamonds': profile.diamonds})
+    return FastJsonResponse({'status': 'success', 'new_energy': profile.energy, 'diamonds': profile.diamonds})
 
 def toggle_miner(request):
     auth_error = _require_auth_json(request)
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     item_id = request.POST.get('item_id')
     active_raw = request.POST.get('active')
@@ -1229,11 +1095,11 @@ def toggle_miner(request):
         try:
             inv = Inventory.objects.select_for_update().get(player=request.user.playerprofile, item_id=item_id, item__item_type='MINER')
         except Inventory.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'ماینر یافت نشد'}, status=404)
+            return FastJsonResponse({'status': 'error', 'message': 'ماینر یافت نشد'}, status=404)
 
         inv.is_active = active
         inv.save()
-        return JsonResponse({'status': 'success', 'message': 'حالت ماینر به‌روز شد', 'active': inv.is_active})
+        return FastJsonResponse({'status': 'success', 'message': 'حالت ماینر به‌روز شد', 'active': inv.is_active})
 
 
 def activate_boost(request):
@@ -1241,7 +1107,7 @@ def activate_boost(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid Request'}, status=405)
 
     cost = 5
     multiplier = 2.0
@@ -1251,13 +1117,13 @@ def activate_boost(request):
         profile = PlayerProfile.objects.select_for_update().get(user=request.user)
         now = timezone.now()
         if profile.diamonds < cost:
-            return JsonResponse({'status': 'error', 'message': 'الماس کافی نیست'}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': 'الماس کافی نیست'}, status=400)
         profile.diamonds -= cost
         base_time = profile.active_boost_until if profile.active_boost_until and profile.active_boost_until > now else now
         profile.active_boost_until = base_time + timedelta(minutes=duration_minutes)
         profile.boost_multiplier = multiplier
         profile.save()
-    return JsonResponse({
+    return FastJsonResponse({
         'status': 'success',
         'boost_multiplier': multiplier,
         'boost_seconds': int((profile.active_boost_until - timezone.now()).total_seconds()),
@@ -1270,7 +1136,7 @@ def claim_daily_reward(request):
     if auth_error:
         return auth_error
     if request.method != 'POST':
-        return JsonResponse({'status': 'error'}, status=405)
+        return FastJsonResponse({'status': 'error'}, status=405)
 
     profile = request.user.playerprofile
     now = timezone.now()
@@ -1291,7 +1157,7 @@ def claim_daily_reward(request):
             last_date = profile.last_daily_claim.date()
             today_date = now.date()
             if last_date == today_date:
-                return JsonResponse({'status': 'error', 'message': 'امروز پاداش گرفته‌اید'}, status=400)
+                return FastJsonResponse({'status': 'error', 'message': 'امروز پاداش گرفته‌اید'}, status=400)
             if (today_date - last_date).days > 1:
                 profile.daily_streak = 0
 
@@ -1307,7 +1173,7 @@ def claim_daily_reward(request):
         profile.save()
         check_achievements(profile)
 
-    return JsonResponse({
+    return FastJsonResponse({
         'status': 'success',
         'message': f'روز {profile.daily_streak} پاداش دریافت شد',
         'streak': profile.daily_streak,